@@ -7,15 +7,33 @@ import json
 import logging
 import os
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Callable, Dict, List, Optional, Tuple
-
-from .config import AppConfig
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .catalogue import ModelCatalogue
+from .compactor import HistoryCompactor
+from .config import AppConfig, ollama_base_urls
+from .context_sizing import ContextSizer
+from .exceptions import NetworkError
+from .fallback import FallbackChain
 from .fastmcp_client import FastMCPClient
-from .history import HistoryStore
+from .generation import Generation
+from .governor import LoadGovernor, ShedTier
+from .history import HistoryStore, estimate_tokens, token_budget
 from .markdown_utils import render_markdown
 from .matrix_client import MatrixClientWrapper
-from .ollama_client import OllamaClient
+from .ollama_client import AsyncOllamaClient
+from .ollama_pool import OllamaPool, conversation_key
+from .quotas import TokenQuotas
+from .reasoning import ReasoningStats, think_kwargs
+from .resilience import AdaptiveTimeouts, CircuitBreaker
+from .response_cache import CachedOllamaClient, ResponseCache
+from .routing import ModelRouter
+from .singleflight import CoalescingOllamaClient
+from .scheduler import InferenceScheduler
+from .semantic_cache import SemanticCache, SemanticCachedOllamaClient
 from .tools import execute_tool, load_schema
+from .usage import PrefixCacheStats, UsageTracker
+from .warm_pool import ModelWarmPool
 
 
 class AppContext:
@@ -29,7 +47,8 @@ class AppContext:
 
         Args:
             cfg: Fully validated application configuration.
-            executor: Optional executor to reuse for blocking work.
+            executor: Optional executor to reuse for blocking work such as
+                tool execution. Ollama requests do not use it.
         """
         self.cfg = cfg
         self.executor = executor or ThreadPoolExecutor(max_workers=4, thread_name_prefix="ollama")
@@ -39,10 +58,28 @@ class AppContext:
         self._suppress_noisy_logs()
         self.matrix = self._build_matrix_client(cfg)
         self.ollama = self._build_ollama_client(cfg)
+        self.warm_pool = self._build_warm_pool(cfg)
+        self.catalogue = self._build_catalogue(cfg)
+        self.context_sizer = self._build_context_sizer(cfg)
+        self.usage = self._build_usage_tracker()
+        self.quotas = self._build_quotas(cfg)
         self.history = self._build_history_store(cfg)
+        self.prefix_cache = PrefixCacheStats(self.history)
+        self.usage.add_listener(self.prefix_cache.record)
         self._expose_config_fields(cfg)
+        self.scheduler = self._build_scheduler(cfg)
+        self.governor = self._build_governor(cfg)
+        self.model_router = self._build_model_router(cfg)
+        self.fallback = self._build_fallback(cfg)
+        self.compactor = self._build_compactor(cfg)
         self._configure_verbose_mode(cfg)
         self._init_tool_calling(cfg)
+        # In-flight generations, one per generating command
+        self.generations: Set[Generation] = set()
+        # Background prompt prewarms, kept referenced until done
+        self._prewarms: Set["asyncio.Task[Any]"] = set()
+        # Background model loads started by `.model`, kept referenced until done
+        self._model_loads: Set["asyncio.Task[Any]"] = set()
 
     def _suppress_noisy_logs(self) -> None:
         """Reduce logging noise from MCP-related libraries."""
@@ -70,16 +107,290 @@ class AppContext:
             encryption_enabled=bool(getattr(cfg.matrix, "e2e", True)),
         )
 
-    def _build_ollama_client(self, cfg: AppConfig) -> OllamaClient:
+    def _build_ollama_client(self, cfg: AppConfig) -> Any:
         """Construct the Ollama client.
 
+        A single configured endpoint yields a plain client; several endpoints
+        are wrapped in a load-balancing pool with the same interface. Each
+        endpoint gets its own retry policy, adaptive timeouts and circuit
+        breaker.
+        Identical concurrent requests share one upstream call
+        (``coalesce_requests``), ``semantic_cache`` answers paraphrases of
+        earlier questions, and with ``response_cache`` enabled deterministic
+        requests are served from an exact-match cache in front.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            Configured client; wrappers expose the AsyncOllamaClient surface.
+        """
+        clients = [
+            AsyncOllamaClient(
+                base_url=url,
+                timeout=cfg.ollama.timeout,
+                max_concurrency=cfg.ollama.max_concurrency,
+                retries=cfg.ollama.retries,
+                retry_backoff=cfg.ollama.retry_backoff,
+                timeouts=(
+                    AdaptiveTimeouts(
+                        percentile=cfg.ollama.adaptive_timeout_percentile,
+                        multiplier=cfg.ollama.adaptive_timeout_multiplier,
+                        floor=cfg.ollama.adaptive_timeout_floor,
+                    )
+                    if cfg.ollama.adaptive_timeout
+                    else None
+                ),
+                breaker=(
+                    CircuitBreaker(
+                        threshold=cfg.ollama.circuit_breaker_failures, cooldown=cfg.ollama.circuit_breaker_cooldown
+                    )
+                    if cfg.ollama.circuit_breaker_failures
+                    else None
+                ),
+            )
+            for url in ollama_base_urls(cfg.ollama)
+        ]
+        client: Any = clients[0]
+        if len(clients) > 1:
+            self.logger.info("Balancing across %d Ollama backends", len(clients))
+            client = OllamaPool(
+                clients,
+                health_check_interval=cfg.ollama.health_check_interval,
+                hedge=cfg.ollama.hedge_requests,
+                hedge_percentile=cfg.ollama.hedge_percentile,
+                hedge_min_delay=cfg.ollama.hedge_min_delay,
+            )
+        if cfg.ollama.coalesce_requests:
+            client = CoalescingOllamaClient(client)
+        if cfg.ollama.semantic_cache:
+            try:
+                semantic = SemanticCache(
+                    threshold=cfg.ollama.semantic_cache_threshold,
+                    max_entries=cfg.ollama.semantic_cache_max_entries,
+                )
+            except RuntimeError as e:
+                self.logger.warning("Semantic cache disabled: %s", e)
+            else:
+                client = SemanticCachedOllamaClient(client, semantic, embed_model=cfg.ollama.semantic_cache_embed_model)
+        if cfg.ollama.response_cache:
+            cache = ResponseCache(ttl=cfg.ollama.response_cache_ttl, max_bytes=cfg.ollama.response_cache_max_bytes)
+            client = CachedOllamaClient(client, cache)
+        return client
+
+    def _build_warm_pool(self, cfg: AppConfig) -> ModelWarmPool:
+        """Create the model warm pool and hook it into the Ollama client(s).
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            ModelWarmPool that supplies ``keep_alive`` for every request.
+        """
+        models = cfg.ollama.models or {}
+        pool = ModelWarmPool(
+            self.ollama,
+            keep_alive=cfg.ollama.keep_alive,
+            model_keep_alive={models.get(k, k): v for k, v in (cfg.ollama.model_keep_alive or {}).items()},
+            idle_unload=cfg.ollama.idle_unload,
+        )
+        for client in self._ollama_clients():
+            client.keep_alive = pool.keep_alive_for
+        return pool
+
+    def _build_catalogue(self, cfg: AppConfig) -> ModelCatalogue:
+        """Create the cached catalogue of pulled and loaded models.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            ModelCatalogue refreshed in the background by the runtime.
+        """
+        return ModelCatalogue(
+            self.ollama,
+            ttl=cfg.ollama.model_catalogue_ttl,
+            interval=cfg.ollama.model_catalogue_interval,
+        )
+
+    def _build_context_sizer(self, cfg: AppConfig) -> Optional[ContextSizer]:
+        """Create per-request ``num_ctx`` sizing and hook it into the Ollama client(s).
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            ContextSizer, or None unless ``adaptive_num_ctx`` is enabled.
+        """
+        if not cfg.ollama.adaptive_num_ctx:
+            return None
+        models = cfg.ollama.models or {}
+        sizer = ContextSizer(
+            buckets=cfg.ollama.num_ctx_buckets or None,
+            max_ctx=(cfg.ollama.options or {}).get("num_ctx"),
+            model_max_ctx={models.get(k, k): int(n) for k, n in (cfg.ollama.model_num_ctx or {}).items()},
+        )
+        for client in self._ollama_clients():
+            client.context_size = sizer.num_ctx_for
+        return sizer
+
+    def _build_usage_tracker(self) -> UsageTracker:
+        """Create the token/timing accounting and feed it every chat response.
+
+        Returns:
+            UsageTracker recording per-model, per-room and per-user usage.
+        """
+        usage = UsageTracker()
+        for client in self._ollama_clients():
+            client.on_response = usage.record
+        return usage
+
+    def _build_quotas(self, cfg: AppConfig) -> Optional[TokenQuotas]:
+        """Create per-user and per-room token quotas, if any limit is configured.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            TokenQuotas charged from the usage tracker, or None.
+        """
+        quotas = TokenQuotas(
+            user_capacity=cfg.ollama.user_token_quota,
+            user_refill_per_minute=cfg.ollama.user_token_refill,
+            room_capacity=cfg.ollama.room_token_quota,
+            room_refill_per_minute=cfg.ollama.room_token_refill,
+            exempt=cfg.matrix.admins,
+        )
+        if not quotas.enabled:
+            return None
+        self.usage.add_listener(quotas.record)
+        return quotas
+
+    def _ollama_clients(self) -> List[AsyncOllamaClient]:
+        """Return the underlying client(s), unwrapping caches and pools."""
+        client = self.ollama
+        while isinstance(client, (CachedOllamaClient, CoalescingOllamaClient, SemanticCachedOllamaClient)):
+            client = client.inner
+        if isinstance(client, OllamaPool):
+            return [b.client for b in client.backends]
+        return [client]
+
+    def _build_scheduler(self, cfg: AppConfig) -> InferenceScheduler:
+        """Create the fair generation scheduler.
+
+        Per-model limits may be keyed by friendly name or model ID. With
+        ``model_batching`` enabled, requests are grouped by model to avoid
+        reloading weights on the server.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            InferenceScheduler with per-model concurrency caps.
+        """
+        models = cfg.ollama.models or {}
+        limits = {models.get(name, name): n for name, n in (cfg.ollama.model_parallel or {}).items()}
+        return InferenceScheduler(
+            default_limit=cfg.ollama.num_parallel,
+            model_limits=limits,
+            room_weights=cfg.ollama.room_weights,
+            batch_models=cfg.ollama.model_batching,
+            max_batch_wait=cfg.ollama.model_batch_max_wait,
+        )
+
+    def _build_governor(self, cfg: AppConfig) -> Optional[LoadGovernor]:
+        """Create the load-shedding governor, if any tier or limit is configured.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            LoadGovernor watching the scheduler's queue, or None.
+        """
+        models = cfg.ollama.models or {}
+        tiers = [
+            ShedTier(
+                pending=int(t.get("pending") or 0),
+                wait=float(t.get("wait") or 0),
+                num_predict=int(t["num_predict"]) if t.get("num_predict") else None,
+                model=models.get(t["model"], t["model"]) if t.get("model") else None,
+            )
+            for t in cfg.ollama.load_shedding
+        ]
+        governor = LoadGovernor(
+            self.scheduler,
+            tiers,
+            reject_pending=cfg.ollama.load_shedding_reject_pending,
+            reject_wait=cfg.ollama.load_shedding_reject_wait,
+        )
+        return governor if governor.enabled else None
+
+    def _build_model_router(self, cfg: AppConfig) -> Optional[ModelRouter]:
+        """Create the complexity router for `.ai` requests, if a fast model is configured.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            ModelRouter choosing between the fast and the active model, or None.
+        """
+        if not cfg.ollama.route_fast_model:
+            return None
+        models = cfg.ollama.models or {}
+        classifier = cfg.ollama.route_classifier_model
+        return ModelRouter(
+            models.get(cfg.ollama.route_fast_model, cfg.ollama.route_fast_model),
+            max_chars=cfg.ollama.route_max_chars,
+            classifier_model=models.get(classifier, classifier) or None,
+        )
+
+    def _build_fallback(self, cfg: AppConfig) -> Optional[FallbackChain]:
+        """Create the fallback chain for failing models, if any is configured.
+
         Args:
             cfg: Application configuration.
 
         Returns:
-            Configured OllamaClient instance.
+            FallbackChain sharing the circuit-breaker settings, or None.
         """
-        return OllamaClient(base_url=cfg.ollama.api_url.rsplit("/", 1)[0], timeout=cfg.ollama.timeout)
+        models = cfg.ollama.models or {}
+        chains = {
+            models.get(k, k): [models.get(m, m) for m in chain] for k, chain in (cfg.ollama.model_fallbacks or {}).items()
+        }
+        if not any(chains.values()):
+            return None
+        return FallbackChain(
+            chains,
+            threshold=cfg.ollama.circuit_breaker_failures,
+            cooldown=cfg.ollama.circuit_breaker_cooldown,
+            timeout=cfg.ollama.fallback_timeout,
+        )
+
+    def _build_compactor(self, cfg: AppConfig) -> Optional[HistoryCompactor]:
+        """Create the background summariser for trimmed history, if enabled.
+
+        Args:
+            cfg: Application configuration.
+
+        Returns:
+            HistoryCompactor hooked into the history store, or None.
+        """
+        if not cfg.ollama.summarize_history:
+            return None
+        models = cfg.ollama.models or {}
+        summary_model = models.get(cfg.ollama.summary_model, cfg.ollama.summary_model)
+        options: Dict[str, Any] = {"temperature": 0.2}
+        if (cfg.ollama.options or {}).get("num_ctx"):
+            options["num_ctx"] = cfg.ollama.options["num_ctx"]
+        compactor = HistoryCompactor(
+            self.history,
+            self.ollama,
+            model=lambda: summary_model or self.model,
+            options=options,
+            scheduler=self.scheduler,
+        )
+        self.history.on_evict = compactor.schedule
+        return compactor
 
     def _build_history_store(self, cfg: AppConfig) -> HistoryStore:
         """Create the history store with prompt configuration.
@@ -95,12 +406,24 @@ class AppContext:
         prefix = prompt_parts[0] if len(prompt_parts) >= 1 else "you are "
         suffix = prompt_parts[1] if len(prompt_parts) >= 2 else "."
         extra = prompt_parts[2] if len(prompt_parts) >= 3 else ""
+        # Token budgets come from each model's context window (num_ctx)
+        options = cfg.ollama.options or {}
+        num_predict = options.get("num_predict")
+        num_predict = int(num_predict) if isinstance(num_predict, (int, float)) else None
+        default_ctx = options.get("num_ctx")
+        models = cfg.ollama.models or {}
         return HistoryStore(
             prompt_prefix=prefix,
             prompt_suffix=suffix,
             personality=cfg.ollama.personality,
             prompt_suffix_extra=extra,
             max_items=cfg.ollama.history_size,
+            trim_block=cfg.ollama.history_trim_block,
+            max_tokens=token_budget(int(default_ctx), num_predict) if default_ctx else None,
+            model_max_tokens={
+                models.get(name, name): token_budget(int(n), num_predict)
+                for name, n in (cfg.ollama.model_num_ctx or {}).items()
+            },
         )
 
     def _expose_config_fields(self, cfg: AppConfig) -> None:
@@ -114,6 +437,15 @@ class AppContext:
         self.personality = cfg.ollama.personality
         self.options = cfg.ollama.options
         self.timeout = cfg.ollama.timeout
+        self.stream = bool(getattr(cfg.ollama, "stream", False))
+        self.stream_edit_interval = float(getattr(cfg.ollama, "stream_edit_interval", 1.0))
+        self.debounce = float(getattr(cfg.ollama, "debounce", 0.0))
+        self.prewarm_prompts = bool(getattr(cfg.ollama, "prewarm_prompts", False))
+        # Native reasoning control: global, per model, and per room (set by `.reasoning`)
+        self.think = cfg.ollama.think
+        self.model_think = {models.get(k, k): v for k, v in (cfg.ollama.model_think or {}).items()}
+        self.room_think: Dict[str, Any] = {}
+        self.reasoning_stats = ReasoningStats()
         self.admins = cfg.matrix.admins
         self.bot_id = "Ollamarama"
 
@@ -215,8 +547,6 @@ class AppContext:
 
     def _init_tool_calling(self, cfg: AppConfig) -> None:
         """Configure tool calling state and tool schema."""
-        self.thinking_placeholder_event_id: Optional[str] = None
-        self.thinking_animation_task: Optional[asyncio.Task] = None  # type: ignore[type-arg]
         self.tools_enabled = True
         builtin_schema = self._load_builtin_tools_schema()
         mcp_schema, mcp_tool_names, mcp_client = self._probe_mcp_tools(cfg)
@@ -271,28 +601,210 @@ class AppContext:
             return None
         return render_markdown(body)
 
-    async def send_response(self, room_id: str, body: str, html: Optional[str] = None) -> None:
-        """Send the response, editing the thinking placeholder if one exists.
+    async def send_response(
+        self, room_id: str, body: str, html: Optional[str] = None, generation: Optional[Generation] = None
+    ) -> None:
+        """Send the response, editing the generation's placeholder if one exists.
 
         Args:
             room_id: Target room ID.
             body: Plain-text message body.
             html: Optional HTML-formatted body.
+            generation: Generation whose placeholder and spinner to finalize.
         """
-        task = self.thinking_animation_task
-        self.thinking_animation_task = None
-        if task and not task.done():
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
-        placeholder = self.thinking_placeholder_event_id
-        self.thinking_placeholder_event_id = None
+        placeholder = None
+        if generation is not None:
+            await generation.stop_spinner()
+            placeholder = generation.placeholder_event_id
+            generation.placeholder_event_id = None
         if placeholder:
             await self.matrix.edit_message(room_id, placeholder, body, html=html)
         else:
             await self.matrix.send_text(room_id, body, html=html)
+        if generation is not None:
+            generation.mark_finished()
+            self.logger.debug(
+                "Generation for %s in %s finished in %.2fs (first output after %.2fs)",
+                generation.user_id,
+                room_id,
+                generation.elapsed,
+                generation.time_to_first_token or 0.0,
+            )
+
+    def cancel_generations(self, room_id: Optional[str] = None, user_id: Optional[str] = None) -> int:
+        """Cancel in-flight generations, optionally only one room's or user's.
+
+        Args:
+            room_id: Only cancel generations in this room (None for all rooms).
+            user_id: Only cancel generations started by this user (None for all users).
+
+        Returns:
+            Number of generations cancelled.
+        """
+        cancelled = 0
+        for generation in list(self.generations):
+            if room_id is not None and generation.room_id != room_id:
+                continue
+            if user_id is not None and generation.user_id != user_id:
+                continue
+            if generation.cancel():
+                cancelled += 1
+        if cancelled:
+            self.logger.debug("Cancelled %d generation(s) in %s for %s", cancelled, room_id or "all rooms", user_id or "all users")
+        return cancelled
+
+    async def abandon_placeholder(self, generation: Generation) -> None:
+        """Clean up after a cancelled generation.
+
+        A placeholder that only showed the spinner is redacted; one showing a
+        partial streamed reply keeps the text and is marked as stopped.
+
+        Args:
+            generation: Cancelled generation owning the placeholder.
+        """
+        await generation.stop_spinner()
+        placeholder = generation.placeholder_event_id
+        generation.placeholder_event_id = None
+        if not placeholder:
+            return
+        if generation.partial_body:
+            body = f"{generation.partial_body}\n\n*(stopped)*"
+            await self.matrix.edit_message(generation.room_id, placeholder, body, html=self.render(body))
+        else:
+            await self.matrix.redact(generation.room_id, placeholder, reason="Generation stopped")
+
+    def prewarm_prompt(self, room_id: str, user_id: str, model: Optional[str] = None) -> Optional["asyncio.Task[Any]"]:
+        """Have the server evaluate a conversation's system prompt in the background.
+
+        Sends only the system messages with ``num_predict`` 1, so the prompt
+        is in the server's KV cache before the next full request reuses it as
+        a prefix. Does nothing unless ``prewarm_prompts`` is enabled.
+
+        Args:
+            room_id: Room of the conversation.
+            user_id: User of the conversation.
+            model: Model to prewarm; defaults to the active model.
+
+        Returns:
+            The background task, or None when prewarming is disabled.
+        """
+        if not getattr(self, "prewarm_prompts", False):
+            return None
+        model = model or self.model
+        messages = [m for m in self.history.get(room_id, user_id, model=model) if m.get("role") == "system"]
+        if not messages:
+            return None
+        options = {**(self.options or {}), "num_predict": 1}
+
+        async def _prewarm() -> None:
+            # Not a reply: keep it out of the conversation's accounting
+            conversation_key.set(None)
+            try:
+                await self.ollama.chat(messages=messages, model=model, options=options, timeout=self.timeout)
+            except Exception:
+                self.logger.debug("Prompt prewarm failed for %s in %s", user_id, room_id, exc_info=True)
+
+        task = asyncio.get_running_loop().create_task(_prewarm())
+        pending = getattr(self, "_prewarms", None)
+        if pending is not None:
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        return task
+
+    async def stream_reply(
+        self,
+        room_id: str,
+        header: str,
+        messages: List[Dict[str, Any]],
+        generation: Generation,
+        think: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        timeout: Optional[float] = None,
+        *,
+        model: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Stream a completion into the placeholder message as it is generated.
+
+        Partial text is coalesced and the placeholder is edited at most once per
+        ``stream_edit_interval`` seconds. When no placeholder exists, the first
+        visible chunk is sent as a new message which later edits replace. The
+        placeholder is left on the generation so ``send_response`` can post
+        the final, cleaned-up text.
+
+        Args:
+            room_id: Target room ID.
+            header: Header line shown above the partial text (e.g. ``**User**:``).
+            messages: Chat messages to send to the model.
+            generation: Generation owning the placeholder.
+            think: Native reasoning control passed to the model, if set.
+            tools: Tool schemas the model may call, if any.
+            timeout: Request timeout in seconds (default: the configured timeout).
+            model: Model to use (default: the generation's model, else the active one).
+            options: Generation options (default: the generation's, else the configured ones).
+            tool_choice: Tool choice override sent along with ``tools``.
+
+        Returns:
+            Response dictionary shaped like a non-streaming ``/api/chat`` reply,
+            including any tool calls and timing metadata from the final chunk.
+        """
+        loop = asyncio.get_running_loop()
+        parts: List[str] = []
+        thinking: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        final: Dict[str, Any] = {}
+        shown = ""
+        last_edit = 0.0
+        extra: Dict[str, Any] = {"tools": tools} if tools else {}
+        if tools and tool_choice is not None:
+            extra["tool_choice"] = tool_choice
+        async for chunk in self.ollama.chat_stream(
+            messages=messages,
+            model=model or generation.resolve_model(self.model),
+            options=generation.resolve_options(self.options) if options is None else options,
+            timeout=self.timeout if timeout is None else timeout,
+            **think_kwargs(think),
+            **extra,
+        ):
+            message = chunk.get("message") or {}
+            piece = message.get("content") or ""
+            if piece:
+                parts.append(piece)
+            if message.get("thinking"):
+                thinking.append(message["thinking"])
+            if message.get("tool_calls"):
+                tool_calls.extend(message["tool_calls"])
+            if chunk.get("done"):
+                final = chunk
+                continue
+            now = loop.time()
+            if now - last_edit < self.stream_edit_interval:
+                continue
+            visible = _visible_partial("".join(parts))
+            if not visible or visible == shown:
+                continue
+            await self._show_partial(room_id, f"{header}\n{visible}", generation)
+            shown = visible
+            last_edit = now
+        data = {k: v for k, v in final.items() if k != "message"}
+        data["message"] = {"role": "assistant", "content": "".join(parts)}
+        if thinking:
+            data["message"]["thinking"] = "".join(thinking)
+        if tool_calls:
+            data["message"]["tool_calls"] = tool_calls
+        return data
+
+    async def _show_partial(self, room_id: str, body: str, generation: Generation) -> None:
+        """Replace the spinner or previous partial with ``body``."""
+        await generation.stop_spinner()
+        generation.mark_first_token()
+        generation.partial_body = body
+        placeholder = generation.placeholder_event_id
+        if placeholder:
+            await self.matrix.edit_message(room_id, placeholder, body, html=self.render(body))
+        else:
+            generation.placeholder_event_id = await self.matrix.send_text(room_id, body, html=self.render(body))
 
     def _execute_tool(self, name: str, arguments: Dict[str, Any]) -> str:
         """Execute a tool call, preferring MCP tools when available.
@@ -339,43 +851,102 @@ class AppContext:
             log.exception("Failed to parse tool arguments for '%s'", tool_name)
         return {}
 
-    def _prune_tool_messages(self, messages: List[Dict[str, Any]]) -> None:
-        """Remove tool-related messages and trim history size in place.
+    def _prune_tool_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> None:
+        """Remove tool-related messages and trim to the history limits in place.
 
         Args:
             messages: Chat message list to modify.
+            model: Model whose token budget applies (default: the active model).
         """
         messages[:] = [
             m
             for m in messages
             if not (m.get("role") == "tool" or (isinstance(m, dict) and m.get("tool_calls")))
         ]
-        if len(messages) > 24:
-            if messages and messages[0].get("role") == "system":
-                messages.pop(1)
-            else:
-                messages.pop(0)
-
-    def respond_with_tools(self, messages: List[Dict[str, Any]], *, tool_choice: str | None = "auto") -> str:
+        history = getattr(self, "history", None)
+        max_items = getattr(history, "max_items", 24)
+        budget = history.budget_for(model or self.model) if history is not None else None
+        head = 1 if messages and messages[0].get("role") == "system" else 0
+        tokens = [estimate_tokens(m.get("content") or "") for m in messages]
+        total = sum(tokens)
+        drop = head
+        while len(messages) - (drop - head) > head + 1 and (
+            len(messages) - (drop - head) > max_items or (budget is not None and total > budget)
+        ):
+            total -= tokens[drop]
+            drop += 1
+        del messages[head:drop]
+
+    async def respond_with_tools(
+        self,
+        messages: List[Dict[str, Any]],
+        *,
+        tool_choice: str | None = "auto",
+        think: Any = None,
+        model: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        generation: Optional[Generation] = None,
+        header: str = "",
+    ) -> str:
         """Respond to chat messages with tool calling support.
 
+        With streaming enabled and a ``generation`` given, every model turn
+        is streamed into the generation's placeholder under ``header``, so
+        the final answer grows as it is generated; tool calls arrive in the
+        stream and are run between turns.
+
         Args:
             messages: Mutable list of chat messages.
             tool_choice: Optional tool choice override passed to the model.
+            think: Native reasoning control passed to the model, if set.
+            model: Model to use (default: the active model).
+            options: Generation options (default: the configured options).
+            timeout: Request timeout in seconds (default: the configured timeout).
+            generation: Generation to stream into, if any.
+            header: Header line shown above streamed text (e.g. ``**User**:``).
 
         Returns:
             Assistant response content.
+
+        Raises:
+            NetworkError: If a request to the backend fails, times out or is
+                refused, so callers can report it or fall back.
         """
         log = getattr(self, "logger", logging.getLogger(__name__))
-        try:
-            result = self.ollama.chat_with_tools(
-                model=self.model,
+        model = model or self.model
+        options = self.options if options is None else options
+        timeout = self.timeout if timeout is None else timeout
+        streaming = generation is not None and getattr(self, "stream", False)
+
+        async def turn() -> Dict[str, Any]:
+            if streaming:
+                return await self.stream_reply(
+                    generation.room_id,
+                    header,
+                    messages,
+                    generation,
+                    think=think,
+                    tools=self.tools_schema,
+                    timeout=timeout,
+                    model=model,
+                    options=options,
+                    tool_choice=tool_choice,
+                )
+            return await self.ollama.chat_with_tools(
+                model=model,
                 messages=messages,
-                options=self.options,
+                options=options,
                 tools=self.tools_schema,
                 tool_choice=tool_choice,
-                timeout=self.timeout,
+                timeout=timeout,
+                **think_kwargs(think),
             )
+
+        try:
+            result = await turn()
+        except NetworkError:
+            raise
         except Exception:
             log.exception("Initial chat_with_tools failed")
             return ""
@@ -400,7 +971,7 @@ class AppContext:
                 name = func.get("name") or ""
                 args = AppContext._parse_tool_arguments(self, func.get("arguments"), tool_name=name)
 
-                tool_result = self._execute_tool(name, args)
+                tool_result = await self.to_thread(self._execute_tool, name, args)
                 tool_msg: Dict[str, Any] = {"role": "tool", "content": str(tool_result)}
                 if call.get("id"):
                     tool_msg["tool_call_id"] = call["id"]
@@ -408,14 +979,9 @@ class AppContext:
 
             log.debug("Executed %d tool call(s)", len(tool_calls))
             try:
-                result = self.ollama.chat_with_tools(
-                    model=self.model,
-                    messages=messages,
-                    options=self.options,
-                    tools=self.tools_schema,
-                    tool_choice=tool_choice,
-                    timeout=self.timeout,
-                )
+                result = await turn()
+            except NetworkError:
+                raise
             except Exception:
                 log.exception("Follow-up chat_with_tools failed")
                 return ""
@@ -424,9 +990,32 @@ class AppContext:
         final = result.get("message", {})
         content = final.get("content", "").strip()
         messages.append({"role": "assistant", "content": content})
-        AppContext._prune_tool_messages(self, messages)
+        AppContext._prune_tool_messages(self, messages, model)
         log.debug("Responded with %d characters after %d iteration(s)", len(content), iterations)
         return content
 
 
+def _visible_partial(text: str) -> str:
+    """Return the user-visible portion of a partially streamed reply.
+
+    Reasoning blocks are hidden while they are open and removed once closed,
+    so the placeholder never flashes chain-of-thought text.
+
+    Args:
+        text: Accumulated response text so far.
+
+    Returns:
+        Text safe to show in the room, stripped of surrounding whitespace.
+    """
+    for start, end in (("<think>", "</think>"), ("<|begin_of_thought|>", "<|end_of_thought|>")):
+        if start in text:
+            head, _, tail = text.partition(start)
+            if end not in tail:
+                return head.strip()
+            text = head + tail.split(end, 1)[1]
+    if "<|begin_of_solution|>" in text:
+        text = text.split("<|begin_of_solution|>", 1)[1]
+    return text.replace("<|end_of_solution|>", "").strip()
+
+
 __all__ = ["AppContext"]
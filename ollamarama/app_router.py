@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
-from .handlers.cmd_ai import handle_ai
+from .handlers.cmd_ai import handle_ai, handle_heavy
 from .handlers.cmd_help import handle_help
 from .handlers.cmd_model import handle_model
 from .handlers.cmd_prompt import handle_custom, handle_persona
+from .handlers.cmd_queue import handle_queue
+from .handlers.cmd_quota import handle_quota
+from .handlers.cmd_reasoning import handle_reasoning
+from .handlers.cmd_usage import handle_usage
 from .handlers.cmd_reset import handle_clear, handle_reset
+from .handlers.cmd_stop import handle_stop
 from .handlers.cmd_x import handle_x
 from .handlers.router import Router
 
@@ -20,15 +25,21 @@ def _build_router() -> Router:
     router = Router()
     # user commands
     router.register(".ai", handle_ai)
+    router.register(".heavy", handle_heavy)
     router.register(".x", handle_x)
     router.register(".persona", handle_persona)
     router.register(".custom", handle_custom)
     router.register(".reset", handle_reset)
     router.register(".stock", lambda c, r, s, d, a: handle_reset(c, r, s, d, "stock"))
+    router.register(".stop", handle_stop)
     router.register(".help", handle_help)
     # admin commands
     router.register(".model", handle_model, admin=True)
     router.register(".clear", handle_clear, admin=True)
+    router.register(".queue", handle_queue, admin=True)
+    router.register(".usage", handle_usage, admin=True)
+    router.register(".quota", handle_quota, admin=True)
+    router.register(".reasoning", handle_reasoning, admin=True)
     try:
         from .handlers.cmd_verbose import handle_verbose
 
@@ -5,18 +5,25 @@ from __future__ import annotations
 import asyncio
 import datetime as _dt
 import json
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from .app_context import AppContext
 from .app_router import _build_router
 from .config import AppConfig
-from .handlers.cmd_ai import handle_ai
+from .generation import Generation
+from .handlers.cmd_ai import handle_ai, handle_heavy
 from .handlers.cmd_prompt import handle_custom, handle_persona
 from .handlers.cmd_x import handle_x
 from .handlers.router import Router
+from .ollama_pool import conversation_key
 from .security import Security
 
-_GENERATING_HANDLERS = {handle_ai, handle_x, handle_persona, handle_custom}
+_GENERATING_HANDLERS = {handle_ai, handle_heavy, handle_x, handle_persona, handle_custom}
+# Handlers whose requests the complexity router may send to the fast model
+_ROUTED_HANDLERS = {handle_ai, handle_heavy}
+
+# A burst is answered at most this many debounce windows after its first message
+_DEBOUNCE_MAX_WINDOWS = 3
 
 _SPINNER_PREFIX = "Thinking"
 _SPINNER_FRAMES = [".", "..", "...", ".."]
@@ -37,6 +44,14 @@ async def _thinking_animation(matrix: Any, room_id: str, event_id: str, label: s
         raise
 
 
+async def _preload_model(ctx: AppContext, model: str) -> None:
+    """Load the startup model in the background so the first reply is fast."""
+    try:
+        await ctx.warm_pool.preload(model)
+    except Exception as e:
+        ctx.logger.warning("Failed to preload model %s: %s", model, e)
+
+
 async def _persist_device_id_if_needed(ctx: AppContext, cfg: AppConfig, config_path: Optional[str]) -> None:
     """Persist a discovered device ID back to the configuration file.
 
@@ -139,6 +154,164 @@ async def _run_until_stopped(ctx: AppContext, stop: asyncio.Event) -> None:
                 t.cancel()
 
 
+async def _start_placeholder(ctx: AppContext, generation: Generation, label: str) -> None:
+    """Post the thinking placeholder for a generation and start its spinner.
+
+    Args:
+        ctx: Application context.
+        generation: Generation that will own the placeholder.
+        label: Header line shown above the spinner.
+    """
+    initial_body = f"{label}\n{_SPINNER_PREFIX}{_SPINNER_FRAMES[0]}"
+    event_id = await ctx.matrix.send_text(generation.room_id, initial_body, html=ctx.render(initial_body))
+    generation.placeholder_event_id = event_id
+    if event_id:
+        generation.spinner_task = asyncio.create_task(
+            _thinking_animation(ctx.matrix, generation.room_id, event_id, label, ctx.render)
+        )
+
+
+def _format_wait(seconds: float) -> str:
+    """Format a wait as e.g. ``45s``, ``3m`` or ``1h 5m``."""
+    seconds = max(1, int(seconds + 0.999))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes = (seconds + 59) // 60
+    if minutes < 60:
+        return f"{minutes}m"
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+def _quota_reply(ctx: AppContext, room_id: str, sender: str, sender_display: str) -> Optional[str]:
+    """Return the reply for a throttled sender, or None if they may generate.
+
+    Admins (seeded into ``quotas.exempt`` from the configuration) are never throttled.
+    """
+    quotas = getattr(ctx, "quotas", None)
+    if quotas is None:
+        return None
+    throttled = quotas.check(room_id, sender, sender_display)
+    if throttled is None:
+        return None
+    scope, wait = throttled
+    if scope == "room":
+        return f"This room has used its token allowance, please try again in {_format_wait(wait)}"
+    return f"{sender_display}, you have used your token allowance, please try again in {_format_wait(wait)}"
+
+
+async def _run_generation(ctx: AppContext, handler: Callable[..., Any], args: tuple, generation: Generation) -> None:
+    """Run a generating handler with its per-request state.
+
+    Waits for a fair slot on the active model first, so busy rooms cannot
+    starve the others. With routing enabled, `.ai` requests are first sent to
+    the fast or the heavy model by complexity. Under queue pressure the
+    load-shedding governor may shorten the reply, switch to a lighter
+    model, or refuse the request. If the generation is cancelled
+    (superseded, reset or stopped), its placeholder is removed or marked as
+    stopped.
+
+    Args:
+        ctx: Application context.
+        handler: Generating command handler.
+        args: Positional handler arguments from the router.
+        generation: Per-request state passed through to the handler.
+    """
+    scheduler = getattr(ctx, "scheduler", None)
+    governor = getattr(ctx, "governor", None)
+    router = getattr(ctx, "model_router", None)
+    try:
+        if router is not None and handler in _ROUTED_HANDLERS:
+            await router.route(ctx, generation, args[4], force_heavy=handler is handle_heavy)
+        if governor is not None:
+            decision = governor.assess()
+            if decision.reject:
+                body = "The bot is busy right now, please try again in a minute"
+                await ctx.send_response(generation.room_id, body, html=ctx.render(body), generation=generation)
+                return
+            governor.apply(decision, generation, ctx.options)
+        if scheduler is None:
+            await handler(*args, generation=generation)
+        else:
+            model = generation.resolve_model(ctx.model)
+            async with scheduler.slot(model, generation.room_id, generation.user_id) as waited:
+                if waited:
+                    ctx.logger.debug("Generation for %s waited %.2fs for a %s slot", generation.user_id, waited, model)
+                await handler(*args, generation=generation)
+        if router is not None:
+            router.observe(generation)
+    except asyncio.CancelledError:
+        try:
+            await ctx.abandon_placeholder(generation)
+        except Exception:
+            pass
+        raise
+    except Exception as e:
+        ctx.log(e)
+    finally:
+        await generation.stop_spinner()
+
+
+class _Burst:
+    """`.ai` messages from one (room, user) waiting out the debounce window."""
+
+    def __init__(self, window: float, first: str) -> None:
+        loop = asyncio.get_running_loop()
+        self.window = window
+        self.parts: List[str] = [first]
+        self.started_at = loop.time()
+        self.last_at = self.started_at
+
+    def add(self, text: str) -> None:
+        self.parts.append(text)
+        self.last_at = asyncio.get_running_loop().time()
+
+    def remaining(self) -> float:
+        """Seconds until the burst is answered: quiet for a window, or capped overall."""
+        deadline = min(self.last_at + self.window, self.started_at + self.window * _DEBOUNCE_MAX_WINDOWS)
+        return deadline - asyncio.get_running_loop().time()
+
+    def merged(self) -> str:
+        return "\n".join(p for p in self.parts if p)
+
+
+async def _run_debounced(
+    ctx: AppContext,
+    handler: Callable[..., Any],
+    args: tuple,
+    generation: Generation,
+    burst: _Burst,
+    bursts: Dict[Tuple[str, str], _Burst],
+) -> None:
+    """Wait for a burst of messages to go quiet, then generate one reply to all of them.
+
+    Args:
+        ctx: Application context.
+        handler: Generating command handler.
+        args: Handler arguments from the router for the burst's first message.
+        generation: Generation owning the burst's single placeholder.
+        burst: Messages collected so far; later messages are appended by the text handler.
+        bursts: Open bursts by (room, user); this one is removed once it stops accepting messages.
+    """
+    key = (generation.room_id, generation.user_id)
+    try:
+        delay = burst.remaining()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = burst.remaining()
+    except asyncio.CancelledError:
+        try:
+            await ctx.abandon_placeholder(generation)
+        except Exception:
+            pass
+        raise
+    finally:
+        if bursts.get(key) is burst:
+            del bursts[key]
+    if len(burst.parts) > 1:
+        ctx.logger.debug("Merged %d messages from %s in %s", len(burst.parts), generation.user_id, generation.room_id)
+    await _run_generation(ctx, handler, (*args[:4], burst.merged()), generation)
+
+
 def _make_text_handler(
     ctx: AppContext,
     cfg: AppConfig,
@@ -158,6 +331,8 @@ def _make_text_handler(
     Returns:
         Async callback that handles text events.
     """
+    # Open `.ai` bursts by (room, user) while debouncing
+    bursts: Dict[Tuple[str, str], _Burst] = {}
 
     async def on_text(room, event) -> None:
         try:
@@ -192,21 +367,40 @@ def _make_text_handler(
                 await security.allow_devices(sender)
             except Exception:
                 pass
-            user_event_id = getattr(event, "event_id", None)
-            if handler in _GENERATING_HANDLERS and user_event_id and getattr(ctx, "thinking", True):
-                label = f"**{sender_display}**:"
-                initial_body = f"{label}\n{_SPINNER_PREFIX}{_SPINNER_FRAMES[0]}"
-                event_id = await ctx.matrix.send_text(
-                    room.room_id, initial_body, html=ctx.render(initial_body)  # type: ignore
-                )
-                ctx.thinking_placeholder_event_id = event_id
-                if event_id:
-                    ctx.thinking_animation_task = asyncio.create_task(
-                        _thinking_animation(ctx.matrix, room.room_id, event_id, label, ctx.render)  # type: ignore
-                    )
-            res = handler(*args)
-            if asyncio.iscoroutine(res):
-                await res
+            # Keep this conversation on one Ollama backend when pooling
+            token = conversation_key.set((room.room_id, sender))  # type: ignore
+            try:
+                if handler in _GENERATING_HANDLERS:
+                    debounce = getattr(ctx, "debounce", 0.0) if handler is handle_ai else 0.0
+                    burst = bursts.get((room.room_id, sender)) if debounce > 0 else None  # type: ignore
+                    if burst is not None:
+                        # Still inside the window: fold into the pending reply
+                        burst.add(args[4])
+                        return
+                    refusal = _quota_reply(ctx, room.room_id, sender, sender_display)  # type: ignore
+                    if refusal is not None:
+                        await ctx.matrix.send_text(room.room_id, refusal, html=ctx.render(refusal))  # type: ignore
+                        return
+                    # A new request supersedes the sender's unfinished one in this room
+                    ctx.cancel_generations(room.room_id, sender)  # type: ignore
+                    generation = Generation(room.room_id, sender)  # type: ignore
+                    if getattr(event, "event_id", None) and getattr(ctx, "thinking", True):
+                        await _start_placeholder(ctx, generation, f"**{sender_display}**:")
+                    # Run in its own task so generations in other rooms proceed concurrently
+                    if debounce > 0:
+                        burst = bursts[(room.room_id, sender)] = _Burst(debounce, args[4])  # type: ignore
+                        run = _run_debounced(ctx, handler, args, generation, burst, bursts)
+                    else:
+                        run = _run_generation(ctx, handler, args, generation)
+                    generation.task = asyncio.create_task(run)
+                    ctx.generations.add(generation)
+                    generation.task.add_done_callback(lambda _t, g=generation: ctx.generations.discard(g))
+                    return
+                res = handler(*args)
+                if asyncio.iscoroutine(res):
+                    await res
+            finally:
+                conversation_key.reset(token)
         except Exception as e:
             ctx.log(e)
 
@@ -256,16 +450,38 @@ async def run(cfg: AppConfig, config_path: Optional[str] = None) -> None:
     join_time = _dt.datetime.now()
     ctx.matrix.add_text_handler(_make_text_handler(ctx, cfg, router, security, join_time))
 
+    if ctx.scheduler.batch_models:
+        ctx.catalogue.add_listener(ctx.scheduler.set_resident)
+    background = [asyncio.create_task(ctx.catalogue.run())]
+    if cfg.ollama.preload:
+        background.append(asyncio.create_task(_preload_model(ctx, ctx.model)))
+    if ctx.warm_pool.idle_unload > 0:
+        background.append(asyncio.create_task(ctx.warm_pool.run(lambda: [ctx.model])))
+
     stop = _setup_stop_event()
     try:
         await _run_until_stopped(ctx, stop)
     finally:
+        for task in [*background, *getattr(ctx, "_model_loads", ())]:
+            task.cancel()
         # Best-effort client shutdown and background cleanup
+        for generation in list(ctx.generations):
+            generation.cancel()
+        try:
+            if getattr(ctx, "compactor", None) is not None:
+                await ctx.compactor.close()
+        except Exception:
+            pass
         try:
             if hasattr(ctx.matrix, "shutdown"):
                 await ctx.matrix.shutdown()
         except Exception:
             pass
+        try:
+            if hasattr(ctx.ollama, "close"):
+                await ctx.ollama.close()
+        except Exception:
+            pass
         # Stop background executor threads
         try:
             ctx.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,158 @@
+"""Cached catalogue of the models pulled (`/api/tags`) and loaded (`/api/ps`) on the server."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .scheduler import _model_key
+
+
+def format_size(size: Optional[int]) -> str:
+    """Format a byte count as ``4.7 GB`` (empty when unknown)."""
+    if not size:
+        return ""
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1000:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1000
+    return f"{value:.1f} TB"
+
+
+class ModelCatalogue:
+    """Pulled and loaded models, refreshed in the background.
+
+    `/api/ps` is polled every ``interval`` seconds, `/api/tags` once it is
+    older than ``ttl`` seconds. Readers never wait on the server: they get
+    the cached entries, and a stale read schedules a refresh. A failed
+    refresh keeps the previous entries.
+
+    Listeners added with `add_listener` receive the names of the loaded
+    models after each `/api/ps` refresh.
+    """
+
+    def __init__(self, ollama: Any, *, ttl: float = 60.0, interval: float = 10.0) -> None:
+        self.ollama = ollama
+        self.ttl = float(ttl)
+        self.interval = float(interval)
+        self.pulled: Dict[str, Dict[str, Any]] = {}
+        self.loaded: Dict[str, Dict[str, Any]] = {}
+        self.tags_at: Optional[float] = None
+        self.ps_at: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Call ``listener(loaded_names)`` after each `/api/ps` refresh."""
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _index(items: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        index = {}
+        for item in items:
+            name = item.get("name") or item.get("model")
+            if name:
+                index[_model_key(name)] = item
+        return index
+
+    def stale(self) -> bool:
+        """Whether `/api/tags` has never been fetched or is older than ``ttl``."""
+        return self.tags_at is None or time.monotonic() - self.tags_at >= self.ttl
+
+    async def refresh(self, *, tags: Optional[bool] = None) -> None:
+        """Refresh loaded models, and pulled models when stale (or ``tags`` is True)."""
+        if tags is None:
+            tags = self.stale()
+        if tags:
+            try:
+                self.pulled = self._index(await self.ollama.tags())
+                self.tags_at = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failures += 1
+                self.logger.debug("Failed to refresh pulled models", exc_info=True)
+        try:
+            self.loaded = self._index(await self.ollama.ps())
+            self.ps_at = time.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failures += 1
+            self.logger.debug("Failed to refresh loaded models", exc_info=True)
+        else:
+            names = [item.get("name") or item.get("model") or "" for item in self.loaded.values()]
+            for listener in self._listeners:
+                try:
+                    listener(names)
+                except Exception:
+                    self.logger.debug("Model catalogue listener failed", exc_info=True)
+        self.refreshes += 1
+
+    def refresh_soon(self) -> None:
+        """Start a background refresh if the catalogue is stale and none is running."""
+        if not self.stale() or (self._task is not None and not self._task.done()):
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self.refresh(tags=True))
+        except RuntimeError:
+            pass
+
+    async def run(self) -> None:
+        """Refresh every ``interval`` seconds until cancelled."""
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def is_pulled(self, model: str) -> Optional[bool]:
+        """Whether ``model`` is pulled on the server (None until `/api/tags` was fetched)."""
+        if self.tags_at is None:
+            return None
+        return _model_key(model) in self.pulled
+
+    def is_loaded(self, model: str) -> bool:
+        return _model_key(model) in self.loaded
+
+    def describe(self, model: str) -> Dict[str, Any]:
+        """Return the cached metadata of ``model``.
+
+        Returns:
+            Dict with ``pulled`` (None when unknown), ``loaded``, ``size``,
+            ``parameter_size``, ``quantization``, ``family`` and, when
+            loaded, ``size_vram`` and ``expires_at``.
+        """
+        key = _model_key(model)
+        entry = self.pulled.get(key) or {}
+        details = entry.get("details") or {}
+        running = self.loaded.get(key)
+        info: Dict[str, Any] = {
+            "pulled": self.is_pulled(model),
+            "loaded": running is not None,
+            "size": entry.get("size"),
+            "parameter_size": details.get("parameter_size"),
+            "quantization": details.get("quantization_level"),
+            "family": details.get("family"),
+        }
+        if running is not None:
+            info["size_vram"] = running.get("size_vram")
+            info["expires_at"] = running.get("expires_at")
+        return info
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "pulled": len(self.pulled),
+            "loaded": len(self.loaded),
+            "age": now - self.tags_at if self.tags_at is not None else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
+
+
+__all__ = ["ModelCatalogue", "format_size"]
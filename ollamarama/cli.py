@@ -8,7 +8,7 @@ from typing import List, Optional
 
 from .logging_conf import setup_logging
 import asyncio
-from .config import load_config, validate_config, summarize
+from .config import load_config, ollama_base_urls, validate_config, summarize
 from .app import run as run_app
 
 
@@ -103,7 +103,7 @@ def main(argv: Optional[List[str]] = None) -> int:
         try:
             from .ollama_client import OllamaClient
 
-            client = OllamaClient(base_url=cfg.ollama.api_url.rsplit("/", 1)[0], timeout=cfg.ollama.timeout)
+            client = OllamaClient(base_url=ollama_base_urls(cfg.ollama)[0], timeout=cfg.ollama.timeout)
             models = client.list_models()
             if models:
                 cfg.ollama.models = models
@@ -0,0 +1,135 @@
+"""Background summarisation of trimmed conversation turns."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .history import HistoryStore
+from .ollama_pool import conversation_key
+from .reasoning import split_reasoning
+
+_INSTRUCTIONS = (
+    "You maintain a running summary of a chat so it can continue without its older messages. "
+    "Merge the previous summary and the new messages into one short paragraph. Keep names, "
+    "facts, preferences, decisions and open questions; drop small talk. Reply with the summary only."
+)
+
+
+class HistoryCompactor:
+    """Fold turns trimmed from history into a running summary.
+
+    Hooked up as the history's ``on_evict`` callback. Work is queued per
+    conversation and done by one background task, which waits until the
+    scheduler has no queued generations (up to ``max_idle_wait`` seconds) so
+    summaries never delay user replies, then asks ``model`` (a cheaper model,
+    or the active one) for an updated summary. Turns whose summary fails
+    are kept for the next attempt.
+    """
+
+    def __init__(
+        self,
+        history: HistoryStore,
+        ollama: Any,
+        *,
+        model: Callable[[], str],
+        options: Optional[Dict[str, Any]] = None,
+        scheduler: Any = None,
+        max_idle_wait: float = 60.0,
+        max_chars: int = 1200,
+    ) -> None:
+        self.history = history
+        self.ollama = ollama
+        self.model = model
+        self.options = dict(options or {})
+        self.scheduler = scheduler
+        self.max_idle_wait = float(max_idle_wait)
+        self.max_chars = int(max_chars)
+        self.compactions = 0
+        self._pending: Dict[Tuple[str, str], None] = {}
+        self._task: Optional[asyncio.Task] = None  # type: ignore[type-arg]
+        self.logger = logging.getLogger(__name__)
+
+    def schedule(self, room: str, user: str) -> None:
+        """Queue a conversation for summarisation (`HistoryStore.on_evict` hook)."""
+        self._pending[(room, user)] = None
+        if self._task is None or self._task.done():
+            try:
+                self._task = asyncio.get_running_loop().create_task(self._run())
+            except RuntimeError:
+                # No loop (e.g. synchronous use); the turns wait for the next eviction
+                pass
+
+    async def _run(self) -> None:
+        # The task inherits the context of the request that scheduled it;
+        # summaries are not that user's usage
+        conversation_key.set(None)
+        while self._pending:
+            await self._wait_for_idle()
+            room, user = next(iter(self._pending))
+            del self._pending[(room, user)]
+            try:
+                await self.compact(room, user)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.logger.warning("Failed to summarise history for %s in %s", user, room, exc_info=True)
+
+    async def _wait_for_idle(self) -> None:
+        if self.scheduler is None:
+            return
+        deadline = time.monotonic() + self.max_idle_wait
+        while self.scheduler.pending() and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+
+    async def compact(self, room: str, user: str) -> bool:
+        """Summarise the turns trimmed from one conversation.
+
+        Returns:
+            True if a new summary was stored.
+        """
+        evicted = self.history.take_evicted(room, user)
+        if not evicted:
+            return False
+        epoch = self.history.epoch(room, user)
+        previous = self.history.summary(room, user) or "(none)"
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in evicted)
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": _INSTRUCTIONS},
+            {"role": "user", "content": f"Previous summary:\n{previous}\n\nNew messages:\n{transcript}"},
+        ]
+        model = self.model()
+        try:
+            if self.scheduler is not None:
+                async with self.scheduler.slot(model, room, "summary"):
+                    data = await self.ollama.chat(messages=messages, model=model, options=self.options)
+            else:
+                data = await self.ollama.chat(messages=messages, model=model, options=self.options)
+        except BaseException:
+            # Keep the turns for the next attempt
+            self.history.restore_evicted(room, user, evicted, epoch)
+            raise
+        summary, _ = split_reasoning((data.get("message") or {}).get("content", "") or "")
+        if not summary:
+            self.history.restore_evicted(room, user, evicted, epoch)
+            return False
+        stored = self.history.set_summary(room, user, summary[: self.max_chars], epoch)
+        if stored:
+            self.compactions += 1
+            self.logger.debug("Summarised %d trimmed message(s) for %s in %s", len(evicted), user, room)
+        return stored
+
+    async def close(self) -> None:
+        """Cancel pending summarisation."""
+        self._pending.clear()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+__all__ = ["HistoryCompactor"]
@@ -4,7 +4,7 @@ import json
 import os
 import re
 from dataclasses import dataclass, field, asdict
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional, Union
 
 
 @dataclass
@@ -21,18 +21,111 @@ class MatrixConfig:
 
 @dataclass
 class OllamaConfig:
-    api_url: str = "http://localhost:11434/api/chat"
+    # A single chat endpoint, or a list of endpoints to balance across
+    api_url: Union[str, List[str]] = "http://localhost:11434/api/chat"
     options: Dict[str, Any] = field(default_factory=dict)
     models: Dict[str, str] = field(default_factory=dict)
     default_model: str = ""
     prompt: List[str] = field(default_factory=lambda: ["you are ", "."]) 
     personality: str = ""
     history_size: int = 24
+    # Trim history in blocks of this many messages so the prompt prefix stays cacheable (0 trims one at a time)
+    history_trim_block: int = 0
+    # Prime the server's prompt cache when .persona, .custom or .reset sets a system prompt
+    prewarm_prompts: bool = False
+    # Summarise trimmed turns into a running summary, in the background, optionally on a cheaper model
+    summarize_history: bool = False
+    summary_model: str = ""
+    # Context window (num_ctx) per model by key or id; history is trimmed to fit it
+    model_num_ctx: Dict[str, int] = field(default_factory=dict)
+    # Size num_ctx per request from the prompt, in buckets, up to num_ctx/model_num_ctx
+    adaptive_num_ctx: bool = False
+    num_ctx_buckets: List[int] = field(default_factory=list)
     timeout: int = 180
+    # Maximum generation requests in flight against the Ollama server
+    max_concurrency: int = 8
+    # Generations run at once per model (match OLLAMA_NUM_PARALLEL); per-model overrides by key or id
+    num_parallel: int = 4
+    model_parallel: Dict[str, int] = field(default_factory=dict)
+    # Drain one model's queue before switching to a model that must be loaded
+    model_batching: bool = False
+    model_batch_max_wait: float = 30.0
+    # Relative share of generation slots per room ID (default 1.0)
+    room_weights: Dict[str, float] = field(default_factory=dict)
+    # Load shedding tiers ({"pending", "wait", "num_predict", "model"}), applied as the queue
+    # grows; refuse new generations past the reject thresholds (0 disables)
+    load_shedding: List[Dict[str, Any]] = field(default_factory=list)
+    load_shedding_reject_pending: int = 0
+    load_shedding_reject_wait: float = 0.0
+    # Route simple `.ai` requests to a fast model (key or id; empty disables); requests with code,
+    # over route_max_chars or likely tool use go to the active model; unclear ones to the
+    # optional tiny classifier model
+    route_fast_model: str = ""
+    route_max_chars: int = 280
+    route_classifier_model: str = ""
+    # Lighter models (keys or ids) to retry on, once, when a model times out, fails with 5xx or
+    # runs out of memory; fallback_timeout shortens the wait for models that have a fallback
+    model_fallbacks: Dict[str, List[str]] = field(default_factory=dict)
+    fallback_timeout: float = 0.0
+    # Load the active model at startup and on `.model`; keep_alive sent with requests
+    # (server default if unset), optionally per model by key or id
+    preload: bool = True
+    keep_alive: Optional[Union[str, int]] = None
+    model_keep_alive: Dict[str, Union[str, int]] = field(default_factory=dict)
+    # Unload models other than the active one after this many idle seconds (0 disables)
+    idle_unload: float = 0.0
+    # Cached catalogue of pulled (`/api/tags`, refetched after the ttl) and loaded (`/api/ps`,
+    # polled every interval) models, used by `.model` and the scheduler
+    model_catalogue_ttl: float = 60.0
+    model_catalogue_interval: float = 10.0
+    # Share one upstream call between identical in-flight requests
+    coalesce_requests: bool = True
+    # Serve repeated requests with temperature 0 from an exact-match cache
+    response_cache: bool = False
+    response_cache_ttl: float = 600.0
+    response_cache_max_bytes: int = 8_000_000
+    # Answer paraphrased questions from earlier replies (needs numpy and an embedding model)
+    semantic_cache: bool = False
+    semantic_cache_embed_model: str = ""
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_entries: int = 2048
+    # Retry chat requests that fail to connect, with jittered exponential backoff
+    retries: int = 2
+    retry_backoff: float = 0.5
+    # Derive per-model timeouts from observed latency (percentile x multiplier, >= floor, <= timeout)
+    adaptive_timeout: bool = False
+    adaptive_timeout_percentile: float = 0.95
+    adaptive_timeout_multiplier: float = 3.0
+    adaptive_timeout_floor: float = 60.0
+    # Refuse requests for circuit_breaker_cooldown seconds after this many consecutive failures (0 disables)
+    circuit_breaker_failures: int = 5
+    circuit_breaker_cooldown: float = 30.0
+    # Seconds between background health probes when several backends are configured
+    health_check_interval: float = 15.0
+    # With several backends, resend slow requests to a second backend after the
+    # hedge_percentile latency (>= hedge_min_delay seconds); the first answer wins
+    hedge_requests: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_delay: float = 2.0
     mcp_servers: Dict[str, Any] = field(default_factory=dict)
     # When True, omit the optional brevity clause (third prompt element) from new conversations
     verbose: bool = False
     thinking: bool = True
+    # Native reasoning control sent as Ollama's `think` (true/false/"low"/"medium"/"high");
+    # unset leaves the model default. Per-model overrides by key or id
+    think: Optional[Union[bool, str]] = None
+    model_think: Dict[str, Union[bool, str]] = field(default_factory=dict)
+    # Stream tokens into the placeholder message, editing at most once per interval (seconds)
+    stream: bool = False
+    stream_edit_interval: float = 1.0
+    # Token-bucket quotas on prompt + generated tokens: capacity and refill per minute,
+    # per user and per room (capacity 0 disables); admins are exempt
+    user_token_quota: int = 0
+    user_token_refill: float = 0.0
+    room_token_quota: int = 0
+    room_token_refill: float = 0.0
+    # Merge `.ai` messages a user sends within this many seconds into one turn (0 disables)
+    debounce: float = 0.0
 
 
 @dataclass
@@ -63,6 +156,11 @@ def _deep_update(base: dict, updates: dict) -> dict:
     return base
 
 
+def _valid_num_ctx(value: Any) -> bool:
+    """Return True if ``value`` is an integer context size Ollama accepts."""
+    return isinstance(value, int) and not isinstance(value, bool) and 256 <= value <= 1048576
+
+
 def _asdict_redacted(cfg: AppConfig) -> dict:
     """Convert config to a dictionary with sensitive fields redacted.
 
@@ -114,7 +212,11 @@ def load_config(
     # Apply ENV overrides (selected keys only to avoid surprises)
     env_over = {}
     if env.get("OLLAMARAMA_OLLAMA_URL"):
-        env_over.setdefault("ollama", {})["api_url"] = env["OLLAMARAMA_OLLAMA_URL"]
+        url = env["OLLAMARAMA_OLLAMA_URL"]
+        # Comma-separated values configure several backends
+        env_over.setdefault("ollama", {})["api_url"] = (
+            [u.strip() for u in url.split(",") if u.strip()] if "," in url else url
+        )
     if env.get("OLLAMARAMA_MODEL"):
         env_over.setdefault("ollama", {})["default_model"] = env["OLLAMARAMA_MODEL"]
     if env.get("OLLAMARAMA_STORE_PATH"):
@@ -143,6 +245,9 @@ def load_config(
 
     matrix = raw.get("matrix", {})
     ollama = raw.get("ollama", {})
+    api_url = ollama.get("api_url", "http://localhost:11434/api/chat")
+    if isinstance(api_url, list):
+        api_url = list(api_url)
 
     app_cfg = AppConfig(
         matrix=MatrixConfig(
@@ -156,17 +261,77 @@ def load_config(
             e2e=bool(matrix.get("e2e", True)),
         ),
         ollama=OllamaConfig(
-            api_url=ollama.get("api_url", "http://localhost:11434/api/chat"),
+            api_url=api_url,
             options=dict(ollama.get("options", {})),
             models=dict(ollama.get("models", {})),
             default_model=ollama.get("default_model", ""),
             prompt=list(ollama.get("prompt", ["you are ", "."])) ,
             personality=ollama.get("personality", ""),
             history_size=int(ollama.get("history_size", 24)),
-            timeout=360,
+            history_trim_block=int(ollama.get("history_trim_block", 0)),
+            prewarm_prompts=bool(ollama.get("prewarm_prompts", False)),
+            summarize_history=bool(ollama.get("summarize_history", False)),
+            summary_model=str(ollama.get("summary_model", "") or ""),
+            # Kept as given; validate_config reports values that are not integers
+            model_num_ctx={str(k): v for k, v in dict(ollama.get("model_num_ctx", {})).items()},
+            adaptive_num_ctx=bool(ollama.get("adaptive_num_ctx", False)),
+            num_ctx_buckets=list(ollama.get("num_ctx_buckets") or []),
+            timeout=int(ollama.get("timeout", 360)),
+            max_concurrency=int(ollama.get("max_concurrency", 8)),
+            num_parallel=int(ollama.get("num_parallel", 4)),
+            model_parallel={str(k): int(v) for k, v in dict(ollama.get("model_parallel", {})).items()},
+            room_weights={str(k): float(v) for k, v in dict(ollama.get("room_weights", {})).items()},
+            load_shedding=[dict(t) for t in ollama.get("load_shedding", [])],
+            load_shedding_reject_pending=int(ollama.get("load_shedding_reject_pending", 0)),
+            load_shedding_reject_wait=float(ollama.get("load_shedding_reject_wait", 0.0)),
+            route_fast_model=str(ollama.get("route_fast_model", "") or ""),
+            route_max_chars=int(ollama.get("route_max_chars", 280)),
+            route_classifier_model=str(ollama.get("route_classifier_model", "") or ""),
+            model_fallbacks={
+                str(k): [str(m) for m in ([v] if isinstance(v, str) else v)]
+                for k, v in dict(ollama.get("model_fallbacks", {})).items()
+            },
+            fallback_timeout=float(ollama.get("fallback_timeout", 0.0)),
+            model_batching=bool(ollama.get("model_batching", False)),
+            model_batch_max_wait=float(ollama.get("model_batch_max_wait", 30.0)),
+            preload=bool(ollama.get("preload", True)),
+            keep_alive=ollama.get("keep_alive"),
+            model_keep_alive=dict(ollama.get("model_keep_alive", {})),
+            idle_unload=float(ollama.get("idle_unload", 0.0)),
+            model_catalogue_ttl=float(ollama.get("model_catalogue_ttl", 60.0)),
+            model_catalogue_interval=float(ollama.get("model_catalogue_interval", 10.0)),
+            coalesce_requests=bool(ollama.get("coalesce_requests", True)),
+            response_cache=bool(ollama.get("response_cache", False)),
+            response_cache_ttl=float(ollama.get("response_cache_ttl", 600.0)),
+            response_cache_max_bytes=int(ollama.get("response_cache_max_bytes", 8_000_000)),
+            semantic_cache=bool(ollama.get("semantic_cache", False)),
+            semantic_cache_embed_model=str(ollama.get("semantic_cache_embed_model", "")),
+            semantic_cache_threshold=float(ollama.get("semantic_cache_threshold", 0.92)),
+            semantic_cache_max_entries=int(ollama.get("semantic_cache_max_entries", 2048)),
+            retries=int(ollama.get("retries", 2)),
+            retry_backoff=float(ollama.get("retry_backoff", 0.5)),
+            adaptive_timeout=bool(ollama.get("adaptive_timeout", False)),
+            adaptive_timeout_percentile=float(ollama.get("adaptive_timeout_percentile", 0.95)),
+            adaptive_timeout_multiplier=float(ollama.get("adaptive_timeout_multiplier", 3.0)),
+            adaptive_timeout_floor=float(ollama.get("adaptive_timeout_floor", 60.0)),
+            circuit_breaker_failures=int(ollama.get("circuit_breaker_failures", 5)),
+            circuit_breaker_cooldown=float(ollama.get("circuit_breaker_cooldown", 30.0)),
+            health_check_interval=float(ollama.get("health_check_interval", 15.0)),
+            hedge_requests=bool(ollama.get("hedge_requests", False)),
+            hedge_percentile=float(ollama.get("hedge_percentile", 0.95)),
+            hedge_min_delay=float(ollama.get("hedge_min_delay", 2.0)),
             mcp_servers=dict(ollama.get("mcp_servers", {})),
             verbose=bool(ollama.get("verbose", False)),
             thinking=bool(ollama.get("thinking", True)),
+            think=ollama.get("think"),
+            model_think=dict(ollama.get("model_think", {})),
+            stream=bool(ollama.get("stream", False)),
+            stream_edit_interval=float(ollama.get("stream_edit_interval", 1.0)),
+            user_token_quota=int(ollama.get("user_token_quota", 0)),
+            user_token_refill=float(ollama.get("user_token_refill", 0.0)),
+            room_token_quota=int(ollama.get("room_token_quota", 0)),
+            room_token_refill=float(ollama.get("room_token_refill", 0.0)),
+            debounce=float(ollama.get("debounce", 0.0)),
         ),
         markdown=bool(raw.get("markdown", True)),
     )
@@ -209,8 +374,9 @@ def validate_config(cfg: AppConfig) -> Tuple[bool, List[str]]:
         errors.append("matrix.e2e must be a boolean")
 
     # Ollama
-    if not cfg.ollama.api_url or not _URL_RE.search(cfg.ollama.api_url):
-        errors.append("ollama.api_url must be a valid http(s) URL")
+    urls = cfg.ollama.api_url if isinstance(cfg.ollama.api_url, list) else [cfg.ollama.api_url]
+    if not urls or not all(isinstance(u, str) and _URL_RE.search(u) for u in urls):
+        errors.append("ollama.api_url must be a valid http(s) URL or a non-empty list of them")
     if not isinstance(cfg.ollama.models, dict):
         errors.append("ollama.models must be a mapping of name→id")
     if not isinstance(cfg.ollama.default_model, str) or not cfg.ollama.default_model:
@@ -237,6 +403,8 @@ def validate_config(cfg: AppConfig) -> Tuple[bool, List[str]]:
         errors.append("ollama.personality must be a non-empty string")
     if not (1 <= cfg.ollama.history_size <= 1000):
         errors.append("ollama.history_size must be between 1 and 1000")
+    if not (0 <= cfg.ollama.history_trim_block < cfg.ollama.history_size):
+        errors.append("ollama.history_trim_block must be between 0 and history_size - 1")
 
     # Options ranges (if present)
     opts = cfg.ollama.options or {}
@@ -251,11 +419,116 @@ def validate_config(cfg: AppConfig) -> Tuple[bool, List[str]]:
         errors.append("ollama.options.repeat_penalty must be between 0.5 and 2")
     if not isinstance(cfg.ollama.mcp_servers, dict):
         errors.append("ollama.mcp_servers must be a mapping if provided")
+    num_ctx = opts.get("num_ctx")
+    if num_ctx is not None and not _valid_num_ctx(num_ctx):
+        errors.append("ollama.options.num_ctx must be an integer between 256 and 1048576")
+    if not all(_valid_num_ctx(n) for n in cfg.ollama.model_num_ctx.values()):
+        errors.append("ollama.model_num_ctx values must be integers between 256 and 1048576")
+    if not all(_valid_num_ctx(n) for n in cfg.ollama.num_ctx_buckets):
+        errors.append("ollama.num_ctx_buckets values must be integers between 256 and 1048576")
+    if not (1 <= cfg.ollama.max_concurrency <= 256):
+        errors.append("ollama.max_concurrency must be between 1 and 256")
+    if not (1 <= cfg.ollama.num_parallel <= 64):
+        errors.append("ollama.num_parallel must be between 1 and 64")
+    if any(not (1 <= n <= 64) for n in cfg.ollama.model_parallel.values()):
+        errors.append("ollama.model_parallel values must be between 1 and 64")
+    if any(w <= 0 for w in cfg.ollama.room_weights.values()):
+        errors.append("ollama.room_weights values must be positive")
+    for tier in cfg.ollama.load_shedding:
+        if not (tier.get("pending") or tier.get("wait")):
+            errors.append("ollama.load_shedding tiers need a positive pending or wait threshold")
+        elif tier.get("num_predict") is not None and not (1 <= int(tier["num_predict"]) <= 1_000_000):
+            errors.append("ollama.load_shedding num_predict must be between 1 and 1000000")
+        elif tier.get("model") and tier["model"] not in cfg.ollama.models and tier["model"] not in cfg.ollama.models.values():
+            errors.append(f"ollama.load_shedding model '{tier['model']}' is not in ollama.models")
+    fast = cfg.ollama.route_fast_model
+    if fast and fast not in cfg.ollama.models and fast not in cfg.ollama.models.values():
+        errors.append(f"ollama.route_fast_model '{fast}' is not in ollama.models")
+    known = set(cfg.ollama.models) | set(cfg.ollama.models.values())
+    for model, chain in cfg.ollama.model_fallbacks.items():
+        for name in [model, *chain]:
+            if name not in known:
+                errors.append(f"ollama.model_fallbacks model '{name}' is not in ollama.models")
+    if cfg.ollama.fallback_timeout < 0:
+        errors.append("ollama.fallback_timeout must not be negative")
+    if cfg.ollama.route_max_chars < 1:
+        errors.append("ollama.route_max_chars must be positive")
+    if cfg.ollama.load_shedding_reject_pending < 0 or cfg.ollama.load_shedding_reject_wait < 0:
+        errors.append("ollama.load_shedding_reject_pending and load_shedding_reject_wait must not be negative")
+    if not (0 <= cfg.ollama.model_batch_max_wait <= 3600):
+        errors.append("ollama.model_batch_max_wait must be between 0 and 3600 seconds")
+    if not (0 <= cfg.ollama.idle_unload <= 86400):
+        errors.append("ollama.idle_unload must be between 0 and 86400 seconds")
+    if not (1 <= cfg.ollama.model_catalogue_ttl <= 86400):
+        errors.append("ollama.model_catalogue_ttl must be between 1 and 86400 seconds")
+    if not (1 <= cfg.ollama.model_catalogue_interval <= 3600):
+        errors.append("ollama.model_catalogue_interval must be between 1 and 3600 seconds")
+    if not (1 <= cfg.ollama.response_cache_ttl <= 604800):
+        errors.append("ollama.response_cache_ttl must be between 1 and 604800 seconds")
+    if not (1024 <= cfg.ollama.response_cache_max_bytes <= 4_000_000_000):
+        errors.append("ollama.response_cache_max_bytes must be between 1024 and 4000000000")
+    if cfg.ollama.semantic_cache and not cfg.ollama.semantic_cache_embed_model:
+        errors.append("ollama.semantic_cache_embed_model is required when semantic_cache is enabled")
+    if not (0 < cfg.ollama.semantic_cache_threshold <= 1):
+        errors.append("ollama.semantic_cache_threshold must be greater than 0 and at most 1")
+    if not (1 <= cfg.ollama.semantic_cache_max_entries <= 1_000_000):
+        errors.append("ollama.semantic_cache_max_entries must be between 1 and 1000000")
+    if not (1 <= cfg.ollama.timeout <= 86400):
+        errors.append("ollama.timeout must be between 1 and 86400 seconds")
+    if not (0 <= cfg.ollama.retries <= 10):
+        errors.append("ollama.retries must be between 0 and 10")
+    if not (0 <= cfg.ollama.retry_backoff <= 60):
+        errors.append("ollama.retry_backoff must be between 0 and 60 seconds")
+    if not (0.5 <= cfg.ollama.adaptive_timeout_percentile <= 1):
+        errors.append("ollama.adaptive_timeout_percentile must be between 0.5 and 1")
+    if not (1 <= cfg.ollama.adaptive_timeout_multiplier <= 100):
+        errors.append("ollama.adaptive_timeout_multiplier must be between 1 and 100")
+    if not (1 <= cfg.ollama.adaptive_timeout_floor <= 86400):
+        errors.append("ollama.adaptive_timeout_floor must be between 1 and 86400 seconds")
+    if not (0 <= cfg.ollama.circuit_breaker_failures <= 1000):
+        errors.append("ollama.circuit_breaker_failures must be between 0 and 1000")
+    if not (1 <= cfg.ollama.circuit_breaker_cooldown <= 3600):
+        errors.append("ollama.circuit_breaker_cooldown must be between 1 and 3600 seconds")
+    if not (1 <= cfg.ollama.health_check_interval <= 3600):
+        errors.append("ollama.health_check_interval must be between 1 and 3600 seconds")
+    if not (0.5 <= cfg.ollama.hedge_percentile <= 1):
+        errors.append("ollama.hedge_percentile must be between 0.5 and 1")
+    if not (0 <= cfg.ollama.hedge_min_delay <= 600):
+        errors.append("ollama.hedge_min_delay must be between 0 and 600 seconds")
+    think_values = [cfg.ollama.think, *cfg.ollama.model_think.values()]
+    if any(v is not None and not isinstance(v, bool) and v not in ("low", "medium", "high") for v in think_values):
+        errors.append('ollama.think and ollama.model_think values must be true, false, "low", "medium" or "high"')
+    if not (0.2 <= cfg.ollama.stream_edit_interval <= 30):
+        errors.append("ollama.stream_edit_interval must be between 0.2 and 30 seconds")
+    for scope in ("user", "room"):
+        quota = getattr(cfg.ollama, f"{scope}_token_quota")
+        refill = getattr(cfg.ollama, f"{scope}_token_refill")
+        if quota < 0:
+            errors.append(f"ollama.{scope}_token_quota must not be negative")
+        elif quota and refill <= 0:
+            errors.append(f"ollama.{scope}_token_refill must be positive when {scope}_token_quota is set")
+    if not (0 <= cfg.ollama.debounce <= 30):
+        errors.append("ollama.debounce must be between 0 and 30 seconds")
 
     ok = len(errors) == 0
     return ok, errors
 
 
+def ollama_base_urls(cfg: OllamaConfig) -> List[str]:
+    """Return the configured Ollama API base URLs.
+
+    Strips the trailing endpoint (e.g. ``/chat``) from each `api_url` entry.
+
+    Args:
+        cfg: Ollama configuration section.
+
+    Returns:
+        List of base URLs such as ``http://localhost:11434/api``.
+    """
+    urls = cfg.api_url if isinstance(cfg.api_url, list) else [cfg.api_url]
+    return [u.rsplit("/", 1)[0] for u in urls if isinstance(u, str) and u]
+
+
 def summarize(cfg: AppConfig) -> Dict[str, Any]:
     """Return a redacted summary dict suitable for printing.
 
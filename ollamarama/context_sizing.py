@@ -0,0 +1,103 @@
+"""Per-request context window (``num_ctx``) sizing from the prompt size."""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from .history import estimate_tokens
+
+DEFAULT_BUCKETS = [2048, 4096, 8192, 16384, 32768, 65536, 131072]
+
+# Room left for the reply when the request does not set num_predict
+_DEFAULT_REPLY_TOKENS = 1024
+# Headroom for the error of the ~4 characters per token estimate
+_ESTIMATE_MARGIN = 1.15
+
+
+class ContextSizer:
+    """Choose ``num_ctx`` for each chat request.
+
+    Ollama allocates KV memory for the whole context window, so a small
+    chat under a huge ``num_ctx`` wastes memory and time, while a small
+    window truncates long conversations. The window is the smallest of
+    ``buckets`` that holds the estimated prompt (messages and tool schemas)
+    plus the reply (``num_predict``, or 1024 tokens), capped at the model's
+    limit from ``model_max_ctx`` or ``max_ctx``.
+
+    Changing ``num_ctx`` makes the server reload the model, so windows come
+    in few sizes and only grow on demand: a model drops back to a smaller
+    window after ``shrink_after`` consecutive requests fit in it.
+    """
+
+    def __init__(
+        self,
+        *,
+        buckets: Optional[List[int]] = None,
+        max_ctx: Optional[int] = None,
+        model_max_ctx: Optional[Dict[str, int]] = None,
+        shrink_after: int = 20,
+    ) -> None:
+        self.buckets = sorted({int(b) for b in (buckets or DEFAULT_BUCKETS)})
+        self.max_ctx = int(max_ctx) if max_ctx else None
+        self.model_max_ctx = dict(model_max_ctx or {})
+        self.shrink_after = max(1, int(shrink_after))
+        self.counts: Dict[int, int] = {}
+        self._current: Dict[str, int] = {}
+        self._smaller_streak: Dict[str, int] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def limit_for(self, model: str) -> Optional[int]:
+        """Return the largest window allowed for ``model`` (None when unbounded)."""
+        return self.model_max_ctx.get(model, self.max_ctx)
+
+    def estimate(self, payload: Dict[str, Any]) -> int:
+        """Estimate the tokens a chat request needs, prompt and reply."""
+        prompt = sum(estimate_tokens(str(m.get("content") or "")) for m in payload.get("messages") or [])
+        if payload.get("tools"):
+            prompt += estimate_tokens(json.dumps(payload["tools"]))
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        reply = num_predict if isinstance(num_predict, int) and num_predict > 0 else _DEFAULT_REPLY_TOKENS
+        return int((prompt + reply) * _ESTIMATE_MARGIN)
+
+    def _fit(self, model: str, needed: int) -> int:
+        limit = self.limit_for(model)
+        size = next((b for b in self.buckets if b >= needed), self.buckets[-1])
+        return min(size, limit) if limit else size
+
+    def num_ctx_for(self, payload: Dict[str, Any]) -> Optional[int]:
+        """Return ``num_ctx`` for a request payload (the client's ``context_size`` hook).
+
+        Requests without messages (model loads) get the model's current
+        window, if it has one, so loading does not pick a different size.
+        """
+        model = payload.get("model", "")
+        current = self._current.get(model)
+        if "messages" not in payload:
+            return current
+        needed = self.estimate(payload)
+        size = self._fit(model, needed)
+        streak = 0
+        if current is not None and size < current:
+            streak = self._smaller_streak.get(model, 0) + 1
+            if streak < self.shrink_after:
+                size = current
+            else:
+                streak = 0
+        self._smaller_streak[model] = streak
+        if size != current:
+            self.logger.info(
+                "num_ctx for %s set to %d (~%d tokens needed, was %s)", model, size, needed, current or "unset"
+            )
+            self._current[model] = size
+        else:
+            self.logger.debug("num_ctx for %s stays %d (~%d tokens needed)", model, size, needed)
+        self.counts[size] = self.counts.get(size, 0) + 1
+        return size
+
+    def stats(self) -> Dict[str, Any]:
+        return {"current": dict(self._current), "counts": dict(self.counts)}
+
+
+__all__ = ["ContextSizer", "DEFAULT_BUCKETS"]
@@ -1,3 +1,8 @@
+from __future__ import annotations
+
+from typing import Optional
+
+
 class OllamaramaError(Exception):
     """Base error for Ollamarama components."""
 
@@ -7,7 +12,23 @@ class ConfigurationError(OllamaramaError):
 
 
 class NetworkError(OllamaramaError):
-    """HTTP or connection failure talking to external services."""
+    """HTTP or connection failure talking to external services.
+
+    Attributes:
+        status: HTTP status the server answered with, if it answered.
+    """
+
+    def __init__(self, message: str = "", status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class BackendBusy(NetworkError):
+    """Request refused without calling the backend because its circuit is open."""
+
+
+class BackendTimeout(NetworkError):
+    """Request to the backend timed out."""
 
 
 class AuthError(OllamaramaError):
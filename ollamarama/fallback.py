@@ -0,0 +1,143 @@
+"""Fallback to lighter models when a model times out, errors or runs out of memory."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .exceptions import BackendBusy, BackendTimeout, NetworkError
+from .resilience import CircuitBreaker
+
+T = TypeVar("T")
+
+_OOM_MARKERS = ("out of memory", "requires more system memory", "cudaMalloc", "insufficient memory")
+
+
+def is_fallback_error(exc: BaseException) -> bool:
+    """Whether a lighter model might succeed where ``exc`` failed.
+
+    True for timeouts, refused or unreachable backends, 5xx answers and
+    out-of-memory errors; False for other client errors (bad requests).
+    """
+    if isinstance(exc, (BackendTimeout, BackendBusy)):
+        return True
+    if not isinstance(exc, NetworkError):
+        return False
+    message = str(exc).lower()
+    if any(marker.lower() in message for marker in _OOM_MARKERS):
+        return True
+    return exc.status is None or exc.status >= 500
+
+
+class FallbackChain:
+    """Retry a failed generation once on a lighter model.
+
+    ``chains`` maps a model to the lighter models to fall back to, in order
+    of preference. Failures are counted per model, and each model has a
+    circuit breaker: after ``threshold`` consecutive failures (0 never),
+    requests skip it for ``cooldown`` seconds and go straight to its
+    fallback. A model's
+    first fallback whose breaker allows requests is used.
+
+    With ``timeout`` set, requests to a model that has a fallback give up
+    after that many seconds instead of the full request timeout.
+    """
+
+    def __init__(
+        self,
+        chains: Dict[str, List[str]],
+        *,
+        threshold: int = 5,
+        cooldown: float = 30.0,
+        timeout: float = 0.0,
+    ) -> None:
+        self.chains = {model: list(chain) for model, chain in chains.items() if chain}
+        self.threshold = int(threshold)
+        self.cooldown = float(cooldown)
+        self.timeout = float(timeout)
+        self.failures: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(threshold=self.threshold, cooldown=self.cooldown)
+        return breaker
+
+    def timeout_for(self, model: str, default: Optional[float]) -> Optional[float]:
+        """Return the request timeout for ``model``: shortened when it has a fallback."""
+        if self.timeout > 0 and model in self.chains:
+            return min(default, self.timeout) if default else self.timeout
+        return default
+
+    def fallback_for(self, model: str) -> Optional[str]:
+        """Return the first fallback of ``model`` that is not failing, if any."""
+        for candidate in self.chains.get(model, []):
+            if candidate != model and self._breaker(candidate).state != "open":
+                return candidate
+        return None
+
+    def _record(self, model: str, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            self._breaker(model).success()
+        elif is_fallback_error(exc):
+            self.failures[model] = self.failures.get(model, 0) + 1
+            if self.threshold > 0:
+                self._breaker(model).failure()
+        else:
+            # Bad requests and cancellations say nothing about the model; let the next request be the trial
+            self._breaker(model).release()
+
+    async def _attempt(self, model: str, attempt: Callable[[str], Awaitable[T]]) -> T:
+        """Run ``attempt(model)`` and record its outcome, however it ends."""
+        try:
+            result = await attempt(model)
+        except BaseException as exc:
+            self._record(model, exc)
+            raise
+        self._record(model, None)
+        return result
+
+    async def call(self, model: str, attempt: Callable[[str], Awaitable[T]]) -> Tuple[T, str]:
+        """Run ``attempt(model)``, falling back once to a lighter model on failure.
+
+        Returns:
+            Tuple of (result, model that produced it).
+
+        Raises:
+            Exception: The last failure when no fallback applies or it fails too.
+        """
+        target = model
+        lighter = self.fallback_for(model)
+        if lighter is not None and not self._breaker(model).allow():
+            self.logger.info("Skipping failing model %s; using %s", model, lighter)
+            self.fallbacks[model] = self.fallbacks.get(model, 0) + 1
+            target = lighter
+        try:
+            return await self._attempt(target, attempt), target
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            lighter = self.fallback_for(target) if target == model else None
+            if lighter is None or not is_fallback_error(exc):
+                raise
+            self.logger.warning("Model %s failed (%s); retrying on %s", target, exc, lighter)
+        self.fallbacks[model] = self.fallbacks.get(model, 0) + 1
+        return await self._attempt(lighter, attempt), lighter
+
+    def stats(self) -> Dict[str, Any]:
+        models = sorted(set(self.failures) | set(self.fallbacks))
+        return {
+            model: {
+                "failures": self.failures.get(model, 0),
+                "fallbacks": self.fallbacks.get(model, 0),
+                "state": self._breaker(model).state,
+            }
+            for model in models
+        }
+
+
+__all__ = ["FallbackChain", "is_fallback_error"]
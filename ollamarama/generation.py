@@ -0,0 +1,105 @@
+"""Per-request state for model generations."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass(eq=False)
+class Generation:
+    """State owned by a single in-flight generation.
+
+    The runtime creates one per generating command and passes it through the
+    handler, so concurrent generations in different rooms never share a
+    placeholder message or spinner.
+
+    Attributes:
+        room_id: Room the reply will be posted to.
+        user_id: Sender whose command started the generation.
+        placeholder_event_id: Event ID of the placeholder message to edit, if any.
+        partial_body: Partial reply last shown in the placeholder while streaming.
+        spinner_task: Task animating the placeholder, if any.
+        task: Task running the handler; cancel it to abort the generation.
+        model: Model to use instead of the active one (e.g. a lighter model under load).
+        options: Generation options merged over the configured ones.
+        route: Model route chosen by the complexity router (``fast``/``heavy``), if any.
+        started_at: Monotonic start time.
+        first_token_at: Monotonic time the first visible output was shown.
+        finished_at: Monotonic time the final reply was posted.
+    """
+
+    room_id: str
+    user_id: str
+    placeholder_event_id: Optional[str] = None
+    partial_body: Optional[str] = None
+    spinner_task: Optional[asyncio.Task] = None  # type: ignore[type-arg]
+    task: Optional[asyncio.Task] = None  # type: ignore[type-arg]
+    model: Optional[str] = None
+    options: Optional[Dict[str, Any]] = None
+    route: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    async def stop_spinner(self) -> None:
+        """Cancel the placeholder animation, if one is running."""
+        task = self.spinner_task
+        self.spinner_task = None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def mark_first_token(self) -> None:
+        """Record when output first became visible (first call wins)."""
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def mark_finished(self) -> None:
+        """Record completion; also counts as first output if none was streamed."""
+        self.mark_first_token()
+        self.finished_at = time.monotonic()
+
+    def resolve_model(self, default: str) -> str:
+        """Return the model this generation runs on."""
+        return self.model or default
+
+    def resolve_options(self, base: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return ``base`` options with this generation's overrides applied."""
+        if not self.options:
+            return base
+        return {**(base or {}), **self.options}
+
+    def cancel(self) -> bool:
+        """Cancel the running handler task.
+
+        Cancelling aborts the request to Ollama and releases the scheduler
+        slot; the runtime then cleans up the placeholder.
+
+        Returns:
+            True if a running task was cancelled.
+        """
+        if self.task is not None and not self.task.done():
+            return self.task.cancel()
+        return False
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from start until output first became visible."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds from start until completion (or now, if still running)."""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+
+__all__ = ["Generation"]
@@ -0,0 +1,113 @@
+"""Load shedding: shorter replies, lighter models or refusal under queue pressure."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .generation import Generation
+
+
+@dataclass(frozen=True)
+class ShedTier:
+    """One level of degradation.
+
+    A tier applies once ``pending`` generations are queued or the oldest has
+    waited ``wait`` seconds (a threshold of 0 is ignored).
+
+    Attributes:
+        pending: Queued generations at which the tier applies.
+        wait: Seconds the oldest queued generation has waited.
+        num_predict: Cap on generated tokens per reply, if set.
+        model: Lighter model to answer with instead, if set.
+    """
+
+    pending: int = 0
+    wait: float = 0.0
+    num_predict: Optional[int] = None
+    model: Optional[str] = None
+
+    def triggered(self, pending: int, wait: float) -> bool:
+        return (self.pending > 0 and pending >= self.pending) or (self.wait > 0 and wait >= self.wait)
+
+
+@dataclass(frozen=True)
+class ShedDecision:
+    """What the governor decided for one generation (tier 0 means no shedding)."""
+
+    tier: int = 0
+    num_predict: Optional[int] = None
+    model: Optional[str] = None
+    reject: bool = False
+
+
+class LoadGovernor:
+    """Degrade replies in tiers as the generation queue grows.
+
+    Watches the scheduler's queue depth and the wait of its oldest queued
+    generation. The most severe triggered tier caps ``num_predict`` and may
+    switch to a lighter model; past ``reject_pending`` queued generations
+    (or ``reject_wait`` seconds of waiting) new generations are refused.
+    """
+
+    def __init__(
+        self,
+        scheduler: Any,
+        tiers: List[ShedTier],
+        *,
+        reject_pending: int = 0,
+        reject_wait: float = 0.0,
+    ) -> None:
+        self.scheduler = scheduler
+        self.tiers = list(tiers)
+        self.reject_pending = int(reject_pending)
+        self.reject_wait = float(reject_wait)
+        self.counts: Dict[int, int] = {}
+        self.rejected = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tiers) or self.reject_pending > 0 or self.reject_wait > 0
+
+    def pressure(self) -> Tuple[int, float]:
+        """Return (queued generations, seconds the oldest has waited)."""
+        return self.scheduler.pending(), self.scheduler.oldest_wait()
+
+    def assess(self) -> ShedDecision:
+        """Decide how to serve the next generation under the current load."""
+        pending, wait = self.pressure()
+        if (self.reject_pending > 0 and pending >= self.reject_pending) or (
+            self.reject_wait > 0 and wait >= self.reject_wait
+        ):
+            self.rejected += 1
+            return ShedDecision(reject=True)
+        decision = ShedDecision()
+        for index, tier in enumerate(self.tiers, start=1):
+            if tier.triggered(pending, wait):
+                decision = ShedDecision(tier=index, num_predict=tier.num_predict, model=tier.model)
+        self.counts[decision.tier] = self.counts.get(decision.tier, 0) + 1
+        if decision.tier:
+            self.logger.debug("Load shedding tier %d (%d queued, oldest %.1fs)", decision.tier, pending, wait)
+        return decision
+
+    @staticmethod
+    def apply(decision: ShedDecision, generation: Generation, options: Optional[Dict[str, Any]]) -> None:
+        """Apply a decision's model and ``num_predict`` cap to ``generation``.
+
+        The cap never raises a smaller configured ``num_predict``.
+        """
+        if decision.model:
+            generation.model = decision.model
+        if decision.num_predict:
+            current = (options or {}).get("num_predict")
+            if not isinstance(current, int) or current < 0 or current > decision.num_predict:
+                generation.options = {**(generation.options or {}), "num_predict": decision.num_predict}
+
+    def stats(self) -> Dict[str, Any]:
+        pending, wait = self.pressure()
+        return {"pending": pending, "oldest_wait": wait, "tiers": dict(self.counts), "rejected": self.rejected}
+
+
+__all__ = ["LoadGovernor", "ShedDecision", "ShedTier"]
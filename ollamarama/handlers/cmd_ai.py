@@ -1,14 +1,29 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Dict, Optional
 
+from ..exceptions import BackendBusy
+from ..generation import Generation
+from ..reasoning import extract_reply, resolve_think, think_kwargs
 
-async def handle_ai(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+
+async def handle_ai(
+    ctx: Any,
+    room_id: str,
+    sender_id: str,
+    sender_display: str,
+    args: str,
+    generation: Optional[Generation] = None,
+) -> None:
     """Handle `.ai` command or bot mention.
 
     Uses conversation history and the configured model to generate a response
-    and sends it back to the room. Think/chain-of-thought markers are stripped
-    from output, but snippets may be logged for debugging.
+    and sends it back to the room. When streaming is enabled, partial output
+    grows the placeholder message as tokens arrive, with or without tools.
+    The room's or model's `think` setting is passed to Ollama; any reasoning
+    that is still produced is stripped from output and logged for debugging.
+    With a fallback chain configured, a request that times out or fails on
+    the server is retried once on a lighter model and the reply says so.
 
     Args:
         ctx: Application context providing `history`, `ollama`, `matrix`,
@@ -17,6 +32,8 @@ async def handle_ai(ctx: Any, room_id: str, sender_id: str, sender_display: str,
         sender_id: Fully qualified Matrix user ID of the sender.
         sender_display: Display name of the sender for user-friendly logging.
         args: Remainder of the message after the command prefix.
+        generation: Per-request state (placeholder, spinner, timings) created
+            by the runtime; a fresh one without a placeholder is used if omitted.
 
     Returns:
         None. Sends a response message to the room.
@@ -25,53 +42,97 @@ async def handle_ai(ctx: Any, room_id: str, sender_id: str, sender_display: str,
     matrix = ctx.matrix
     ollama = ctx.ollama
 
+    if generation is None:
+        generation = Generation(room_id, sender_id)
     if args:
         history.add(room_id, sender_id, "user", args)
-    messages = history.get(room_id, sender_id)
+    requested = generation.resolve_model(ctx.model)
+    options = generation.resolve_options(ctx.options)
+    fallback = getattr(ctx, "fallback", None)
 
-    try:
+    async def complete(model: str) -> Dict[str, Any]:
+        generation.model = model
+        messages = history.get(room_id, sender_id, model=model)
+        think = resolve_think(ctx, room_id, model)
+        timeout = fallback.timeout_for(model, ctx.timeout) if fallback is not None else ctx.timeout
         if getattr(ctx, "tools_enabled", False):
-            response_text = await ctx.to_thread(ctx.respond_with_tools, messages)
+            return {"message": {"content": await ctx.respond_with_tools(
+                messages,
+                model=model,
+                options=options,
+                timeout=timeout,
+                generation=generation,
+                header=f"**{sender_display}**:",
+                **think_kwargs(think),
+            )}}
+        if getattr(ctx, "stream", False):
+            return await ctx.stream_reply(
+                room_id,
+                f"**{sender_display}**:",
+                messages,
+                generation=generation,
+                timeout=timeout,
+                model=model,
+                options=options,
+                **think_kwargs(think),
+            )
+        return await ollama.chat(
+            messages=messages, model=model, options=options, timeout=timeout, **think_kwargs(think)
+        )
+
+    try:
+        if fallback is not None:
+            data, model = await fallback.call(requested, complete)
         else:
-            data = await ctx.to_thread(ollama.chat, messages=messages, model=ctx.model, options=ctx.options, timeout=ctx.timeout)
-            response_text = data.get("message", {}).get("content", "")
+            data, model = await complete(requested), requested
     except Exception as e:
+        body = "Backend busy, please try again shortly" if isinstance(e, BackendBusy) else "Something went wrong"
         try:
-            await ctx.send_response(room_id, "Something went wrong", html=ctx.render("Something went wrong"))
+            await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
             ctx.log(e)
         except Exception:
             pass
         return
-    # Strip think tags if present
-    if "</think>" in response_text and "<think>" in response_text:
-        try:
-            thinking, rest = response_text.split("</think>", 1)
-            thinking = thinking.replace("<think>", "").strip()
-            ctx.log(f"Model thinking for {sender_display} ({sender_id}): {thinking}")
-            response_text = rest
-        except Exception:
-            pass
-    if "<|begin_of_thought|>" in response_text and "<|end_of_thought|>" in response_text:
-        try:
-            parts = response_text.split("<|end_of_thought|>")
-            if len(parts) > 1:
-                thinking = parts[0].replace("<|begin_of_thought|>", "").replace("<|end_of_thought|>", "").strip()
-                ctx.log(f"Model thinking for {sender_display} ({sender_id}): {thinking}")
-                response_text = parts[1]
-        except Exception:
-            pass
-    if "<|begin_of_solution|>" in response_text and "<|end_of_solution|>" in response_text:
-        try:
-            response_text = response_text.split("<|begin_of_solution|>", 1)[1].split("<|end_of_solution|>", 1)[0].strip()
-        except Exception:
-            pass
+    response_text = extract_reply(
+        ctx,
+        data,
+        who=f"{sender_display} ({sender_id})",
+        model=model,
+        think=resolve_think(ctx, room_id, model),
+        elapsed=generation.elapsed,
+    )
 
     response_text = response_text.strip()
+    if not response_text:
+        # Neither post nor remember an empty turn
+        body = "No reply was generated, please try again"
+        ctx.log(f"Empty reply from {model} in {room_id}")
+        await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
+        return
     history.add(room_id, sender_id, "assistant", response_text)
     body = f"**{sender_display}**:\n{response_text}"
+    if model != requested:
+        # Keep the marker out of history so the conversation stays clean
+        body += f"\n\n*(answered by {model}: {requested} is unavailable)*"
     html = ctx.render(body)
     try:
         ctx.log(f"Sending response to {sender_display} in {room_id}: {body}")
     except Exception:
         pass
-    await ctx.send_response(room_id, body, html=html)
+    await ctx.send_response(room_id, body, html=html, generation=generation)
+
+
+async def handle_heavy(
+    ctx: Any,
+    room_id: str,
+    sender_id: str,
+    sender_display: str,
+    args: str,
+    generation: Optional[Generation] = None,
+) -> None:
+    """Handle `.heavy`: like `.ai`, but never routed to the fast model.
+
+    The runtime skips complexity routing for this command, so the reply
+    always comes from the active (heavy) model.
+    """
+    await handle_ai(ctx, room_id, sender_id, sender_display, args, generation=generation)
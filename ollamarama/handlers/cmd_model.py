@@ -1,6 +1,23 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from typing import Any, Dict, List
+
+from ..catalogue import format_size
+
+
+def _model_line(label: str, info: Dict[str, Any], current: bool) -> str:
+    """Format one model of the `.model` listing from its catalogue entry."""
+    meta: List[str] = [
+        m for m in (info.get("parameter_size"), info.get("quantization"), format_size(info.get("size"))) if m
+    ]
+    if info.get("pulled") is False:
+        meta.append("not pulled")
+    if info.get("loaded"):
+        vram = format_size(info.get("size_vram"))
+        meta.append(f"loaded, {vram} VRAM" if vram else "loaded")
+    line = f"- **{label}**" + (" (current)" if current else "")
+    return f"{line}: {', '.join(meta)}" if meta else line
 
 
 async def handle_model(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
@@ -8,13 +25,18 @@ async def handle_model(ctx: Any, room_id: str, sender_id: str, sender_display: s
 
     Usage: `.model [name|reset]`.
 
-    Without arguments, lists the current model and available model keys.
-    With `reset`, restores the default model. Otherwise sets the model to
-    the provided name or key.
+    Without arguments, lists the current model and the configured models
+    with their size, quantisation and whether they are pulled and loaded,
+    from the model catalogue (no request to the server). With `reset`,
+    restores the default model. Otherwise sets the model to the provided
+    name or key; a model the catalogue knows is not pulled is refused. When
+    a warm pool is available, the model is loaded in the background (so
+    other rooms are not held up) and switched to once loaded, with a reply
+    reporting the load time; if loading fails the current model is kept.
 
     Args:
         ctx: Application context providing `models`, `model`, `default_model`,
-            `render`, `matrix`, and `log`.
+            `render`, `matrix`, `log`, and optionally `catalogue` and `warm_pool`.
         room_id: Matrix room identifier where the command was received.
         sender_id: Fully qualified Matrix user ID of the sender.
         sender_display: Display name of the sender for logging.
@@ -24,6 +46,7 @@ async def handle_model(ctx: Any, room_id: str, sender_id: str, sender_display: s
         None. Sends a status message to the room.
     """
     arg = (args or "").strip()
+    catalogue = getattr(ctx, "catalogue", None)
     if not arg:
         # Show current model and available model keys (friendly names)
         keys = []
@@ -31,25 +54,67 @@ async def handle_model(ctx: Any, room_id: str, sender_id: str, sender_display: s
             keys = sorted(list(ctx.models)) if isinstance(ctx.models, dict) else sorted(list(ctx.models))
         except Exception:
             pass
-        body = f"**Current model**: {ctx.model}\n**Available models**: {', '.join(keys)}"
+        if catalogue is None:
+            body = f"**Current model**: {ctx.model}\n**Available models**: {', '.join(keys)}"
+        else:
+            catalogue.refresh_soon()
+            models = ctx.models if isinstance(ctx.models, dict) else {k: k for k in keys}
+            lines = [f"**Current model**: {ctx.model}", "**Available models**:"]
+            for key in keys:
+                name = models.get(key, key)
+                lines.append(_model_line(key, catalogue.describe(name), name == ctx.model))
+            if ctx.model not in models.values():
+                lines.append(_model_line(ctx.model, catalogue.describe(ctx.model), True))
+            if catalogue.is_pulled(ctx.model) is None:
+                lines.append("*(server model list not fetched yet)*")
+            body = "\n".join(lines)
         html = ctx.render(body)
         await ctx.matrix.send_text(room_id, body, html=html)
         return
     if arg == "reset":
-        ctx.model = ctx.default_model
-        ctx.log(f"Model set to {ctx.model}")
-
+        target = ctx.default_model
     else:
         # Allow key lookup if dict
+        target = arg
         try:
             if isinstance(ctx.models, dict) and arg in ctx.models:
-                ctx.model = ctx.models[arg]
-            else:
-                ctx.model = arg
+                target = ctx.models[arg]
         except Exception:
             pass
 
-    body = f"Model set to **{ctx.model}**"
+    if catalogue is not None and catalogue.is_pulled(target) is False:
+        body = f"**{target}** is not pulled on the server, keeping **{ctx.model}**"
+        ctx.log(body)
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+
+    # Load the model before switching so the next request does not pay for it
+    warm_pool = getattr(ctx, "warm_pool", None)
+    if warm_pool is None:
+        await _switch(ctx, room_id, target)
+        return
+    task = asyncio.get_running_loop().create_task(_load_and_switch(ctx, room_id, target, warm_pool))
+    pending = getattr(ctx, "_model_loads", None)
+    if pending is not None:
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+
+async def _load_and_switch(ctx: Any, room_id: str, target: str, warm_pool: Any) -> None:
+    """Load ``target`` on the server, then make it the active model."""
+    try:
+        seconds = await warm_pool.preload(target)
+    except Exception as e:
+        body = f"Failed to load **{target}**: {e}"
+        ctx.log(body)
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    await _switch(ctx, room_id, target, f" (loaded in {seconds:.1f}s)")
+
+
+async def _switch(ctx: Any, room_id: str, target: str, load_note: str = "") -> None:
+    ctx.model = target
+    body = f"Model set to **{ctx.model}**{load_note}"
     ctx.log(body)
     html = ctx.render(body)
     await ctx.matrix.send_text(room_id, body, html=html)
@@ -1,9 +1,20 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
+from ..exceptions import BackendBusy
+from ..generation import Generation
+from ..reasoning import extract_reply, resolve_think, think_kwargs
 
-async def handle_persona(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+
+async def handle_persona(
+    ctx: Any,
+    room_id: str,
+    sender_id: str,
+    sender_display: str,
+    args: str,
+    generation: Optional[Generation] = None,
+) -> None:
     """Set a persona for the conversation and introduce the bot.
 
     Initializes the system prompt using a persona appended to the configured
@@ -17,6 +28,7 @@ async def handle_persona(ctx: Any, room_id: str, sender_id: str, sender_display:
         sender_id: Fully qualified Matrix user ID of the sender.
         sender_display: Display name of the sender for logging.
         args: Persona text to append to the system prompt.
+        generation: Per-request state created by the runtime.
 
     Returns:
         None. Sends a response message to the room.
@@ -30,10 +42,17 @@ async def handle_persona(ctx: Any, room_id: str, sender_id: str, sender_display:
         pass
     # Introduce self to seed the conversation
     ctx.history.add(room_id, sender_id, "user", "introduce yourself")
-    await _respond(ctx, room_id, sender_id, sender_display)
+    await _respond(ctx, room_id, sender_id, sender_display, generation)
 
 
-async def handle_custom(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+async def handle_custom(
+    ctx: Any,
+    room_id: str,
+    sender_id: str,
+    sender_display: str,
+    args: str,
+    generation: Optional[Generation] = None,
+) -> None:
     """Set a fully custom system prompt and introduce the bot.
 
     Replaces the system prompt for this room/user with a custom string and
@@ -46,6 +65,7 @@ async def handle_custom(ctx: Any, room_id: str, sender_id: str, sender_display:
         sender_id: Fully qualified Matrix user ID of the sender.
         sender_display: Display name of the sender for logging.
         args: Custom system prompt. No action if empty.
+        generation: Per-request state created by the runtime.
 
     Returns:
         None. Sends a response message to the room.
@@ -59,63 +79,68 @@ async def handle_custom(ctx: Any, room_id: str, sender_id: str, sender_display:
     except Exception:
         pass
     ctx.history.add(room_id, sender_id, "user", "introduce yourself")
-    await _respond(ctx, room_id, sender_id, sender_display)
+    await _respond(ctx, room_id, sender_id, sender_display, generation)
 
 
-async def _respond(ctx: Any, room_id: str, user_id: str, header_display: str) -> None:
+async def _respond(
+    ctx: Any, room_id: str, user_id: str, header_display: str, generation: Optional[Generation] = None
+) -> None:
     """Helper to query the model and post a response.
 
-    Fetches history for the given room/user, invokes the model in a worker
-    thread, strips any think markers from the reply, updates history, and
-    sends the formatted response.
+    Fetches history for the given room/user, awaits the model (or streams it
+    into the placeholder when enabled), strips any think markers from the
+    reply, updates history, and sends the formatted response.
 
     Args:
         ctx: Application context used to access history, model, and Matrix I/O.
         room_id: Matrix room identifier of the conversation.
         user_id: Target user whose history is being extended.
         header_display: Display name used in the message header.
+        generation: Per-request state owning the placeholder, if any.
 
     Returns:
         None. Messages are sent via the Matrix client.
     """
-    messages = ctx.history.get(room_id, user_id)
+    if generation is None:
+        generation = Generation(room_id, user_id)
+    model = generation.resolve_model(ctx.model)
+    options = generation.resolve_options(ctx.options)
+    messages = ctx.history.get(room_id, user_id, model=model)
+    think = resolve_think(ctx, room_id, model)
     try:
-        data = await ctx.to_thread(
-            ctx.ollama.chat, messages=messages, model=ctx.model, options=ctx.options, timeout=ctx.timeout
-        )
+        if getattr(ctx, "stream", False):
+            data = await ctx.stream_reply(
+                room_id,
+                f"**{header_display}**:",
+                messages,
+                generation=generation,
+                timeout=ctx.timeout,
+                model=model,
+                options=options,
+                **think_kwargs(think),
+            )
+        else:
+            data = await ctx.ollama.chat(
+                messages=messages, model=model, options=options, timeout=ctx.timeout, **think_kwargs(think)
+            )
     except Exception as e:
+        body = "Backend busy, please try again shortly" if isinstance(e, BackendBusy) else "Something went wrong"
         try:
-            await ctx.send_response(room_id, "Something went wrong", html=ctx.render("Something went wrong"))
+            await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
             ctx.log(e)
         except Exception:
             pass
         return
-    response_text = data.get("message", {}).get("content", "")
-    # Log any thinking markers and ALWAYS strip from output
-    if "</think>" in response_text and "<think>" in response_text:
-        try:
-            thinking, rest = response_text.split("</think>", 1)
-            thinking = thinking.replace("<think>", "").strip()
-            response_text = rest
-            try:
-                ctx.log(f"Model thinking for {header_display} ({user_id}): {thinking}")
-            except Exception:
-                pass
-        except Exception:
-            pass
-    if "<|begin_of_thought|>" in response_text and "<|end_of_thought|>" in response_text:
-        try:
-            parts = response_text.split("<|end_of_thought|>")
-            if len(parts) > 1:
-                thinking = parts[0].replace("<|begin_of_thought|>", "").replace("<|end_of_thought|>", "").strip()
-                response_text = parts[1]
-                try:
-                    ctx.log(f"Model thinking for {header_display} ({user_id}): {thinking}")
-                except Exception:
-                    pass
-        except Exception:
-            pass
+    response_text = extract_reply(
+        ctx, data, who=f"{header_display} ({user_id})", model=model, think=think, elapsed=generation.elapsed
+    )
     response_text = response_text.strip()
+    if not response_text:
+        # Neither post nor remember an empty turn
+        body = "No reply was generated, please try again"
+        ctx.log(f"Empty reply from {model} in {room_id}")
+        await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
+        return
     ctx.history.add(room_id, user_id, "assistant", response_text)
     body = f"**{header_display}**:\n{response_text}"
     html = ctx.render(body)
@@ -123,4 +148,4 @@ async def _respond(ctx: Any, room_id: str, user_id: str, header_display: str) ->
         ctx.log(f"Sending response to {header_display} in {room_id}: {body}")
     except Exception:
         pass
-    await ctx.send_response(room_id, body, html=html)
+    await ctx.send_response(room_id, body, html=html, generation=generation)
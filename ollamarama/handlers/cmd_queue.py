@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+async def handle_queue(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+    """Admin command to inspect the generation queue.
+
+    Usage: `.queue`.
+
+    Lists, per model, running and queued generations against the configured
+    concurrency cap along with recent wait times, plus load-shedding tier
+    counts when a governor is configured.
+    """
+    scheduler = getattr(ctx, "scheduler", None)
+    stats = scheduler.stats() if scheduler is not None else {}
+    if not stats:
+        body = "Generation queue is empty"
+    else:
+        lines = ["**Generation queue**"]
+        for model, st in sorted(stats.items()):
+            lines.append(
+                f"- **{model}**: {st['active']}/{st['limit']} running, {st['queued']} queued"
+                f" (oldest {st['oldest_wait']:.1f}s), avg wait {st['avg_wait']:.1f}s,"
+                f" max wait {st['max_wait']:.1f}s, {st['served']} served"
+            )
+        body = "\n".join(lines)
+    governor = getattr(ctx, "governor", None)
+    if governor is not None:
+        st = governor.stats()
+        tiers = ", ".join(f"tier {t}: {n}" for t, n in sorted(st["tiers"].items()) if t) or "none"
+        body += f"\n**Load shedding**: degraded replies ({tiers}), {st['rejected']} rejected"
+    html = ctx.render(body)
+    await ctx.matrix.send_text(room_id, body, html=html)
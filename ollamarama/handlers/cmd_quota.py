@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+async def handle_quota(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+    """Admin command to inspect and reset token quotas.
+
+    Usage: `.quota [users|rooms]` or `.quota reset <@user|!room|all>`.
+
+    Lists the most heavily used token buckets with their current level,
+    capacity, tokens consumed and time until they allow requests again.
+    `reset` refills the bucket for one user or room, or all of them.
+    """
+    quotas = getattr(ctx, "quotas", None)
+    if quotas is None:
+        body = "Token quotas are not enabled"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    parts = (args or "").split()
+    if parts and parts[0].lower() == "reset":
+        if len(parts) != 2:
+            body = "Usage: .quota reset <@user|!room|all>"
+        else:
+            target = parts[1]
+            count = quotas.reset(None if target.lower() == "all" else target)
+            body = f"Reset {count} quota bucket{'s' if count != 1 else ''}"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    scope = parts[0].lower() if parts else "users"
+    if scope not in ("users", "rooms"):
+        body = "Usage: .quota [users|rooms] | .quota reset <@user|!room|all>"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    snapshot = quotas.snapshot(scope[:-1])
+    if not snapshot:
+        body = f"No {scope[:-1]} quotas in use"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    lines = [f"**Token quotas by {scope[:-1]}**"]
+    ranked = sorted(snapshot.items(), key=lambda kv: kv[1]["level"] / kv[1]["capacity"])
+    for key, st in ranked[:10]:
+        line = f"- **{key}**: {max(0, int(st['level']))}/{int(st['capacity'])} left, {st['consumed']} used"
+        if st["wait"] > 0:
+            line += f", throttled for {st['wait']:.0f}s"
+        lines.append(line)
+    lines.append(f"{quotas.throttled} request{'s' if quotas.throttled != 1 else ''} throttled")
+    body = "\n".join(lines)
+    await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from typing import Any
+
+from ..reasoning import parse_think, resolve_think, think_label
+
+
+async def handle_reasoning(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+    """Admin command to view or change native reasoning for this room.
+
+    Usage: `.reasoning [on|off|low|medium|high|default]`.
+
+    Without arguments, shows the effective `think` setting for the room and
+    the current model, followed by average latency and discarded reasoning
+    tokens per model and setting so the effect of a change can be compared.
+    `default` removes the room override.
+    """
+    arg = (args or "").strip().lower()
+    if arg in ("", "status"):
+        think = resolve_think(ctx, room_id, ctx.model)
+        lines = [f"Reasoning for **{ctx.model}** in this room is **{think_label(think)}**"]
+        stats = getattr(ctx, "reasoning_stats", None)
+        summary = stats.summary() if stats is not None else {}
+        for (model, label), st in sorted(summary.items()):
+            lines.append(
+                f"- **{model}** ({label}): {st['replies']} replies, avg {st['avg_latency']:.1f}s,"
+                f" ~{st['avg_discarded_tokens']:.0f} reasoning tokens discarded"
+            )
+        body = "\n".join(lines)
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+
+    try:
+        think = parse_think(arg)
+    except ValueError:
+        body = "Usage: .reasoning [on|off|low|medium|high|default]"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+
+    rooms = getattr(ctx, "room_think", None)
+    if rooms is None:
+        rooms = ctx.room_think = {}
+    if think is None:
+        rooms.pop(room_id, None)
+    else:
+        rooms[room_id] = think
+    body = f"Reasoning for this room set to **{think_label(resolve_think(ctx, room_id, ctx.model))}**"
+    try:
+        ctx.log(body)
+    except Exception:
+        pass
+    await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
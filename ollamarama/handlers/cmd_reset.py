@@ -8,6 +8,8 @@ async def handle_reset(ctx: Any, room_id: str, sender_id: str, sender_display: s
 
     If the argument `stock` is provided, applies stock settings (no system
     prompt). Otherwise restores the default bot settings and system prompt.
+    The user's in-flight generations in the room are cancelled first. With
+    ``prewarm_prompts`` enabled, the restored system prompt is prewarmed.
 
     Args:
         ctx: Application context with `history`, `bot_id`, `render`, `matrix`,
@@ -21,7 +23,13 @@ async def handle_reset(ctx: Any, room_id: str, sender_id: str, sender_display: s
         None. Sends a confirmation message to the room.
     """
     stock = args.strip().lower() == "stock"
+    cancel = getattr(ctx, "cancel_generations", None)
+    if cancel is not None:
+        cancel(room_id, sender_id)
     ctx.history.reset(room_id, sender_id, stock=stock)
+    prewarm = getattr(ctx, "prewarm_prompt", None)
+    if prewarm is not None and not stock:
+        prewarm(room_id, sender_id)
     if stock:
         body = f"Stock settings applied for {sender_display}"
         try:
@@ -41,8 +49,8 @@ async def handle_reset(ctx: Any, room_id: str, sender_id: str, sender_display: s
 async def handle_clear(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
     """Admin: clear all histories and reset bot defaults.
 
-    Clears conversation history for all rooms/users and restores the default
-    model and personality.
+    Cancels every in-flight generation, clears conversation history for all
+    rooms/users and restores the default model and personality.
 
     Args:
         ctx: Application context with `history`, `render`, `matrix`, and `log`.
@@ -54,6 +62,9 @@ async def handle_clear(ctx: Any, room_id: str, sender_id: str, sender_display: s
     Returns:
         None. Sends a confirmation message to the room.
     """
+    cancel = getattr(ctx, "cancel_generations", None)
+    if cancel is not None:
+        cancel()
     ctx.history.clear_all()
     ctx.model = ctx.default_model
     ctx.personality = ctx.default_personality
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+async def handle_stop(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+    """Stop the sender's in-flight generations in the current room.
+
+    Usage: `.stop`.
+
+    Cancelling aborts the request to Ollama and frees its generation slot.
+    A placeholder that only showed the spinner is removed; a partially
+    streamed reply is kept and marked as stopped.
+    """
+    cancel = getattr(ctx, "cancel_generations", None)
+    stopped = cancel(room_id, sender_id) if cancel is not None else 0
+    if stopped:
+        body = f"Stopped generating for {sender_display}"
+        try:
+            ctx.log(f"Stopped {stopped} generation(s) for {sender_display} in {room_id}")
+        except Exception:
+            pass
+    else:
+        body = f"Nothing to stop for {sender_display}"
+    await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+async def handle_usage(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+    """Admin command to inspect token and timing accounting.
+
+    Usage: `.usage [models|rooms|users]`.
+
+    Defaults to per-model totals with rolling generation and prompt-eval
+    speeds, load counts, the conversations with the largest prompts, the
+    share and latency of fast and heavy routes, failures and fallbacks per
+    model, the adaptive ``num_ctx`` in use, how
+    much prompt evaluation the server's prefix cache saved, and request
+    coalescing, hedging, response cache and semantic cache counters when enabled.
+    `rooms` and `users` list the top consumers by tokens.
+    """
+    usage = getattr(ctx, "usage", None)
+    scope = (args or "").strip().lower() or "models"
+    if scope not in ("models", "rooms", "users"):
+        body = "Usage: .usage [models|rooms|users]"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+    snapshot = usage.snapshot(scope) if usage is not None else {}
+    if not snapshot:
+        body = "No usage recorded yet"
+        await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
+        return
+
+    lines = [f"**Usage by {scope[:-1]}**"]
+    ranked = sorted(snapshot.items(), key=lambda kv: kv[1]["prompt_tokens"] + kv[1]["completion_tokens"], reverse=True)
+    for key, st in ranked[:10]:
+        lines.append(
+            f"- **{key}**: {st['requests']} requests, {st['prompt_tokens']} prompt + {st['completion_tokens']}"
+            f" generated tokens, {st['tokens_per_second']:.1f} tok/s, prompt eval"
+            f" {st['prompt_tokens_per_second']:.0f} tok/s ({st['prompt_eval_seconds']:.1f}s total),"
+            f" avg prompt {st['avg_prompt_tokens']:.0f}, {st['loads']} loads ({st['load_seconds']:.1f}s)"
+        )
+    if scope == "models":
+        largest = usage.largest_prompts(5)
+        if largest:
+            lines.append("**Largest prompts**")
+            lines.extend(f"- {user} in {room}: {tokens} tokens" for (room, user), tokens in largest)
+        flights = getattr(getattr(ctx, "ollama", None), "flights", None)
+        if flights is not None:
+            st = flights.stats()
+            lines.append(
+                f"**Coalescing**: {st['followers']} duplicate requests shared {st['leaders']} upstream calls,"
+                f" {st['in_flight']} in flight"
+            )
+        cache = getattr(getattr(ctx, "ollama", None), "cache", None)
+        if cache is not None:
+            st = cache.stats()
+            lines.append(
+                f"**Response cache**: {st['hits']} hits, {st['misses']} misses ({st['hit_rate']:.0%}),"
+                f" {st['entries']} entries, {st['bytes'] / 1024:.0f} KiB"
+            )
+        hedge_stats = getattr(getattr(ctx, "ollama", None), "hedge_stats", None)
+        if callable(hedge_stats) and getattr(ctx.ollama, "hedge", False):
+            st = hedge_stats()
+            lines.append(
+                f"**Hedging**: {st['hedges']} of {st['requests']} requests hedged ({st['hedge_rate']:.0%}),"
+                f" {st['wins']} won by the second backend"
+            )
+        semantic = getattr(getattr(ctx, "ollama", None), "semantic_cache", None)
+        if semantic is not None:
+            st = semantic.stats()
+            lines.append(
+                f"**Semantic cache**: {st['hits']} hits, {st['misses']} misses ({st['hit_rate']:.0%}),"
+                f" {st['entries']} entries"
+            )
+        model_router = getattr(ctx, "model_router", None)
+        if model_router is not None:
+            st = model_router.stats()
+            routes = ", ".join(
+                f"{route} {r['share']:.0%} ({r['requests']}, avg {r['avg_latency']:.1f}s, p95 {r['p95_latency']:.1f}s)"
+                for route, r in st["routes"].items()
+            )
+            reasons = ", ".join(f"{k}: {n}" for k, n in sorted(st["reasons"].items())) or "none"
+            lines.append(f"**Routing**: {routes}; reasons {reasons}")
+        fallback = getattr(ctx, "fallback", None)
+        if fallback is not None and fallback.stats():
+            models = ", ".join(
+                f"{m} {st['failures']} failures, {st['fallbacks']} fallbacks ({st['state']})"
+                for m, st in fallback.stats().items()
+            )
+            lines.append(f"**Fallbacks**: {models}")
+        sizer = getattr(ctx, "context_sizer", None)
+        if sizer is not None and sizer.counts:
+            st = sizer.stats()
+            current = ", ".join(f"{m} {n}" for m, n in sorted(st["current"].items()))
+            counts = ", ".join(f"{n}: {c}" for n, c in sorted(st["counts"].items()))
+            lines.append(f"**Context sizes**: now {current}; requests per num_ctx {counts}")
+        prefix_cache = getattr(ctx, "prefix_cache", None)
+        if prefix_cache is not None and prefix_cache.stats()["requests"]:
+            st = prefix_cache.stats()
+            lines.append(
+                f"**Prompt prefix cache**: at least {st['saved_tokens']} of ~{st['estimated_tokens']} prompt tokens"
+                f" reused by the server ({st['saved_rate']:.0%}) over {st['requests']} requests"
+            )
+    body = "\n".join(lines)
+    await ctx.matrix.send_text(room_id, body, html=ctx.render(body))
@@ -1,9 +1,21 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
+from ..exceptions import BackendBusy
+from ..generation import Generation
+from ..ollama_pool import conversation_key
+from ..reasoning import extract_reply, resolve_think, think_kwargs
 
-async def handle_x(ctx: Any, room_id: str, sender_id: str, sender_display: str, args: str) -> None:
+
+async def handle_x(
+    ctx: Any,
+    room_id: str,
+    sender_id: str,
+    sender_display: str,
+    args: str,
+    generation: Optional[Generation] = None,
+) -> None:
     """Send a message on behalf of one user to another.
 
     Expects arguments in the form: `<target_display_name> <message>`. The
@@ -18,6 +30,8 @@ async def handle_x(ctx: Any, room_id: str, sender_id: str, sender_display: str,
         sender_id: Fully qualified Matrix user ID of the sender.
         sender_display: Display name of the sender for display in the reply.
         args: Target display name and message body.
+        generation: Per-request state (placeholder, spinner, timings) created
+            by the runtime.
 
     Returns:
         None. Sends a response message to the room if the target is resolved.
@@ -64,39 +78,49 @@ async def handle_x(ctx: Any, room_id: str, sender_id: str, sender_display: str,
     if not target_user or target_user not in room_hist:
         return
 
+    if generation is None:
+        generation = Generation(room_id, sender_id)
     ctx.history.add(room_id, target_user, "user", message)
+    # The target's conversation is the one being extended
+    conversation_key.set((room_id, target_user))
+    model = generation.resolve_model(ctx.model)
+    options = generation.resolve_options(ctx.options)
+    messages = ctx.history.get(room_id, target_user, model=model)
+    think = resolve_think(ctx, room_id, model)
     try:
-        data = await ctx.to_thread(
-            ctx.ollama.chat, messages=ctx.history.get(room_id, target_user), model=ctx.model, options=ctx.options, timeout=ctx.timeout
-        )
+        if getattr(ctx, "stream", False):
+            data = await ctx.stream_reply(
+                room_id,
+                f"**{sender_display}**:",
+                messages,
+                generation=generation,
+                timeout=ctx.timeout,
+                model=model,
+                options=options,
+                **think_kwargs(think),
+            )
+        else:
+            data = await ctx.ollama.chat(
+                messages=messages, model=model, options=options, timeout=ctx.timeout, **think_kwargs(think)
+            )
     except Exception as e:
+        body = "Backend busy, please try again shortly" if isinstance(e, BackendBusy) else "Something went wrong"
         try:
-            await ctx.send_response(room_id, "Something went wrong", html=ctx.render("Something went wrong"))
+            await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
             ctx.log(e)
         except Exception:
             pass
         return
-    response_text = data.get("message", {}).get("content", "")
-    # Log thinking markers
-    if "</think>" in response_text and "<think>" in response_text:
-        try:
-            thinking, rest = response_text.split("</think>", 1)
-            thinking = thinking.replace("<think>", "").strip()
-            # Use provided target display name if available
-            ctx.log(f"Model thinking for {target_display} ({target_user}): {thinking}")
-            response_text = rest
-        except Exception:
-            pass
-    if "<|begin_of_thought|>" in response_text and "<|end_of_thought|>" in response_text:
-        try:
-            parts = response_text.split("<|end_of_thought|>")
-            if len(parts) > 1:
-                thinking = parts[0].replace("<|begin_of_thought|>", "").replace("<|end_of_thought|>", "").strip()
-                ctx.log(f"Model thinking for {target_display} ({target_user}): {thinking}")
-                response_text = parts[1]
-        except Exception:
-            pass
+    response_text = extract_reply(
+        ctx, data, who=f"{target_display} ({target_user})", model=model, think=think, elapsed=generation.elapsed
+    )
     response_text = response_text.strip()
+    if not response_text:
+        # Neither post nor remember an empty turn
+        body = "No reply was generated, please try again"
+        ctx.log(f"Empty reply from {model} in {room_id}")
+        await ctx.send_response(room_id, body, html=ctx.render(body), generation=generation)
+        return
     ctx.history.add(room_id, target_user, "assistant", response_text)
     body = f"**{sender_display}**:\n{response_text}"
     html = ctx.render(body)
@@ -104,4 +128,4 @@ async def handle_x(ctx: Any, room_id: str, sender_id: str, sender_display: str,
         ctx.log(f"Sending response to {sender_display} in {room_id}: {body}")
     except Exception:
         pass
-    await ctx.send_response(room_id, body, html=html)
+    await ctx.send_response(room_id, body, html=html, generation=generation)
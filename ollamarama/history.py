@@ -1,10 +1,50 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Rough per-message overhead of the chat template (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(content: str) -> int:
+    """Cheaply estimate the tokens a message occupies in the prompt.
+
+    Uses the common ~4 characters per token heuristic plus a fixed
+    per-message overhead; close enough to budget context without a tokenizer.
+    """
+    return (len(content or "") + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def token_budget(num_ctx: int, num_predict: Optional[int] = None) -> int:
+    """Return the prompt token budget for a context window.
+
+    Leaves room for the reply: ``num_predict`` tokens when it is set to less
+    than half the window, otherwise a quarter of the window.
+    """
+    reserve = num_predict if num_predict and 0 < num_predict < num_ctx // 2 else num_ctx // 4
+    return num_ctx - reserve
 
 
 class HistoryStore:
-    """In-memory history per room and user with system prompt support."""
+    """In-memory history per room and user with system prompt support.
+
+    History is bounded by ``max_items`` messages and, when set, by an
+    estimated token budget: ``max_tokens`` for stored history, and
+    ``model_max_tokens`` per model for the prompt returned by `get`. Token
+    estimates are computed once per message and kept alongside it, with a
+    running total per conversation, so trimming never rescans history.
+
+    With ``on_evict`` set, trimmed messages are kept aside instead of being
+    dropped, and the callback is told which conversation has some; a
+    compactor can then `take_evicted` them and store a running summary with
+    `set_summary`. `get` places the summary right after the system prompt.
+
+    With ``trim_block`` set, trimming removes at least that many messages at
+    once (and never leaves the kept history starting on a reply), and the
+    token-budget window of `get` moves in steps of the same size. The prompt
+    prefix then stays identical for several turns, so the server can reuse
+    its cached evaluation of it instead of re-reading the whole context.
+    """
 
     def __init__(
         self,
@@ -14,6 +54,10 @@ class HistoryStore:
         *,
         prompt_suffix_extra: str = "",
         max_items: int = 24,
+        max_tokens: Optional[int] = None,
+        model_max_tokens: Optional[Dict[str, int]] = None,
+        on_evict: Optional[Callable[[str, str], None]] = None,
+        trim_block: int = 0,
     ) -> None:
         self.prompt_prefix = prompt_prefix
         self.prompt_suffix = prompt_suffix
@@ -22,7 +66,20 @@ class HistoryStore:
         self._include_extra = True
         self.personality = personality
         self.max_items = max_items
+        self.max_tokens = max_tokens
+        self.model_max_tokens = dict(model_max_tokens or {})
+        self.trim_block = max(0, int(trim_block))
         self._messages: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
+        # Cached per-message token estimates and their running total, per conversation
+        self._tokens: Dict[str, Dict[str, List[int]]] = {}
+        self._token_totals: Dict[str, Dict[str, int]] = {}
+        # Rolling summaries of trimmed turns, and turns awaiting summarisation
+        self.on_evict = on_evict
+        self._summaries: Dict[Tuple[str, str], str] = {}
+        self._evicted: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
+        self._epochs: Dict[Tuple[str, str], int] = {}
+        # Estimated tokens of the prompt last returned by `get`, per conversation
+        self._last_prompt: Dict[Tuple[str, str], int] = {}
 
     def set_verbose(self, verbose: bool) -> None:
         """Control whether to include the optional extra suffix for new conversations.
@@ -54,6 +111,8 @@ class HistoryStore:
             custom: Optional custom system prompt that replaces prefix/suffix.
         """
         self._ensure(room, user)
+        self._tokens.get(room, {}).pop(user, None)
+        self._forget_summary(room, user)
         if custom:
             self._messages[room][user] = [{"role": "system", "content": custom}]
         else:
@@ -72,13 +131,113 @@ class HistoryStore:
             content: Message content.
         """
         self._ensure(room, user)
+        tokens = self._estimates(room, user)
         self._messages[room][user].append({"role": role, "content": content})
+        tokens.append(estimate_tokens(content))
+        self._token_totals[room][user] += tokens[-1]
         self._trim(room, user)
 
-    def get(self, room: str, user: str) -> List[Dict[str, str]]:
-        """Return a copy of the message list for a room/user."""
+    def get(self, room: str, user: str, model: Optional[str] = None) -> List[Dict[str, str]]:
+        """Return a copy of the message list for a room/user.
+
+        Args:
+            room: Matrix room identifier.
+            user: Matrix user identifier.
+            model: Model the prompt is for. When it has a token budget, only
+                the system prompt and the newest messages that fit are returned.
+        """
+        self._ensure(room, user)
+        msgs = self._messages[room][user]
+        head = 1 if msgs and msgs[0].get("role") == "system" else 0
+        summary = self._summaries.get((room, user))
+        extra = [{"role": "system", "content": f"Summary of the earlier conversation: {summary}"}] if summary else []
+        budget = self.budget_for(model)
+        tokens = self._estimates(room, user)
+        extra_tokens = sum(estimate_tokens(m["content"]) for m in extra)
+        if budget is None or self._token_totals[room][user] <= budget:
+            self._last_prompt[(room, user)] = self._token_totals[room][user] + extra_tokens
+            return msgs[:head] + extra + msgs[head:]
+        used = sum(tokens[:head]) + extra_tokens
+        start = len(msgs)
+        # Walk back from the newest message; always keep at least one
+        while start > head and (start == len(msgs) or used + tokens[start - 1] <= budget):
+            start -= 1
+            used += tokens[start]
+        if self.trim_block and start > head:
+            # Snap the window start to a block boundary so it stays put for several turns
+            snapped = min(len(msgs) - 1, head + -(-(start - head) // self.trim_block) * self.trim_block)
+            used -= sum(tokens[start:snapped])
+            start = snapped
+        self._last_prompt[(room, user)] = used
+        return msgs[:head] + extra + msgs[start:]
+
+    def last_prompt_tokens(self, room: str, user: str) -> Optional[int]:
+        """Return the estimated tokens of the prompt last returned by `get`, if any."""
+        return self._last_prompt.get((room, user))
+
+    def take_last_prompt_tokens(self, room: str, user: str) -> Optional[int]:
+        """Return and forget the estimate of the prompt last returned by `get`, so it is compared once."""
+        return self._last_prompt.pop((room, user), None)
+
+    def summary(self, room: str, user: str) -> Optional[str]:
+        """Return the running summary of trimmed turns, if any."""
+        return self._summaries.get((room, user))
+
+    def epoch(self, room: str, user: str) -> int:
+        """Return a counter that changes whenever the conversation is reset."""
+        return self._epochs.get((room, user), 0)
+
+    def take_evicted(self, room: str, user: str) -> List[Dict[str, str]]:
+        """Return and forget the trimmed messages awaiting summarisation."""
+        return self._evicted.pop((room, user), [])
+
+    def restore_evicted(
+        self, room: str, user: str, messages: List[Dict[str, str]], epoch: Optional[int] = None
+    ) -> None:
+        """Put back trimmed messages whose summary failed, unless the conversation was reset since ``epoch``."""
+        if not messages or (epoch is not None and epoch != self.epoch(room, user)):
+            return
+        key = (room, user)
+        self._evicted[key] = list(messages) + self._evicted.get(key, [])
+
+    def set_summary(self, room: str, user: str, summary: str, epoch: Optional[int] = None) -> bool:
+        """Store the running summary unless the conversation was reset since ``epoch``.
+
+        Returns:
+            True if the summary was stored.
+        """
+        if epoch is not None and epoch != self.epoch(room, user):
+            return False
+        self._summaries[(room, user)] = summary.strip()
+        return True
+
+    def _forget_summary(self, room: str, user: str) -> None:
+        key = (room, user)
+        self._summaries.pop(key, None)
+        self._evicted.pop(key, None)
+        self._epochs[key] = self._epochs.get(key, 0) + 1
+
+    def budget_for(self, model: Optional[str]) -> Optional[int]:
+        """Return the prompt token budget for ``model`` (None when unbounded)."""
+        if model is not None and model in self.model_max_tokens:
+            return self.model_max_tokens[model]
+        return self.max_tokens
+
+    def token_count(self, room: str, user: str) -> int:
+        """Return the estimated tokens of the stored conversation."""
         self._ensure(room, user)
-        return list(self._messages[room][user])
+        self._estimates(room, user)
+        return self._token_totals[room][user]
+
+    def _estimates(self, room: str, user: str) -> List[int]:
+        """Return cached per-message estimates, rebuilding them if history changed underneath."""
+        msgs = self._messages[room][user]
+        tokens = self._tokens.setdefault(room, {}).get(user)
+        if tokens is None or len(tokens) != len(msgs):
+            tokens = [estimate_tokens(m.get("content", "")) for m in msgs]
+            self._tokens[room][user] = tokens
+            self._token_totals.setdefault(room, {})[user] = sum(tokens)
+        return tokens
 
     def reset(self, room: str, user: str, stock: bool = False) -> None:
         """Clear history for a room/user, optionally leaving it empty.
@@ -91,22 +250,38 @@ class HistoryStore:
         if room not in self._messages:
             self._messages[room] = {}
         self._messages[room][user] = []
+        self._tokens.get(room, {}).pop(user, None)
+        self._forget_summary(room, user)
         if not stock:
             self.init_prompt(room, user, persona=self.personality)
 
     def clear_all(self) -> None:
         """Remove all rooms and histories."""
         self._messages.clear()
+        self._tokens.clear()
+        self._token_totals.clear()
+        for room, user in list(self._summaries) + list(self._evicted):
+            self._forget_summary(room, user)
 
     def _trim(self, room: str, user: str) -> None:
-        """Trim oldest messages to maintain the configured maximum length."""
+        """Trim oldest messages to stay within the message and token limits."""
         msgs = self._messages[room][user]
-        while len(msgs) > self.max_items:
-            if msgs and msgs[0].get("role") == "system":
-                # Preserve system if present
-                if len(msgs) > 1:
-                    msgs.pop(1)
-                else:
-                    break
-            else:
-                msgs.pop(0)
+        tokens = self._estimates(room, user)
+        totals = self._token_totals[room]
+        limit = max([self.max_tokens or 0, *self.model_max_tokens.values()]) or None
+        # Preserve system if present
+        head = 1 if msgs and msgs[0].get("role") == "system" else 0
+        evicted = []
+        while len(msgs) > self.max_items or (limit is not None and totals[user] > limit and len(msgs) > 2):
+            if len(msgs) <= head:
+                break
+            evicted.append(msgs.pop(head))
+            totals[user] -= tokens.pop(head)
+        if evicted and self.trim_block:
+            # Evict a whole block, and start what is kept on a user turn
+            while len(msgs) > head + 1 and (len(evicted) < self.trim_block or msgs[head].get("role") != "user"):
+                evicted.append(msgs.pop(head))
+                totals[user] -= tokens.pop(head)
+        if evicted and self.on_evict is not None:
+            self._evicted.setdefault((room, user), []).extend(evicted)
+            self.on_evict(room, user)
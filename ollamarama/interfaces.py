@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Protocol, Awaitable, Callable
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Awaitable, Callable
 
 
 class OllamaClientProtocol(Protocol):
@@ -18,6 +18,46 @@ class OllamaClientProtocol(Protocol):
         ...
 
 
+class AsyncOllamaClientProtocol(Protocol):
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]: ...
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        think: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]: ...
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]: ...
+    async def list_models(self) -> Dict[str, str]: ...
+    async def tags(self) -> List[Dict[str, Any]]: ...
+    async def ps(self) -> List[Dict[str, Any]]: ...
+    async def embed(self, model: str, inputs: List[str], timeout: Optional[int] = None) -> List[List[float]]: ...
+    async def load(self, model: str, keep_alive: Any = None) -> Dict[str, Any]: ...
+    async def unload(self, model: str) -> None: ...
+    async def health(self) -> bool: ...
+
+
 class MatrixClientProtocol(Protocol):
     async def login(self) -> Any: ...
     async def ensure_keys(self) -> None: ...
@@ -104,6 +104,19 @@ class MatrixClientWrapper:
         except Exception:
             pass
 
+    async def redact(self, room_id: str, event_id: str, reason: Optional[str] = None) -> None:
+        """Redact (delete) a message in a room.
+
+        Args:
+            room_id: Target room ID.
+            event_id: Event ID of the message to remove.
+            reason: Optional reason shown to clients.
+        """
+        try:
+            await self.client.room_redact(room_id, event_id, reason=reason)
+        except Exception:
+            pass
+
     async def display_name(self, user_id: str) -> str:
         """Fetch and return the display name for a user, or the ID on failure.
 
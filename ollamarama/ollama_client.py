@@ -1,18 +1,65 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 import requests
 
-from .exceptions import NetworkError, RuntimeFailure
+try:
+    import aiohttp
+except Exception:  # pragma: no cover - aiohttp ships with matrix-nio
+    aiohttp = None  # type: ignore
+
+from .exceptions import BackendBusy, BackendTimeout, NetworkError, RuntimeFailure
+from .resilience import AdaptiveTimeouts, CircuitBreaker, backoff_delay
+
+_ASYNC_HTTP_ERRORS: tuple = (asyncio.TimeoutError, aiohttp.ClientError) if aiohttp is not None else (asyncio.TimeoutError,)
+# Connection-level failures worth retrying (the server was unreachable or dropped the connection)
+_RETRYABLE_ERRORS: tuple = (
+    (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError) if aiohttp is not None else ()
+)
+
+
+async def _raise_for_status(resp: Any) -> None:
+    """Like ``raise_for_status``, but keep Ollama's error message (e.g. out of memory)."""
+    if resp.status < 400:
+        return
+    detail = ""
+    try:
+        body = await resp.text()
+        try:
+            detail = str(json.loads(body).get("error") or "")
+        except (ValueError, AttributeError):
+            detail = body.strip()
+    except Exception:
+        pass
+    raise aiohttp.ClientResponseError(
+        resp.request_info, resp.history, status=resp.status, message=detail[:500] or resp.reason or "", headers=resp.headers
+    )
+
+
+def _network_error(exc: BaseException, seconds: Optional[float] = None) -> NetworkError:
+    """Convert an aiohttp or timeout error into a `NetworkError` carrying the HTTP status."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return BackendTimeout(f"Timed out after {seconds:.0f}s" if seconds is not None else "Timed out")
+    return NetworkError(str(exc) or type(exc).__name__, status=getattr(exc, "status", None))
+
+
+def _is_backend_failure(exc: BaseException) -> bool:
+    """Whether ``exc`` says the backend is unhealthy (not a bad request such as an unknown model)."""
+    status = getattr(exc, "status", None)
+    return not (isinstance(status, int) and status < 500)
 
 
 class OllamaClient:
     """HTTP client for the Ollama Chat API.
 
     This client is synchronous; when used from async code, run calls in a thread
-    executor (e.g., asyncio.to_thread) to avoid blocking the event loop.
+    executor (e.g., asyncio.to_thread) to avoid blocking the event loop, or use
+    `AsyncOllamaClient` instead.
     """
 
     def __init__(
@@ -150,17 +197,474 @@ class OllamaClient:
         except ValueError as e:
             raise RuntimeFailure(f"Invalid JSON from Ollama: {e}")
 
-        models: Dict[str, str] = {}
+        return _parse_models(data)
+
+
+def _parse_models(data: Any) -> Dict[str, str]:
+    """Extract a name→name mapping from an Ollama `/tags` payload.
+
+    Args:
+        data: Decoded JSON body of the `/tags` response.
+
+    Returns:
+        Mapping of model name to model identifier.
+
+    Raises:
+        RuntimeFailure: If the payload contains no models.
+    """
+    models: Dict[str, str] = {}
+    try:
+        items = data.get("models", []) if isinstance(data, dict) else []
+        for item in items:
+            name = None
+            if isinstance(item, dict):
+                name = item.get("name") or item.get("model")
+            if isinstance(name, str) and name:
+                models[name] = name
+    except Exception:
+        pass
+    if not models:
+        raise RuntimeFailure("No models found in Ollama /tags response")
+    return models
+
+
+class AsyncOllamaClient:
+    """Asyncio HTTP client for the Ollama Chat API.
+
+    Mirrors the `OllamaClient` surface with coroutine methods backed by a
+    pooled `aiohttp` session, so generations run directly on the event loop
+    instead of occupying worker threads. At most `max_concurrency`
+    generation requests are in flight at once; further callers wait their
+    turn without blocking the loop.
+
+    ``keep_alive``, if given, is called with the model name for every chat
+    request and returns the ``keep_alive`` value to send (or None to use the
+    server default). ``on_response``, if given, is called with the model name
+    and every chat response (or final stream chunk) so token counts and
+    timings can be accounted. ``context_size``, if given, is called with the
+    payload of every chat and load request and returns the ``num_ctx`` to
+    send (or None to leave the options alone).
+
+    Chat requests that fail to connect are retried up to ``retries`` times
+    with jittered exponential backoff. With ``timeouts``, non-streaming chat
+    timeouts adapt to each model's observed latency (capped by the timeout
+    passed in). With ``breaker``, repeated backend failures open a circuit
+    and chat requests fail fast with `BackendBusy` until it recovers.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434/api",
+        timeout: int = 180,
+        max_concurrency: int = 8,
+        session: Optional[Any] = None,
+        keep_alive: Optional[Callable[[str], Any]] = None,
+        on_response: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        context_size: Optional[Callable[[Dict[str, Any]], Optional[int]]] = None,
+        retries: int = 0,
+        retry_backoff: float = 0.5,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = int(timeout)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.keep_alive = keep_alive
+        self.on_response = on_response
+        self.context_size = context_size
+        self.retries = max(0, int(retries))
+        self.retry_backoff = float(retry_backoff)
+        self.timeouts = timeouts
+        self.breaker = breaker
+        self.logger = logging.getLogger(__name__)
+        self._session = session
+        self._owns_session = session is None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> Any:
+        """Return the shared HTTP session, creating it on first use."""
+        if self._session is None:
+            if aiohttp is None:
+                raise RuntimeFailure("aiohttp is required for the async Ollama client")
+            # Leave headroom above the generation limit for health and tag probes
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency + 2)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    def _timeout(self, timeout: Optional[float], *, streaming: bool = False) -> Any:
+        seconds = self.timeout if timeout is None else timeout
+        if aiohttp is None:
+            return seconds
+        if streaming:
+            # Bound the gap between chunks rather than the whole generation
+            return aiohttp.ClientTimeout(total=None, sock_read=seconds)
+        return aiohttp.ClientTimeout(total=seconds)
+
+    def _apply_keep_alive(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.keep_alive is not None and "keep_alive" not in payload:
+            value = self.keep_alive(payload["model"])
+            if value is not None:
+                payload["keep_alive"] = value
+        return payload
+
+    def _apply_context_size(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.context_size is not None:
+            num_ctx = self.context_size(payload)
+            if num_ctx:
+                payload["options"] = {**(payload.get("options") or {}), "num_ctx": int(num_ctx)}
+        return payload
+
+    def _notify(self, model: str, data: Any) -> None:
+        if self.on_response is None or not isinstance(data, dict):
+            return
         try:
-            items = data.get("models", []) if isinstance(data, dict) else []
-            for item in items:
-                name = None
-                if isinstance(item, dict):
-                    name = item.get("name") or item.get("model")
-                if isinstance(name, str) and name:
-                    models[name] = name
+            self.on_response(model, data)
         except Exception:
             pass
-        if not models:
-            raise RuntimeFailure("No models found in Ollama /tags response")
-        return models
+
+    def _check_breaker(self) -> None:
+        if self.breaker is not None and not self.breaker.allow():
+            raise BackendBusy(f"Ollama backend {self.base_url} is busy; retry in {self.breaker.retry_after():.0f}s")
+
+    def _record_outcome(self, exc: Optional[BaseException]) -> None:
+        """Feed a generation's outcome to the circuit breaker, if any."""
+        if self.breaker is None:
+            return
+        if exc is None:
+            if self.breaker.state != "closed":
+                self.logger.info("Ollama backend %s recovered", self.base_url)
+            self.breaker.success()
+        elif _is_backend_failure(exc):
+            trips = self.breaker.trips
+            self.breaker.failure()
+            if self.breaker.trips > trips:
+                self.logger.warning(
+                    "Ollama backend %s failing (%s); refusing requests for %.0fs",
+                    self.base_url,
+                    exc,
+                    self.breaker.cooldown,
+                )
+
+    async def _retry_delay(self, attempt: int, exc: BaseException) -> bool:
+        """Sleep before retrying a failed connection; False once retries are used up."""
+        if attempt > self.retries or not isinstance(exc, _RETRYABLE_ERRORS):
+            return False
+        self.logger.debug("Retrying Ollama request to %s (attempt %d): %s", self.base_url, attempt, exc)
+        await asyncio.sleep(backoff_delay(attempt, self.retry_backoff))
+        return True
+
+    async def _post_json(self, payload: Dict[str, Any], timeout: Optional[int], path: str = "chat") -> Dict[str, Any]:
+        url = f"{self.base_url}/{path}"
+        self._apply_keep_alive(payload)
+        if path == "chat":
+            self._apply_context_size(payload)
+        # Only generations are retried, timed adaptively and guarded by the breaker
+        generation = path == "chat"
+        seconds: Optional[float] = timeout
+        if generation:
+            self._check_breaker()
+            if self.timeouts is not None:
+                seconds = self.timeouts.timeout_for(payload["model"], self.timeout if timeout is None else timeout)
+        async with self._get_slots():
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    async with self._get_session().post(url, json=payload, timeout=self._timeout(seconds)) as resp:
+                        await _raise_for_status(resp)
+                        body = await resp.text()
+                    break
+                except _ASYNC_HTTP_ERRORS as e:
+                    attempt += 1
+                    if generation and await self._retry_delay(attempt, e):
+                        continue
+                    if generation:
+                        self._record_outcome(e)
+                    raise _network_error(e, seconds)
+        elapsed = time.monotonic() - started
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise RuntimeFailure(f"Invalid JSON from Ollama: {e}")
+        if generation:
+            self._record_outcome(None)
+            if self.timeouts is not None and isinstance(data, dict):
+                # Model loads are one-off; keep them out of the latency estimate
+                self.timeouts.observe(payload["model"], elapsed - (data.get("load_duration") or 0) / 1e9)
+            self._notify(payload["model"], data)
+        return data
+
+    # ---- Public API ----
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Send a chat request and return the parsed JSON response.
+
+        Args:
+            messages: Conversation messages in ChatML-like format.
+            model: Model name or ID to use.
+            options: Optional model-specific parameters.
+            timeout: Optional request timeout override in seconds.
+            stream: Accepted for API compatibility; use `chat_stream` to stream.
+            think: Native reasoning control (True/False or ``"low"``/``"medium"``/
+                ``"high"``); omitted when None so the model default applies.
+
+        Returns:
+            Parsed JSON response from the Ollama server.
+
+        Raises:
+            NetworkError: If the HTTP request fails or the server returns an error.
+            RuntimeFailure: If the response body is not valid JSON.
+        """
+        payload: Dict[str, Any] = {"model": model, "messages": messages, "stream": False}
+        if options is not None:
+            payload["options"] = options
+        if timeout is not None:
+            payload["timeout"] = int(timeout)
+        if think is not None:
+            payload["think"] = think
+        return await self._post_json(payload, timeout)
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        think: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Send a streaming chat request and yield NDJSON chunks as they arrive.
+
+        Args:
+            messages: Conversation messages in ChatML-like format.
+            model: Model name or ID to use.
+            options: Optional model-specific parameters.
+            timeout: Optional per-chunk read timeout override in seconds.
+            think: Native reasoning control; see `chat`.
+            tools: Tool schemas the model may call; calls arrive in a
+                chunk's ``message.tool_calls``.
+            tool_choice: Tool choice override sent along with ``tools``.
+
+        Yields:
+            Parsed JSON objects, one per streamed line.
+
+        Raises:
+            NetworkError: If the HTTP request fails or the server returns an error.
+            RuntimeFailure: If a streamed line is not valid JSON.
+        """
+        url = f"{self.base_url}/chat"
+        payload: Dict[str, Any] = {"model": model, "messages": messages, "stream": True}
+        if options is not None:
+            payload["options"] = options
+        if think is not None:
+            payload["think"] = think
+        if tools:
+            payload["tools"] = tools
+            if tool_choice is not None:
+                payload["tool_choice"] = tool_choice
+        self._apply_keep_alive(payload)
+        self._apply_context_size(payload)
+        self._check_breaker()
+        async with self._get_slots():
+            attempt = 0
+            started = False
+            while True:
+                try:
+                    async with self._get_session().post(
+                        url, json=payload, timeout=self._timeout(timeout, streaming=True)
+                    ) as resp:
+                        await _raise_for_status(resp)
+                        async for line in resp.content:
+                            line = line.strip()
+                            if not line:
+                                continue
+                            try:
+                                chunk = json.loads(line)
+                            except ValueError as e:
+                                raise RuntimeFailure(f"Invalid JSON from Ollama: {e}")
+                            if isinstance(chunk, dict) and chunk.get("error"):
+                                raise NetworkError(str(chunk["error"]))
+                            started = True
+                            if isinstance(chunk, dict) and chunk.get("done"):
+                                self._notify(model, chunk)
+                                yield chunk
+                                break
+                            yield chunk
+                    break
+                except _ASYNC_HTTP_ERRORS as e:
+                    attempt += 1
+                    # Never replay a stream the caller has already seen part of
+                    if not started and await self._retry_delay(attempt, e):
+                        continue
+                    self._record_outcome(e)
+                    raise _network_error(e, timeout if timeout is not None else self.timeout)
+        self._record_outcome(None)
+
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Send a tool-enabled chat request and return the parsed JSON response."""
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+            "options": options or {},
+            "tools": tools,
+        }
+        if tool_choice is not None:
+            payload["tool_choice"] = tool_choice
+        if timeout is not None:
+            payload["timeout"] = int(timeout)
+        if think is not None:
+            payload["think"] = think
+        return await self._post_json(payload, timeout)
+
+    async def embed(self, model: str, inputs: List[str], timeout: Optional[int] = None) -> List[List[float]]:
+        """Embed texts with an embedding model via `/embed`.
+
+        Args:
+            model: Embedding model name or ID.
+            inputs: Texts to embed.
+            timeout: Optional request timeout override in seconds.
+
+        Returns:
+            One embedding vector per input, in order.
+
+        Raises:
+            NetworkError: If the HTTP request fails.
+            RuntimeFailure: If the response is invalid.
+        """
+        data = await self._post_json({"model": model, "input": list(inputs)}, timeout or 30, path="embed")
+        embeddings = data.get("embeddings") if isinstance(data, dict) else None
+        if not isinstance(embeddings, list) or len(embeddings) != len(inputs):
+            raise RuntimeFailure("Invalid embeddings in Ollama /embed response")
+        return embeddings
+
+    async def load(self, model: str, keep_alive: Any = None) -> Dict[str, Any]:
+        """Load ``model`` into memory without generating anything.
+
+        Args:
+            model: Model name or ID to load.
+            keep_alive: How long the server should keep it loaded (e.g.
+                ``"30m"``, seconds, or ``-1`` for indefinitely). Defaults to
+                the ``keep_alive`` hook, then the server default.
+
+        Returns:
+            Parsed JSON response from the `/generate` endpoint.
+
+        Raises:
+            NetworkError: If the HTTP request fails (e.g. unknown model).
+            RuntimeFailure: If the response body is not valid JSON.
+        """
+        payload: Dict[str, Any] = {"model": model, "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        # Load with the window requests will use, or the next chat reloads it
+        self._apply_context_size(payload)
+        return await self._post_json(payload, None, path="generate")
+
+    async def unload(self, model: str) -> None:
+        """Ask the server to unload ``model`` immediately.
+
+        Raises:
+            NetworkError: If the HTTP request fails.
+        """
+        await self._post_json({"model": model, "stream": False, "keep_alive": 0}, 30, path="generate")
+
+    async def health(self) -> bool:
+        """Best-effort health check against the Ollama `/tags` endpoint.
+
+        Returns:
+            True if a quick request succeeds; otherwise False.
+        """
+        try:
+            async with self._get_session().get(f"{self.base_url}/tags", timeout=self._timeout(5)) as resp:
+                return 200 <= resp.status < 300
+        except Exception:
+            return False
+
+    async def list_models(self) -> Dict[str, str]:
+        """Return a mapping of available model names from the server.
+
+        Raises:
+            NetworkError: If the HTTP request fails.
+            RuntimeFailure: If the response is invalid or contains no models.
+        """
+        return _parse_models({"models": await self.tags()})
+
+    async def tags(self) -> List[Dict[str, Any]]:
+        """Return the models pulled on the server (`/tags`).
+
+        Returns:
+            List of model entries (``name``, ``size``, ``modified_at``,
+            ``details``...) as reported by Ollama.
+
+        Raises:
+            NetworkError: If the HTTP request fails.
+            RuntimeFailure: If the response is not valid JSON.
+        """
+        try:
+            async with self._get_session().get(f"{self.base_url}/tags", timeout=self._timeout(10)) as resp:
+                resp.raise_for_status()
+                body = await resp.text()
+        except _ASYNC_HTTP_ERRORS as e:
+            raise NetworkError(str(e) or type(e).__name__)
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise RuntimeFailure(f"Invalid JSON from Ollama: {e}")
+        items = data.get("models", []) if isinstance(data, dict) else []
+        return [item for item in items if isinstance(item, dict)]
+
+    async def ps(self) -> List[Dict[str, Any]]:
+        """Return the models currently loaded on the server (`/ps`).
+
+        Returns:
+            List of model entries (``name``, ``size``, ``size_vram``,
+            ``expires_at``...) as reported by Ollama.
+
+        Raises:
+            NetworkError: If the HTTP request fails.
+            RuntimeFailure: If the response is not valid JSON.
+        """
+        try:
+            async with self._get_session().get(f"{self.base_url}/ps", timeout=self._timeout(10)) as resp:
+                resp.raise_for_status()
+                body = await resp.text()
+        except _ASYNC_HTTP_ERRORS as e:
+            raise NetworkError(str(e) or type(e).__name__)
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            raise RuntimeFailure(f"Invalid JSON from Ollama: {e}")
+        items = data.get("models", []) if isinstance(data, dict) else []
+        return [item for item in items if isinstance(item, dict)]
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session if this client created it."""
+        if self._session is not None and self._owns_session:
+            try:
+                await self._session.close()
+            finally:
+                self._session = None
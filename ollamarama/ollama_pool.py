@@ -0,0 +1,466 @@
+"""Load-balanced pool of Ollama backends."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from .exceptions import BackendBusy, NetworkError
+from .ollama_client import AsyncOllamaClient, _is_backend_failure
+
+# (room_id, user_id) of the conversation currently being generated. Set by the
+# runtime/handlers so the pool can keep a conversation on one backend.
+conversation_key: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "ollamarama_conversation_key", default=None
+)
+
+
+class _Backend:
+    """Book-keeping for one Ollama server in the pool."""
+
+    def __init__(self, client: AsyncOllamaClient) -> None:
+        self.client = client
+        self.url = client.base_url
+        self.healthy = True
+        self.outstanding = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        """True if healthy and not refusing requests behind an open circuit breaker."""
+        breaker = getattr(self.client, "breaker", None)
+        return self.healthy and (breaker is None or not breaker.open)
+
+
+class OllamaPool:
+    """Balance requests across several Ollama servers.
+
+    Exposes the same surface as `AsyncOllamaClient`. Each request goes to the
+    healthy backend with the fewest outstanding requests, except that a
+    conversation (see `conversation_key`) sticks to the backend it last used
+    so the server's KV cache stays warm. Backends are ejected after repeated
+    connection failures and re-admitted once a background health probe
+    succeeds. When a backend's client has a circuit breaker, the breaker
+    counts request failures instead, and the backend is skipped while the
+    breaker is open and any other backend is available.
+
+    With ``hedge`` enabled, a chat request that has not completed (or, when
+    streaming, produced its first chunk) within the ``hedge_percentile``
+    latency of recent requests for the same model (at least
+    ``hedge_min_delay`` seconds) is also sent to a second backend. The first
+    to answer wins and the other is cancelled. No hedging happens until
+    ``hedge_min_samples`` requests have been timed.
+    """
+
+    def __init__(
+        self,
+        clients: List[AsyncOllamaClient],
+        *,
+        health_check_interval: float = 15.0,
+        eject_after: int = 2,
+        max_affinity: int = 4096,
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 2.0,
+        hedge_min_samples: int = 20,
+    ) -> None:
+        if not clients:
+            raise ValueError("OllamaPool requires at least one client")
+        self.backends = [_Backend(c) for c in clients]
+        self.health_check_interval = float(health_check_interval)
+        self.eject_after = max(1, int(eject_after))
+        self.max_affinity = max(1, int(max_affinity))
+        self._affinity: "OrderedDict[Tuple[str, str], _Backend]" = OrderedDict()
+        self._probe_task: Optional[asyncio.Task] = None  # type: ignore[type-arg]
+        self.hedge = bool(hedge)
+        self.hedge_percentile = float(hedge_percentile)
+        self.hedge_min_delay = float(hedge_min_delay)
+        self.hedge_min_samples = max(1, int(hedge_min_samples))
+        # Recent latencies per (kind, model); kind is "chat" or "first_chunk"
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = defaultdict(lambda: deque(maxlen=200))
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.logger = logging.getLogger(__name__)
+
+    # ---- Backend selection ----
+    def _pick(self, key: Optional[Tuple[str, str]] = None) -> _Backend:
+        """Choose a backend for a request, honouring conversation affinity."""
+        self._ensure_probe()
+        if key is not None:
+            sticky = self._affinity.get(key)
+            if sticky is not None and sticky.available:
+                self._affinity.move_to_end(key)
+                return sticky
+        # A backend whose breaker is open would only answer "busy"; use it only if nothing else is left
+        candidates = (
+            [b for b in self.backends if b.available] or [b for b in self.backends if b.healthy] or self.backends
+        )
+        chosen = min(candidates, key=lambda b: b.outstanding)
+        if key is not None:
+            self._affinity[key] = chosen
+            self._affinity.move_to_end(key)
+            while len(self._affinity) > self.max_affinity:
+                self._affinity.popitem(last=False)
+        return chosen
+
+    def _pick_other(self, primary: _Backend) -> Optional[_Backend]:
+        """Choose a second available backend for a hedge, if there is one."""
+        candidates = [b for b in self.backends if b.available and b is not primary]
+        return min(candidates, key=lambda b: b.outstanding) if candidates else None
+
+    def _stick(self, key: Optional[Tuple[str, str]], backend: _Backend) -> None:
+        """Point a conversation at the backend that answered it (its KV cache is warm)."""
+        if key is not None and key in self._affinity:
+            self._affinity[key] = backend
+
+    def _record_failure(self, backend: _Backend, exc: Exception) -> None:
+        # Bad requests (4xx) and the client refusing locally say nothing about the backend's health
+        if isinstance(exc, BackendBusy) or not _is_backend_failure(exc):
+            return
+        # A client with a circuit breaker already counts its failures; `_Backend.available` reads it
+        if getattr(backend.client, "breaker", None) is not None:
+            return
+        backend.failures += 1
+        if backend.healthy and backend.failures >= self.eject_after:
+            backend.healthy = False
+            self.logger.warning("Ejected Ollama backend %s after %d failure(s): %s", backend.url, backend.failures, exc)
+
+    def _record_success(self, backend: _Backend) -> None:
+        backend.failures = 0
+
+    async def _call(self, method: str, **kwargs: Any) -> Dict[str, Any]:
+        return await self._call_on(self._pick(conversation_key.get()), method, **kwargs)
+
+    async def _call_on(self, backend: _Backend, method: str, **kwargs: Any) -> Dict[str, Any]:
+        backend.outstanding += 1
+        try:
+            result = await getattr(backend.client, method)(**kwargs)
+        except NetworkError as exc:
+            self._record_failure(backend, exc)
+            raise
+        finally:
+            backend.outstanding -= 1
+        self._record_success(backend)
+        return result
+
+    # ---- Hedging ----
+    def _hedge_delay(self, kind: str, model: str) -> Optional[float]:
+        """Return how long to wait before hedging, or None to not hedge."""
+        if not self.hedge:
+            return None
+        samples = self._latencies.get((kind, model))
+        if not samples or len(samples) < self.hedge_min_samples:
+            return None
+        ordered = sorted(samples)
+        observed = ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+        return max(self.hedge_min_delay, observed)
+
+    def _observe(self, kind: str, model: str, seconds: float) -> None:
+        if self.hedge:
+            self._latencies[(kind, model)].append(seconds)
+
+    @staticmethod
+    async def _race(primary: "asyncio.Task[Any]", secondary: "asyncio.Task[Any]") -> "asyncio.Task[Any]":
+        """Return the first task to succeed (or the last to fail) and cancel the other."""
+        pending = {primary, secondary}
+        winner = primary
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer a success; a failure only wins once both have failed
+                winner = next((t for t in done if not t.cancelled() and t.exception() is None), next(iter(done)))
+                if not winner.cancelled() and winner.exception() is None:
+                    break
+            return winner
+        finally:
+            for task in (primary, secondary):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(primary, secondary, return_exceptions=True)
+
+    async def _hedged_call(self, method: str, model: str, **kwargs: Any) -> Dict[str, Any]:
+        """Call ``method`` on one backend, hedging to a second one if it is slow."""
+        key = conversation_key.get()
+        primary = self._pick(key)
+        self.requests += 1
+        started = time.monotonic()
+        delay = self._hedge_delay("chat", model)
+        secondary = self._pick_other(primary) if delay is not None else None
+        if secondary is None:
+            result = await self._call_on(primary, method, model=model, **kwargs)
+            self._observe("chat", model, time.monotonic() - started)
+            return result
+        first = asyncio.ensure_future(self._call_on(primary, method, model=model, **kwargs))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done:
+            result = first.result()
+            self._observe("chat", model, time.monotonic() - started)
+            return result
+        self.hedges += 1
+        self.logger.debug("Hedging %s request for %s to %s after %.2fs", method, model, secondary.url, delay)
+        second = asyncio.ensure_future(self._call_on(secondary, method, model=model, **kwargs))
+        winner = await self._race(first, second)
+        result = winner.result()
+        self._observe("chat", model, time.monotonic() - started)
+        if winner is second:
+            self.hedge_wins += 1
+            self._stick(key, secondary)
+        return result
+
+    async def _stream_on(self, backend: _Backend, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        backend.outstanding += 1
+        try:
+            async for chunk in backend.client.chat_stream(**kwargs):
+                yield chunk
+        except NetworkError as exc:
+            self._record_failure(backend, exc)
+            raise
+        finally:
+            backend.outstanding -= 1
+        self._record_success(backend)
+
+    def hedge_stats(self) -> Dict[str, Any]:
+        """Return hedging counters: requests, hedges fired and hedges that won."""
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+        }
+
+    # ---- Health probing ----
+    def _ensure_probe(self) -> None:
+        """Start the background health probe on first use."""
+        if self._probe_task is not None or len(self.backends) < 2:
+            return
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+        except RuntimeError:
+            pass
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.probe()
+            except Exception:
+                self.logger.debug("Ollama backend probe failed", exc_info=True)
+
+    async def probe(self) -> None:
+        """Check every backend once, ejecting or re-admitting as needed."""
+        results = await asyncio.gather(*(b.client.health() for b in self.backends), return_exceptions=True)
+        for backend, ok in zip(self.backends, results):
+            ok = ok is True
+            if ok and not backend.healthy:
+                self.logger.info("Re-admitted Ollama backend %s", backend.url)
+            elif not ok and backend.healthy:
+                self.logger.warning("Ejected Ollama backend %s: health check failed", backend.url)
+            backend.healthy = ok
+            if ok:
+                backend.failures = 0
+
+    # ---- Client surface ----
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Send a chat request to the selected backend (hedged when enabled)."""
+        return await self._hedged_call(
+            "chat", model=model, messages=messages, options=options, timeout=timeout, think=think
+        )
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        think: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chat request from the selected backend.
+
+        When hedging is enabled and the first chunk is late, the request is
+        also streamed from a second backend and the first to produce a
+        chunk is used.
+        """
+        kwargs = dict(messages=messages, model=model, options=options, timeout=timeout, think=think)
+        if tools:
+            kwargs["tools"] = tools
+            if tool_choice is not None:
+                kwargs["tool_choice"] = tool_choice
+        key = conversation_key.get()
+        primary = self._pick(key)
+        self.requests += 1
+        started = time.monotonic()
+        delay = self._hedge_delay("first_chunk", model)
+        secondary = self._pick_other(primary) if delay is not None else None
+        stream = self._stream_on(primary, **kwargs)
+        first = asyncio.ensure_future(stream.__anext__())
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done and secondary is not None:
+                self.hedges += 1
+                self.logger.debug("Hedging stream for %s to %s after %.2fs", model, secondary.url, delay)
+                other = self._stream_on(secondary, **kwargs)
+                other_first = asyncio.ensure_future(other.__anext__())
+                if await self._race(first, other_first) is other_first:
+                    self.hedge_wins += 1
+                    self._stick(key, secondary)
+                    await stream.aclose()
+                    stream, first = other, other_first
+                else:
+                    await other.aclose()
+            try:
+                chunk = await first
+            except StopAsyncIteration:
+                return
+            self._observe("first_chunk", model, time.monotonic() - started)
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            if not first.done():
+                first.cancel()
+            await stream.aclose()
+
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Send a tool-enabled chat request to the selected backend (hedged when enabled)."""
+        return await self._hedged_call(
+            "chat_with_tools",
+            model=model,
+            messages=messages,
+            options=options,
+            tools=tools,
+            tool_choice=tool_choice,
+            timeout=timeout,
+            think=think,
+        )
+
+    async def embed(self, model: str, inputs: List[str], timeout: Optional[int] = None) -> List[List[float]]:
+        """Embed texts on the selected backend."""
+        return await self._call("embed", model=model, inputs=inputs, timeout=timeout)
+
+    async def health(self) -> bool:
+        """Return True if at least one backend is healthy."""
+        await self.probe()
+        return any(b.healthy for b in self.backends)
+
+    async def list_models(self) -> Dict[str, str]:
+        """Return the union of models reported by healthy backends.
+
+        Raises:
+            NetworkError: If no backend could be queried.
+        """
+        models: Dict[str, str] = {}
+        errors: List[Exception] = []
+        for backend in [b for b in self.backends if b.healthy] or self.backends:
+            try:
+                models.update(await backend.client.list_models())
+            except Exception as exc:
+                errors.append(exc)
+        if not models and errors:
+            raise NetworkError(str(errors[-1]))
+        return models
+
+    async def tags(self) -> List[Dict[str, Any]]:
+        """Return the models pulled on any backend, each tagged with the first ``backend`` URL that has it.
+
+        Raises:
+            NetworkError: If no backend could be queried.
+        """
+        pulled: Dict[str, Dict[str, Any]] = {}
+        errors: List[Exception] = []
+        queried = False
+        for backend in [b for b in self.backends if b.healthy] or self.backends:
+            try:
+                items = await backend.client.tags()
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            queried = True
+            for item in items:
+                name = item.get("name") or item.get("model")
+                if name and name not in pulled:
+                    pulled[name] = {**item, "backend": backend.url}
+        if not queried and errors:
+            raise NetworkError(str(errors[-1]))
+        return list(pulled.values())
+
+    async def ps(self) -> List[Dict[str, Any]]:
+        """Return loaded models across healthy backends, tagged with their ``backend`` URL."""
+        loaded: List[Dict[str, Any]] = []
+        for backend in [b for b in self.backends if b.healthy]:
+            try:
+                for item in await backend.client.ps():
+                    loaded.append({**item, "backend": backend.url})
+            except Exception:
+                self.logger.debug("Failed to list loaded models on %s", backend.url, exc_info=True)
+        return loaded
+
+    async def load(self, model: str, keep_alive: Any = None) -> Dict[str, Any]:
+        """Load ``model`` on every healthy backend, since any of them may serve it.
+
+        Returns:
+            The response from the slowest backend.
+
+        Raises:
+            NetworkError: If no backend could load the model.
+        """
+        targets = [b for b in self.backends if b.healthy] or self.backends
+        results = await asyncio.gather(
+            *(b.client.load(model, keep_alive=keep_alive) for b in targets), return_exceptions=True
+        )
+        loaded = [r for r in results if isinstance(r, dict)]
+        if not loaded:
+            errors = [r for r in results if isinstance(r, BaseException)]
+            raise NetworkError(str(errors[-1]) if errors else "no backend available")
+        return max(loaded, key=lambda r: r.get("load_duration") or 0)
+
+    async def unload(self, model: str) -> None:
+        """Unload ``model`` from every healthy backend (best effort)."""
+        targets = [b for b in self.backends if b.healthy]
+        await asyncio.gather(*(b.client.unload(model) for b in targets), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Stop health probing and close every backend client."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._probe_task = None
+        for backend in self.backends:
+            try:
+                await backend.client.close()
+            except Exception:
+                pass
+
+
+__all__ = ["OllamaPool", "conversation_key"]
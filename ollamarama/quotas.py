@@ -0,0 +1,147 @@
+"""Token-bucket quotas on tokens consumed per user and per room."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+
+class TokenBucket:
+    """Bucket of ``capacity`` tokens refilled at ``refill_rate`` tokens per second.
+
+    Usage is charged after a reply is generated, so the level may go
+    negative; the owner is throttled until it is positive again.
+    """
+
+    __slots__ = ("capacity", "refill_rate", "level", "updated", "consumed")
+
+    def __init__(self, capacity: float, refill_rate: float) -> None:
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.consumed = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def charge(self, tokens: int) -> None:
+        self._refill()
+        self.level -= tokens
+        self.consumed += tokens
+
+    def wait(self) -> float:
+        """Seconds until the bucket has tokens again (0 if it has some now)."""
+        self._refill()
+        if self.level > 0:
+            return 0.0
+        return (1 - self.level) / self.refill_rate if self.refill_rate > 0 else float("inf")
+
+
+class TokenQuotas:
+    """Per-user and per-room token buckets fed by Ollama's token counts.
+
+    Registered as a `UsageTracker` listener, so every chat response charges
+    ``prompt_eval_count + eval_count`` to the requesting user and room.
+    Users in ``exempt`` (admins, by display name or user ID) are never
+    throttled; those listed by user ID are not charged either. A limit
+    with a capacity of 0 is disabled. At most ``max_keys`` buckets per scope
+    are kept, least recently used first out (a dropped bucket is full).
+    """
+
+    def __init__(
+        self,
+        *,
+        user_capacity: int = 0,
+        user_refill_per_minute: float = 0.0,
+        room_capacity: int = 0,
+        room_refill_per_minute: float = 0.0,
+        max_keys: int = 4096,
+        exempt: Iterable[str] = (),
+    ) -> None:
+        self.limits = {
+            "user": (int(user_capacity), float(user_refill_per_minute) / 60.0),
+            "room": (int(room_capacity), float(room_refill_per_minute) / 60.0),
+        }
+        self.max_keys = max(1, int(max_keys))
+        self.exempt: Set[str] = set(exempt)
+        self.throttled = 0
+        self._buckets: Dict[str, "OrderedDict[str, TokenBucket]"] = {"user": OrderedDict(), "room": OrderedDict()}
+
+    @property
+    def enabled(self) -> bool:
+        return any(capacity > 0 for capacity, _ in self.limits.values())
+
+    def _bucket(self, scope: str, key: str, create: bool = True) -> Optional[TokenBucket]:
+        capacity, rate = self.limits[scope]
+        if capacity <= 0:
+            return None
+        table = self._buckets[scope]
+        bucket = table.get(key)
+        if bucket is None:
+            if not create:
+                return None
+            bucket = table[key] = TokenBucket(capacity, rate)
+        table.move_to_end(key)
+        while len(table) > self.max_keys:
+            table.popitem(last=False)
+        return bucket
+
+    def record(self, model: str, room_id: Optional[str], user_id: Optional[str], prompt: int, completion: int) -> None:
+        """Charge one response's tokens (`UsageTracker` listener)."""
+        if user_id is None or user_id in self.exempt:
+            return
+        tokens = int(prompt) + int(completion)
+        for scope, key in (("user", user_id), ("room", room_id)):
+            bucket = self._bucket(scope, key) if key is not None else None
+            if bucket is not None:
+                bucket.charge(tokens)
+
+    def check(self, room_id: str, user_id: str, name: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Return (scope, seconds to wait) if the user or room is throttled, else None.
+
+        ``name`` is the sender's display name, matched against ``exempt`` like the user ID.
+        """
+        if user_id in self.exempt or (name is not None and name in self.exempt):
+            return None
+        for scope, key in (("user", user_id), ("room", room_id)):
+            bucket = self._bucket(scope, key, create=False)
+            wait = bucket.wait() if bucket is not None else 0.0
+            if wait > 0:
+                self.throttled += 1
+                return scope, wait
+        return None
+
+    def reset(self, key: Optional[str] = None) -> int:
+        """Refill the bucket(s) for a user or room ID, or every bucket when ``key`` is None.
+
+        Returns:
+            Number of buckets reset.
+        """
+        count = 0
+        for table in self._buckets.values():
+            if key is None:
+                count += len(table)
+                table.clear()
+            elif table.pop(key, None) is not None:
+                count += 1
+        return count
+
+    def snapshot(self, scope: str) -> Dict[str, Dict[str, Any]]:
+        """Return level, capacity, consumed tokens and wait for each bucket in ``scope``."""
+        out = {}
+        for key, bucket in self._buckets[scope].items():
+            wait = bucket.wait()
+            out[key] = {
+                "level": bucket.level,
+                "capacity": bucket.capacity,
+                "consumed": bucket.consumed,
+                "wait": wait,
+            }
+        return out
+
+
+__all__ = ["TokenBucket", "TokenQuotas"]
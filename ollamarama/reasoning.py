@@ -0,0 +1,190 @@
+"""Reasoning ("thinking") control and accounting for chat replies."""
+
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+# Values accepted for Ollama's native `think` request field
+THINK_LEVELS = ("low", "medium", "high")
+
+
+def parse_think(value: Any) -> Any:
+    """Normalize a user or config supplied think setting.
+
+    Args:
+        value: ``on``/``off``/``default``, a level (``low``, ``medium``,
+            ``high``), or a bool.
+
+    Returns:
+        True, False, a level string, or None for the model's default.
+
+    Raises:
+        ValueError: If the value is not recognised.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("", "default", "auto", "none"):
+        return None
+    if text in ("on", "true", "1", "yes"):
+        return True
+    if text in ("off", "false", "0", "no"):
+        return False
+    if text in THINK_LEVELS:
+        return text
+    raise ValueError(f"invalid think setting: {value!r}")
+
+
+def think_label(think: Any) -> str:
+    """Return a short human-readable label for a think setting."""
+    if think is None:
+        return "default"
+    if think is True:
+        return "on"
+    if think is False:
+        return "off"
+    return str(think)
+
+
+def resolve_think(ctx: Any, room_id: str, model: str) -> Any:
+    """Return the effective think setting: room override, then model, then global."""
+    rooms = getattr(ctx, "room_think", None) or {}
+    if room_id in rooms:
+        return rooms[room_id]
+    models = getattr(ctx, "model_think", None) or {}
+    if model in models:
+        return models[model]
+    return getattr(ctx, "think", None)
+
+
+def think_kwargs(think: Any) -> Dict[str, Any]:
+    """Keyword arguments that pass ``think`` to the client only when set."""
+    return {} if think is None else {"think": think}
+
+
+def split_reasoning(text: str) -> Tuple[str, str]:
+    """Separate inline chain-of-thought markup from a reply.
+
+    Handles ``<think>...</think>``, ``<|begin_of_thought|>...<|end_of_thought|>``
+    and ``<|begin_of_solution|>...<|end_of_solution|>`` wrappers.
+
+    Args:
+        text: Raw model output.
+
+    Returns:
+        Tuple of (visible reply, discarded reasoning), both stripped.
+    """
+    reasoning = []
+    if "<think>" in text and "</think>" in text:
+        thinking, text = text.split("</think>", 1)
+        reasoning.append(thinking.replace("<think>", "").strip())
+    if "<|begin_of_thought|>" in text and "<|end_of_thought|>" in text:
+        thinking, text = text.split("<|end_of_thought|>", 1)
+        reasoning.append(thinking.replace("<|begin_of_thought|>", "").strip())
+    if "<|begin_of_solution|>" in text and "<|end_of_solution|>" in text:
+        text = text.split("<|begin_of_solution|>", 1)[1].split("<|end_of_solution|>", 1)[0]
+    return text.strip(), "\n".join(r for r in reasoning if r)
+
+
+class ReasoningStats:
+    """Latency and discarded reasoning tokens per (model, think setting).
+
+    Keeping the setting in the key lets admins compare a model before and
+    after reasoning is turned off or capped.
+    """
+
+    def __init__(self) -> None:
+        self._totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(
+            lambda: {"replies": 0, "latency": 0.0, "discarded_tokens": 0}
+        )
+
+    def record(self, model: str, think: Any, latency: float, discarded_tokens: int) -> None:
+        totals = self._totals[(model, think_label(think))]
+        totals["replies"] += 1
+        totals["latency"] += latency
+        totals["discarded_tokens"] += discarded_tokens
+
+    def summary(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Return per-(model, setting) reply count and average latency/discarded tokens."""
+        out = {}
+        for key, t in self._totals.items():
+            n = t["replies"] or 1
+            out[key] = {
+                "replies": t["replies"],
+                "avg_latency": t["latency"] / n,
+                "avg_discarded_tokens": t["discarded_tokens"] / n,
+            }
+        return out
+
+
+def _discarded_tokens(data: Dict[str, Any], reply: str, reasoning: str) -> int:
+    """Estimate generated tokens spent on reasoning that the room never sees."""
+    if not reasoning:
+        return 0
+    generated = data.get("eval_count")
+    if isinstance(generated, int) and generated > 0:
+        # Attribute generated tokens to reasoning by its share of the output
+        return round(generated * len(reasoning) / (len(reasoning) + len(reply)))
+    return max(1, len(reasoning) // 4)
+
+
+def extract_reply(
+    ctx: Any,
+    data: Dict[str, Any],
+    *,
+    who: str,
+    model: str,
+    think: Any,
+    elapsed: float,
+) -> str:
+    """Return the visible reply from a chat response, discarding reasoning.
+
+    Reasoning comes either from Ollama's native ``message.thinking`` field or
+    from inline markup in the content. It is logged for debugging, and the
+    latency and discarded token count are recorded on ``ctx.reasoning_stats``
+    when present.
+
+    Args:
+        ctx: Application context providing `log` and optionally `reasoning_stats`.
+        data: Chat response (``/api/chat`` shape).
+        who: Display name and user ID used in the thinking log line.
+        model: Model that produced the reply.
+        think: Think setting the request was sent with.
+        elapsed: Fallback latency in seconds when the response has no timing.
+
+    Returns:
+        Reply text with reasoning removed.
+    """
+    message = data.get("message") or {}
+    reply, reasoning = split_reasoning(message.get("content", "") or "")
+    native = (message.get("thinking") or "").strip()
+    if native:
+        reasoning = f"{native}\n{reasoning}".strip()
+    if reasoning:
+        try:
+            ctx.log(f"Model thinking for {who}: {reasoning}")
+        except Exception:
+            pass
+    latency = (data.get("total_duration") or 0) / 1e9 or elapsed
+    discarded = _discarded_tokens(data, reply, reasoning)
+    stats: Optional[ReasoningStats] = getattr(ctx, "reasoning_stats", None)
+    if stats is not None:
+        stats.record(model, think, latency, discarded)
+    logging.getLogger(__name__).debug(
+        "Reply from %s (think=%s) took %.2fs, discarded ~%d reasoning tokens", model, think_label(think), latency, discarded
+    )
+    return reply
+
+
+__all__ = [
+    "ReasoningStats",
+    "THINK_LEVELS",
+    "extract_reply",
+    "parse_think",
+    "resolve_think",
+    "split_reasoning",
+    "think_kwargs",
+    "think_label",
+]
@@ -0,0 +1,130 @@
+"""Adaptive timeouts, retry backoff and circuit breaking for Ollama calls."""
+
+from __future__ import annotations
+
+import random
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional
+
+
+class AdaptiveTimeouts:
+    """Per-model request timeouts derived from observed latency.
+
+    Once ``min_samples`` successful requests have been seen for a model, its
+    timeout is the ``percentile`` latency of the last ``window`` requests
+    times ``multiplier``, kept between ``floor`` and the caller's ceiling
+    (the configured ``ollama.timeout``). Until then the ceiling applies.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 0.95,
+        multiplier: float = 3.0,
+        floor: float = 60.0,
+        window: int = 100,
+        min_samples: int = 10,
+    ) -> None:
+        self.percentile = float(percentile)
+        self.multiplier = float(multiplier)
+        self.floor = float(floor)
+        self.min_samples = max(1, int(min_samples))
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=max(1, int(window))))
+
+    def observe(self, model: str, seconds: float) -> None:
+        """Record the latency of a successful request."""
+        self._samples[model].append(float(seconds))
+
+    def latency(self, model: str) -> Optional[float]:
+        """Return the configured latency percentile for ``model``, if known."""
+        samples = self._samples.get(model)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def timeout_for(self, model: str, ceiling: float) -> float:
+        """Return the timeout in seconds for the next request to ``model``."""
+        observed = self.latency(model)
+        if observed is None:
+            return ceiling
+        return min(ceiling, max(self.floor, observed * self.multiplier))
+
+
+class CircuitBreaker:
+    """Fail fast while a backend keeps failing.
+
+    After ``threshold`` consecutive failures the circuit opens and requests
+    are refused for ``cooldown`` seconds. The first request after that is
+    let through as a trial (half-open): success closes the circuit, failure
+    opens it for another cooldown.
+    """
+
+    def __init__(self, *, threshold: int = 5, cooldown: float = 30.0) -> None:
+        self.threshold = max(1, int(threshold))
+        self.cooldown = float(cooldown)
+        self.failures = 0
+        self.trips = 0
+        self._opened_at: Optional[float] = None
+        # Start of the current trial request; a trial that never reports back
+        # (e.g. cancelled) expires after another cooldown
+        self._trial_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if self.retry_after() > 0 else "half-open"
+
+    @property
+    def open(self) -> bool:
+        """True while requests would be refused (cooling down or a trial in flight)."""
+        if self._opened_at is None:
+            return False
+        now = time.monotonic()
+        if now - self._opened_at < self.cooldown:
+            return True
+        return self._trial_at is not None and now - self._trial_at < self.cooldown
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self._opened_at is None:
+            return True
+        if self.open:
+            return False
+        self._trial_at = time.monotonic()
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial_at = None
+
+    def release(self) -> None:
+        """End a trial request that failed for reasons unrelated to the backend (or was cancelled)."""
+        self._trial_at = None
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._opened_at is None and self.failures >= self.threshold:
+            self.trips += 1
+            self._opened_at = time.monotonic()
+        elif self._trial_at is not None:
+            # Failed trial: stay open for another cooldown
+            self._opened_at = time.monotonic()
+        self._trial_at = None
+
+    def retry_after(self) -> float:
+        """Seconds until the next trial request is allowed (0 when closed)."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 10.0) -> float:
+    """Return a "full jitter" exponential backoff delay for retry ``attempt`` (1-based)."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+__all__ = ["AdaptiveTimeouts", "CircuitBreaker", "backoff_delay"]
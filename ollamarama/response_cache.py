@@ -0,0 +1,161 @@
+"""Exact-match caching of deterministic Ollama chat responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def payload_key(payload: Dict[str, Any]) -> str:
+    """Return a canonical hash of a request payload.
+
+    Keys are sorted and whitespace removed, so equal payloads hash equally
+    regardless of dict ordering.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_deterministic(options: Optional[Dict[str, Any]]) -> bool:
+    """Whether sampling with ``options`` repeats exactly (``temperature: 0``)."""
+    try:
+        return options is not None and float(options.get("temperature", 1)) == 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+class ResponseCache:
+    """LRU cache of serialized responses with a TTL and a byte bound."""
+
+    def __init__(self, *, ttl: float = 600.0, max_bytes: int = 8_000_000) -> None:
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the cached response, or None."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            self._evict(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(entry[1])
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        """Store ``response``; entries larger than the whole budget are skipped."""
+        body = json.dumps(response, ensure_ascii=False, default=str)
+        size = len(body.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (time.monotonic(), body)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        _, body = self._entries.pop(key)
+        self.bytes -= len(body.encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedOllamaClient:
+    """Serve repeated deterministic chat requests from a `ResponseCache`.
+
+    Wraps an `AsyncOllamaClient` or `OllamaPool`. `chat` and
+    `chat_with_tools` consult the cache only when ``options`` pin
+    ``temperature`` to 0; every other request, and every other method,
+    goes straight to the wrapped client.
+    """
+
+    def __init__(self, inner: Any, cache: ResponseCache) -> None:
+        self.inner = inner
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def _cached(self, method: str, payload: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        if not is_deterministic(payload.get("options")):
+            return await getattr(self.inner, method)(**kwargs)
+        key = payload_key(payload)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = await getattr(self.inner, method)(**kwargs)
+        self.cache.put(key, response)
+        return response
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Return a cached response for a deterministic request, else forward it."""
+        payload = {"method": "chat", "model": model, "messages": messages, "options": options, "think": think}
+        return await self._cached(
+            "chat", payload, messages=messages, model=model, options=options, timeout=timeout, think=think
+        )
+
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Return a cached tool-enabled response for a deterministic request, else forward it."""
+        payload = {
+            "method": "chat_with_tools",
+            "model": model,
+            "messages": messages,
+            "options": options,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "think": think,
+        }
+        return await self._cached(
+            "chat_with_tools",
+            payload,
+            messages=messages,
+            model=model,
+            options=options,
+            tools=tools,
+            tool_choice=tool_choice,
+            timeout=timeout,
+            think=think,
+        )
+
+
+__all__ = ["CachedOllamaClient", "ResponseCache", "is_deterministic", "payload_key"]
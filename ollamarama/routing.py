@@ -0,0 +1,139 @@
+"""Complexity-based routing of `.ai` requests between a fast and a heavy model."""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .generation import Generation
+from .ollama_pool import conversation_key
+
+FAST = "fast"
+HEAVY = "heavy"
+
+_CODE = re.compile(
+    r"```|`[^`]+`|\b(?:def|function|func|fn)\s+\w+\s*\(|\bclass\s+[A-Z]\w*\s*[(:{]|\bimport\s+[\w.]+"
+    r"|=>|\w\(\)|\btraceback\b|\w+Error\b"
+)
+_DEMANDING = re.compile(
+    r"\b(?:explain|why|how (?:do|does|can|would|to)|write|code|debug|fix|implement|refactor|analy[sz]e|compare"
+    r"|prove|calculate|solve|step[- ]by[- ]step|summari[sz]e|translate|essay|plan|design|review)\b",
+    re.IGNORECASE,
+)
+_TOOLISH = re.compile(r"https?://|\b(?:search|look up|latest|news|weather|today|current|price|website)\b", re.IGNORECASE)
+
+_CLASSIFIER_PROMPT = (
+    "Decide whether a chat message needs a large, capable model. Answer COMPLEX for coding, "
+    "multi-step reasoning, maths, analysis, detailed explanations or long writing; answer SIMPLE "
+    "for greetings, banter, quick facts and short replies. Answer with one word: SIMPLE or COMPLEX."
+)
+
+
+class ModelRouter:
+    """Send each `.ai` request to ``fast_model`` or the heavy (active) model.
+
+    Requests are classified with cheap heuristics first: code, messages
+    longer than ``max_chars``, and (with tools enabled) likely tool use go
+    to the heavy model. Requests that only ask for demanding work
+    (explain, compare, solve, ...) are unclear; with a ``classifier_model``
+    a tiny model decides them, otherwise they go heavy. Everything else
+    goes to the fast model.
+
+    Share, reason counts and latency are tracked per route.
+    """
+
+    def __init__(
+        self,
+        fast_model: str,
+        *,
+        max_chars: int = 280,
+        classifier_model: Optional[str] = None,
+        classifier_timeout: float = 10.0,
+        window: int = 200,
+    ) -> None:
+        self.fast_model = fast_model
+        self.max_chars = int(max_chars)
+        self.classifier_model = classifier_model or None
+        self.classifier_timeout = float(classifier_timeout)
+        self.counts: Dict[str, int] = {FAST: 0, HEAVY: 0}
+        self.reasons: Dict[str, int] = {}
+        self._latency: Dict[str, Deque[float]] = {FAST: deque(maxlen=window), HEAVY: deque(maxlen=window)}
+        self.logger = logging.getLogger(__name__)
+
+    def heuristic(self, text: str, tools: bool = False) -> Tuple[Optional[str], str]:
+        """Classify ``text`` cheaply.
+
+        Returns:
+            Tuple of (route, or None when unclear, and the reason).
+        """
+        if _CODE.search(text):
+            return HEAVY, "code"
+        if len(text) > self.max_chars:
+            return HEAVY, "length"
+        if tools and _TOOLISH.search(text):
+            return HEAVY, "tools"
+        if _DEMANDING.search(text):
+            return None, "demanding"
+        return FAST, "short"
+
+    async def classify(self, ollama: Any, text: str) -> str:
+        """Ask the classifier model whether ``text`` needs the heavy model (heavy on failure)."""
+        messages = [{"role": "system", "content": _CLASSIFIER_PROMPT}, {"role": "user", "content": text[:1000]}]
+        # Not part of the user's conversation: no usage, quota or prefix-cache accounting for it
+        token = conversation_key.set(None)
+        try:
+            data = await ollama.chat(
+                messages=messages,
+                model=self.classifier_model,
+                options={"temperature": 0, "num_predict": 4},
+                timeout=self.classifier_timeout,
+            )
+        except Exception:
+            self.logger.debug("Routing classifier failed; using the heavy model", exc_info=True)
+            return HEAVY
+        finally:
+            conversation_key.reset(token)
+        answer = ((data.get("message") or {}).get("content") or "").strip().upper()
+        return FAST if answer.startswith("SIMPLE") else HEAVY
+
+    async def route(self, ctx: Any, generation: Generation, text: str, *, force_heavy: bool = False) -> str:
+        """Pick the route for a request and set ``generation.model`` for the fast one."""
+        if force_heavy:
+            route, reason = HEAVY, "forced"
+        else:
+            route, reason = self.heuristic(text, tools=bool(getattr(ctx, "tools_enabled", False)))
+            if route is None:
+                if self.classifier_model:
+                    route, reason = await self.classify(ctx.ollama, text), "classifier"
+                else:
+                    route = HEAVY
+        if route == FAST and self.fast_model != ctx.model:
+            generation.model = self.fast_model
+        generation.route = route
+        self.counts[route] += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.logger.debug("Routed request from %s to the %s model (%s)", generation.user_id, route, reason)
+        return route
+
+    def observe(self, generation: Generation) -> None:
+        """Record a routed generation's latency."""
+        if generation.route in self._latency and generation.finished_at is not None:
+            self._latency[generation.route].append(generation.elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        routes = {}
+        for route, samples in self._latency.items():
+            ordered = sorted(samples)
+            routes[route] = {
+                "requests": self.counts[route],
+                "share": self.counts[route] / total if total else 0.0,
+                "avg_latency": sum(ordered) / len(ordered) if ordered else 0.0,
+                "p95_latency": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] if ordered else 0.0,
+            }
+        return {"routes": routes, "reasons": dict(self.reasons)}
+
+
+__all__ = ["FAST", "HEAVY", "ModelRouter"]
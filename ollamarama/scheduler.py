@@ -0,0 +1,265 @@
+"""Fair scheduling of generations across rooms, users and models."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+Flow = Tuple[str, str]
+
+
+def _model_key(name: str) -> str:
+    """Normalize a model name so ``qwen3`` and ``qwen3:latest`` compare equal."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class _Waiter:
+    """A queued generation waiting for a model slot."""
+
+    __slots__ = ("finish", "seq", "start", "flow", "future", "enqueued_at")
+
+    def __init__(self, finish: float, seq: int, start: float, flow: Flow, future: asyncio.Future) -> None:
+        self.finish = finish
+        self.seq = seq
+        self.start = start
+        self.flow = flow
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class _ModelLane:
+    """Concurrency cap, fair queue and wait statistics for one model."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self.queue: List[_Waiter] = []
+        self.virtual_time = 0.0
+        self.finish_tags: Dict[Flow, float] = {}
+        self.waits: Deque[float] = deque(maxlen=256)
+        self.served = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for w in self.queue if not w.future.done())
+
+    def oldest_wait(self, now: float) -> float:
+        return max((now - w.enqueued_at for w in self.queue if not w.future.done()), default=0.0)
+
+
+class InferenceScheduler:
+    """Weighted fair queuing of generations with per-model concurrency caps.
+
+    Each (room, user) pair is a flow. A room's weight is shared between its
+    backlogged users, so a chatty room cannot starve other rooms and a chatty
+    user cannot starve the rest of their room. At most ``limit`` generations
+    run per model; set it to match the server's ``OLLAMA_NUM_PARALLEL``.
+
+    With ``batch_models`` enabled, requests for a model that is not resident
+    on the server wait until the current model's queue drains, so the server
+    does not reload weights on every interleaved request. A model whose
+    oldest request has waited ``max_batch_wait`` seconds forces a switch;
+    resident models (see `set_resident`) are preferred when switching.
+    """
+
+    def __init__(
+        self,
+        *,
+        default_limit: int = 4,
+        model_limits: Optional[Dict[str, int]] = None,
+        room_weights: Optional[Dict[str, float]] = None,
+        batch_models: bool = False,
+        max_batch_wait: float = 30.0,
+    ) -> None:
+        self.default_limit = max(1, int(default_limit))
+        self.model_limits = dict(model_limits or {})
+        self.room_weights = dict(room_weights or {})
+        self.batch_models = bool(batch_models)
+        self.max_batch_wait = float(max_batch_wait)
+        self.resident: Set[str] = set()
+        self.switches = 0
+        self._current: Optional[str] = None
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+
+    def set_resident(self, models: Iterable[str]) -> None:
+        """Record which models the server currently has loaded (from `/api/ps`)."""
+        self.resident = {_model_key(m) for m in models if m}
+        self._dispatch_all()
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            lane = _ModelLane(self.model_limits.get(model, self.default_limit))
+            self._lanes[model] = lane
+        return lane
+
+    def _tag(self, lane: _ModelLane, flow: Flow) -> Tuple[float, float]:
+        """Compute (start, finish) virtual times for a new request on ``flow``."""
+        room, user = flow
+        backlogged_peers = sum(
+            1 for (r, u), tag in lane.finish_tags.items() if r == room and u != user and tag > lane.virtual_time
+        )
+        weight = max(self.room_weights.get(room, 1.0), 1e-6) / (1 + backlogged_peers)
+        start = max(lane.virtual_time, lane.finish_tags.get(flow, lane.virtual_time))
+        finish = start + 1.0 / weight
+        lane.finish_tags[flow] = finish
+        if len(lane.finish_tags) > 1024:
+            lane.finish_tags = {f: t for f, t in lane.finish_tags.items() if t > lane.virtual_time}
+        return start, finish
+
+    async def acquire(self, model: str, room_id: str, user_id: str) -> float:
+        """Wait for a slot on ``model``.
+
+        Args:
+            model: Model the generation will run on.
+            room_id: Room the request came from.
+            user_id: User the request came from.
+
+        Returns:
+            Seconds spent waiting.
+        """
+        lane = self._lane(model)
+        flow = (room_id, user_id)
+        start, finish = self._tag(lane, flow)
+        if lane.active < lane.limit and lane.depth == 0 and self._eligible(model):
+            lane.active += 1
+            lane.virtual_time = max(lane.virtual_time, start)
+            lane.waits.append(0.0)
+            lane.served += 1
+            return 0.0
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(finish, next(self._seq), start, flow, future)
+        heapq.heappush(lane.queue, waiter)
+        self._dispatch_all()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled; hand the slot on
+                self.release(model)
+            raise
+        waited = time.monotonic() - waiter.enqueued_at
+        lane.waits.append(waited)
+        return waited
+
+    def release(self, model: str) -> None:
+        """Return a slot on ``model`` and wake the next fair waiter."""
+        lane = self._lane(model)
+        lane.active = max(0, lane.active - 1)
+        self._dispatch_all()
+
+    # ---- Model batching ----
+    def _is_resident(self, model: str) -> bool:
+        return _model_key(model) in self.resident
+
+    def _starved(self, now: float) -> List[str]:
+        """Models waiting behind the current one for longer than the batch bound."""
+        return [
+            m
+            for m, lane in self._lanes.items()
+            if m != self._current
+            and lane.depth
+            and not self._is_resident(m)
+            and lane.oldest_wait(now) >= self.max_batch_wait
+        ]
+
+    def _eligible(self, model: str) -> bool:
+        """Whether a request for ``model`` may start without forcing a reload."""
+        if not self.batch_models:
+            return True
+        if self._current is None:
+            self._current = model
+            return True
+        if model == self._current:
+            # Stop admitting more work once another model has waited too long,
+            # but always let a freshly switched-to model make progress
+            return not self._lane(model).active or not self._starved(time.monotonic())
+        return self._is_resident(model)
+
+    def _maybe_switch(self) -> None:
+        """Move to another model once the current one is drained (or must yield)."""
+        lane = self._lanes.get(self._current) if self._current is not None else None
+        now = time.monotonic()
+        if lane is not None and (lane.active or (lane.depth and not self._starved(now))):
+            return
+        waiting = [(m, ln) for m, ln in self._lanes.items() if ln.depth and m != self._current]
+        if not waiting:
+            if lane is not None and not lane.active and not lane.depth:
+                self._current = None
+            return
+        # Prefer models already loaded, then whoever has waited longest
+        nxt = max(waiting, key=lambda item: (self._is_resident(item[0]), item[1].oldest_wait(now)))[0]
+        if nxt != self._current:
+            self.switches += 1
+            self._current = nxt
+
+    def _dispatch_all(self) -> None:
+        if self.batch_models:
+            self._maybe_switch()
+        for model, lane in self._lanes.items():
+            if lane.queue and self._eligible(model):
+                self._dispatch(lane)
+
+    def _dispatch(self, lane: _ModelLane) -> None:
+        while lane.queue and lane.active < lane.limit:
+            waiter = heapq.heappop(lane.queue)
+            if waiter.future.done():
+                continue
+            lane.active += 1
+            lane.served += 1
+            lane.virtual_time = max(lane.virtual_time, waiter.start)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, model: str, room_id: str, user_id: str) -> AsyncIterator[float]:
+        """Hold a slot on ``model`` for the duration of the block.
+
+        Yields:
+            Seconds spent waiting for the slot.
+        """
+        waited = await self.acquire(model, room_id, user_id)
+        try:
+            yield waited
+        finally:
+            self.release(model)
+
+    def pending(self) -> int:
+        """Return the number of queued (not yet running) generations."""
+        return sum(lane.depth for lane in self._lanes.values())
+
+    def oldest_wait(self) -> float:
+        """Return how long the oldest queued generation has waited, in seconds."""
+        now = time.monotonic()
+        return max((lane.oldest_wait(now) for lane in self._lanes.values()), default=0.0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-model queue depth, concurrency and wait statistics."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for model, lane in self._lanes.items():
+            now = time.monotonic()
+            waiting = [now - w.enqueued_at for w in lane.queue if not w.future.done()]
+            waits = list(lane.waits)
+            out[model] = {
+                "active": lane.active,
+                "limit": lane.limit,
+                "queued": len(waiting),
+                "oldest_wait": max(waiting, default=0.0),
+                "avg_wait": (sum(waits) / len(waits)) if waits else 0.0,
+                "max_wait": max(waits, default=0.0),
+                "served": lane.served,
+                "current": model == self._current,
+                "resident": self._is_resident(model),
+            }
+        return out
+
+
+__all__ = ["InferenceScheduler"]
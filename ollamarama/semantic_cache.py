@@ -0,0 +1,253 @@
+"""Semantic response cache: reuse answers to paraphrased questions."""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
+
+
+def _scope(model: str, system_prompt: str, tools: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Key answers by model, persona (system prompt) and the tools offered."""
+    names = sorted(str((t.get("function") or {}).get("name", "")) for t in tools or [])
+    raw = "\0".join([model, system_prompt, *names])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _standalone_question(messages: List[Dict[str, str]]) -> Tuple[str, str]:
+    """Return (system prompt, question) for a request with no earlier turns.
+
+    Follow-ups ("why?", "continue") depend on the conversation before them,
+    so requests with any earlier user or assistant message get an empty
+    question and are never matched across conversations. The system prompt
+    joins every system message (persona and any running summary).
+    """
+    if not messages or messages[-1].get("role") != "user":
+        return "", ""
+    earlier = messages[:-1]
+    if any(m.get("role") != "system" for m in earlier):
+        return "", ""
+    return "\n".join(m.get("content", "") for m in earlier), messages[-1].get("content", "")
+
+
+class SemanticCache:
+    """Nearest-neighbour cache of answers keyed by question embeddings.
+
+    Embeddings are L2-normalised and stored as rows of one contiguous
+    float32 matrix, so a lookup is a single matrix-vector product over all
+    entries. Answers only match within the same scope (model and persona).
+    Once ``max_entries`` is reached, the least recently used row is
+    overwritten in place.
+
+    Requires NumPy.
+    """
+
+    def __init__(self, *, threshold: float = 0.92, max_entries: int = 2048) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the semantic cache (pip install numpy)")
+        self.threshold = float(threshold)
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        self._vectors: Optional[Any] = None
+        self._scope_ids: Any = np.zeros(self.max_entries, dtype=np.int64)
+        self._last_used: Any = np.zeros(self.max_entries, dtype=np.float64)
+        self._answers: List[Optional[Dict[str, Any]]] = [None] * self.max_entries
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        # Derived from the scope's hash, so no table of scopes grows with every custom prompt
+        return int(hashlib.sha256(scope.encode("utf-8")).hexdigest()[:15], 16)
+
+    @staticmethod
+    def _normalise(vector: Any) -> Any:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def lookup(self, scope: str, vector: Any) -> Tuple[Optional[Dict[str, Any]], float]:
+        """Return the best cached answer in ``scope`` above the threshold.
+
+        Returns:
+            Tuple of (answer or None, best similarity found).
+        """
+        best, score = None, 0.0
+        if self._size and self._vectors is not None and len(vector) == self._vectors.shape[1]:
+            sims = self._vectors[: self._size] @ self._normalise(vector)
+            sims[self._scope_ids[: self._size] != self._scope_id(scope)] = -1.0
+            idx = int(np.argmax(sims))
+            score = float(sims[idx])
+            if score >= self.threshold:
+                best = self._answers[idx]
+                self._last_used[idx] = time.monotonic()
+        if best is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best, score
+
+    def add(self, scope: str, vector: Any, answer: Dict[str, Any]) -> None:
+        """Store ``answer`` for the question embedded as ``vector``."""
+        v = self._normalise(vector)
+        if self._vectors is None or self._vectors.shape[1] != v.shape[0]:
+            # First entry (or a new embedding model) fixes the dimension
+            self._vectors = np.zeros((self.max_entries, v.shape[0]), dtype=np.float32)
+            self._size = 0
+        if self._size < self.max_entries:
+            idx = self._size
+            self._size += 1
+        else:
+            idx = int(np.argmin(self._last_used))
+        self._vectors[idx] = v
+        self._scope_ids[idx] = self._scope_id(scope)
+        self._last_used[idx] = time.monotonic()
+        self._answers[idx] = answer
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SemanticCachedOllamaClient:
+    """Answer paraphrases of earlier questions from a `SemanticCache`.
+
+    Wraps an Ollama client (or pool, or another wrapper). For `chat`,
+    `chat_with_tools` and `chat_stream` requests that open a conversation
+    (only system messages before the question), the question is embedded
+    with ``embed_model``; if a cached answer for the same model, system
+    prompt and tools is similar enough it is returned without generating
+    (as a single chunk when streaming). Only final answers are stored,
+    never replies that call tools. Follow-ups, questions longer than
+    ``max_chars`` and all other methods go straight to the wrapped client.
+    Embedding failures fall back to a normal request.
+    """
+
+    def __init__(self, inner: Any, cache: SemanticCache, *, embed_model: str, max_chars: int = 1000) -> None:
+        self.inner = inner
+        self.semantic_cache = cache
+        self.embed_model = embed_model
+        self.max_chars = int(max_chars)
+        self.logger = logging.getLogger(__name__)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def _lookup(
+        self, messages: List[Dict[str, Any]], model: str, tools: Optional[List[Dict[str, Any]]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, Any]]]:
+        """Return (cached answer or None, (scope, vector) to store the answer under, if any)."""
+        system, question = _standalone_question(messages)
+        if not question or len(question) > self.max_chars:
+            return None, None
+        try:
+            vector = (await self.inner.embed(model=self.embed_model, inputs=[question]))[0]
+        except Exception:
+            self.logger.debug("Embedding failed; skipping semantic cache", exc_info=True)
+            return None, None
+        scope = _scope(model, system, tools)
+        answer, score = self.semantic_cache.lookup(scope, vector)
+        if answer is not None:
+            self.logger.debug("Semantic cache hit (similarity %.3f)", score)
+            return copy.deepcopy(answer), None
+        return None, (scope, vector)
+
+    def _remember(self, slot: Optional[Tuple[str, Any]], response: Dict[str, Any]) -> None:
+        message = response.get("message") or {}
+        if slot is not None and message.get("content") and not message.get("tool_calls"):
+            self.semantic_cache.add(slot[0], slot[1], copy.deepcopy(response))
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Return a cached answer to a similar question, else forward and remember it."""
+        answer, slot = await self._lookup(messages, model)
+        if answer is not None:
+            return answer
+        response = await self.inner.chat(
+            messages=messages, model=model, options=options, timeout=timeout, think=think
+        )
+        self._remember(slot, response)
+        return response
+
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Return a cached final answer to a similar question, else forward and remember it."""
+        answer, slot = await self._lookup(messages, model, tools)
+        if answer is not None:
+            return answer
+        response = await self.inner.chat_with_tools(
+            messages=messages,
+            model=model,
+            options=options,
+            tools=tools,
+            tool_choice=tool_choice,
+            timeout=timeout,
+            think=think,
+        )
+        self._remember(slot, response)
+        return response
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        think: Any = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a cached answer as one final chunk, else stream and remember the assembled reply."""
+        answer, slot = await self._lookup(messages, model, tools)
+        if answer is not None:
+            yield {**answer, "done": True}
+            return
+        extra: Dict[str, Any] = {"tools": tools} if tools else {}
+        if tools and tool_choice is not None:
+            extra["tool_choice"] = tool_choice
+        parts: List[str] = []
+        calls_tools = False
+        async for chunk in self.inner.chat_stream(
+            messages=messages, model=model, options=options, timeout=timeout, think=think, **extra
+        ):
+            message = chunk.get("message") or {}
+            parts.append(message.get("content") or "")
+            calls_tools = calls_tools or bool(message.get("tool_calls"))
+            if chunk.get("done") and not calls_tools:
+                final = {k: v for k, v in chunk.items() if k not in ("message", "done")}
+                self._remember(slot, {**final, "message": {"role": "assistant", "content": "".join(parts)}})
+            yield chunk
+
+
+__all__ = ["SemanticCache", "SemanticCachedOllamaClient"]
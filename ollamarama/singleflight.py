@@ -0,0 +1,151 @@
+"""Share one upstream call between identical in-flight Ollama requests."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .response_cache import payload_key
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:  # type: ignore[type-arg]
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one.
+
+    The first caller (the leader) starts the call in its own task; callers
+    arriving while it runs (followers) await the same task. Every caller
+    receives the result or the exception. A cancelled caller only stops
+    waiting; the shared call is cancelled once no caller is left waiting.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``fn`` unless an identical call is already in flight, then await it.
+
+        Args:
+            key: Identity of the call (e.g. a payload hash).
+            fn: Zero-argument coroutine function performing the call.
+
+        Returns:
+            The call's result; followers receive a deep copy so callers
+            cannot alter each other's responses.
+        """
+        flight = self._flights.get(key)
+        follower = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._finish(k, f))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last one waiting: abandon the call so it frees its slot
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+        return copy.deepcopy(result) if follower else result
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved when every waiter went away
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self.in_flight, "leaders": self.leaders, "followers": self.followers}
+
+
+class CoalescingOllamaClient:
+    """Share upstream calls between identical concurrent chat requests.
+
+    Wraps an `AsyncOllamaClient` or `OllamaPool` (or a cache in front of
+    one). `chat` and `chat_with_tools` payloads are keyed like the response
+    cache; other methods go straight to the wrapped client.
+    """
+
+    def __init__(self, inner: Any, flights: Optional[SingleFlight] = None) -> None:
+        self.inner = inner
+        self.flights = flights or SingleFlight()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[int] = None,
+        stream: bool = False,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Forward a chat request, joining an identical one already in flight."""
+        key = payload_key({"method": "chat", "model": model, "messages": messages, "options": options, "think": think})
+        return await self.flights.do(
+            key,
+            lambda: self.inner.chat(messages=messages, model=model, options=options, timeout=timeout, think=think),
+        )
+
+    async def chat_with_tools(
+        self,
+        *,
+        messages: List[Dict[str, Any]],
+        model: str,
+        options: Optional[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        tool_choice: Optional[str] = "auto",
+        timeout: Optional[int] = None,
+        think: Any = None,
+    ) -> Dict[str, Any]:
+        """Forward a tool-enabled chat request, joining an identical one already in flight."""
+        key = payload_key(
+            {
+                "method": "chat_with_tools",
+                "model": model,
+                "messages": messages,
+                "options": options,
+                "tools": tools,
+                "tool_choice": tool_choice,
+                "think": think,
+            }
+        )
+        return await self.flights.do(
+            key,
+            lambda: self.inner.chat_with_tools(
+                messages=messages,
+                model=model,
+                options=options,
+                tools=tools,
+                tool_choice=tool_choice,
+                timeout=timeout,
+                think=think,
+            ),
+        )
+
+
+__all__ = ["CoalescingOllamaClient", "SingleFlight"]
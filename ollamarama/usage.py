@@ -0,0 +1,213 @@
+"""Token and timing accounting from Ollama response metadata."""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .ollama_pool import conversation_key
+
+_NS = 1e9
+
+
+class _Usage:
+    """Running totals plus a rolling window of generation speed for one key."""
+
+    __slots__ = (
+        "requests",
+        "prompt_tokens",
+        "completion_tokens",
+        "prompt_eval_seconds",
+        "eval_seconds",
+        "load_seconds",
+        "loads",
+        "total_seconds",
+        "last_prompt_tokens",
+        "_window",
+    )
+
+    def __init__(self, window: int) -> None:
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prompt_eval_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.total_seconds = 0.0
+        self.last_prompt_tokens = 0
+        # (prompt tokens, prompt seconds, generated tokens, generation seconds)
+        self._window: Deque[Tuple[int, float, int, float]] = deque(maxlen=window)
+
+    def add(self, prompt: int, prompt_s: float, completion: int, eval_s: float, load_s: float, total_s: float) -> None:
+        self.requests += 1
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.prompt_eval_seconds += prompt_s
+        self.eval_seconds += eval_s
+        self.total_seconds += total_s
+        # A load under 0.1s is just the model being looked up, not loaded
+        if load_s >= 0.1:
+            self.loads += 1
+            self.load_seconds += load_s
+        self.last_prompt_tokens = prompt
+        self._window.append((prompt, prompt_s, completion, eval_s))
+
+    def as_dict(self) -> Dict[str, Any]:
+        p_tok = sum(w[0] for w in self._window)
+        p_sec = sum(w[1] for w in self._window)
+        e_tok = sum(w[2] for w in self._window)
+        e_sec = sum(w[3] for w in self._window)
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "prompt_eval_seconds": self.prompt_eval_seconds,
+            "eval_seconds": self.eval_seconds,
+            "total_seconds": self.total_seconds,
+            "loads": self.loads,
+            "load_seconds": self.load_seconds,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "avg_prompt_tokens": self.prompt_tokens / self.requests if self.requests else 0.0,
+            "tokens_per_second": e_tok / e_sec if e_sec else 0.0,
+            "prompt_tokens_per_second": p_tok / p_sec if p_sec else 0.0,
+        }
+
+
+class UsageTracker:
+    """Aggregate Ollama token counts and timings per model, room and user.
+
+    The Ollama client calls `record` with every chat response (including the
+    final chunk of a stream). Room and user come from `conversation_key`
+    unless given explicitly. Rolling speeds cover the last ``window``
+    responses; at most ``max_keys`` rooms, users and conversations are kept,
+    least recently used first out. Listeners added with `add_listener` are
+    called with ``(model, room_id, user_id, prompt_tokens, completion_tokens)``
+    for every accounted response.
+    """
+
+    def __init__(self, *, window: int = 50, max_keys: int = 4096) -> None:
+        self.window = max(1, int(window))
+        self.max_keys = max(1, int(max_keys))
+        self.models: Dict[str, _Usage] = {}
+        self.rooms: "OrderedDict[str, _Usage]" = OrderedDict()
+        self.users: "OrderedDict[str, _Usage]" = OrderedDict()
+        self.conversations: "OrderedDict[Tuple[str, str], _Usage]" = OrderedDict()
+        self._listeners: List[Callable[[str, Optional[str], Optional[str], int, int], None]] = []
+
+    def add_listener(self, listener: Callable[[str, Optional[str], Optional[str], int, int], None]) -> None:
+        """Call ``listener`` with the model, room, user and token counts of every response."""
+        self._listeners.append(listener)
+
+    def _entry(self, table: "Dict[Any, _Usage]", key: Any) -> _Usage:
+        usage = table.get(key)
+        if usage is None:
+            usage = table[key] = _Usage(self.window)
+        if isinstance(table, OrderedDict):
+            table.move_to_end(key)
+            while len(table) > self.max_keys:
+                table.popitem(last=False)
+        return usage
+
+    def record(
+        self,
+        model: str,
+        data: Dict[str, Any],
+        *,
+        room_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> None:
+        """Account one chat response.
+
+        Args:
+            model: Model that produced the response.
+            data: Response (or final stream chunk) carrying Ollama's
+                ``*_count`` and ``*_duration`` fields; responses without
+                them are ignored.
+            room_id: Room to charge; defaults to the current conversation.
+            user_id: User to charge; defaults to the current conversation.
+        """
+        if not isinstance(data, dict) or "eval_count" not in data and "prompt_eval_count" not in data:
+            return
+        if room_id is None or user_id is None:
+            key = conversation_key.get()
+            if key is not None:
+                room_id = room_id or key[0]
+                user_id = user_id or key[1]
+        fields = (
+            int(data.get("prompt_eval_count") or 0),
+            (data.get("prompt_eval_duration") or 0) / _NS,
+            int(data.get("eval_count") or 0),
+            (data.get("eval_duration") or 0) / _NS,
+            (data.get("load_duration") or 0) / _NS,
+            (data.get("total_duration") or 0) / _NS,
+        )
+        self._entry(self.models, model).add(*fields)
+        if room_id is not None:
+            self._entry(self.rooms, room_id).add(*fields)
+        if user_id is not None:
+            self._entry(self.users, user_id).add(*fields)
+        if room_id is not None and user_id is not None:
+            self._entry(self.conversations, (room_id, user_id)).add(*fields)
+        for listener in self._listeners:
+            try:
+                listener(model, room_id, user_id, fields[0], fields[2])
+            except Exception:
+                pass
+
+    def snapshot(self, scope: str = "models") -> Dict[Any, Dict[str, Any]]:
+        """Return counters for ``scope`` (``models``, ``rooms``, ``users`` or ``conversations``)."""
+        table = getattr(self, scope)
+        return {key: usage.as_dict() for key, usage in table.items()}
+
+    def largest_prompts(self, n: int = 5) -> List[Tuple[Tuple[str, str], int]]:
+        """Return the conversations whose latest prompt was largest, biggest first."""
+        ranked = sorted(self.conversations.items(), key=lambda kv: kv[1].last_prompt_tokens, reverse=True)
+        return [(key, usage.last_prompt_tokens) for key, usage in ranked[:n]]
+
+
+# Error of the ~4 characters per token estimate, never counted as savings
+_ESTIMATE_ERROR = 0.15
+
+
+class PrefixCacheStats:
+    """Measure how much prompt evaluation the server's prefix cache saves.
+
+    Registered as a `UsageTracker` listener. The estimated size of the
+    prompt the history last handed out for a conversation is compared, once,
+    with Ollama's ``prompt_eval_count`` for the first response that follows
+    it: the conversation's own generation. Requests that did not take a
+    prompt from the history (prewarms, routing classifications, summaries
+    and tool follow-ups) are not counted. Differences within the estimate's
+    error are not counted as savings either, so the figure is a lower bound.
+    """
+
+    def __init__(self, history: Any) -> None:
+        self.history = history
+        self.models: Dict[str, List[int]] = {}
+
+    def record(self, model: str, room_id: Optional[str], user_id: Optional[str], prompt: int, completion: int) -> None:
+        """Account one response (`UsageTracker` listener)."""
+        if room_id is None or user_id is None:
+            return
+        estimated = self.history.take_last_prompt_tokens(room_id, user_id)
+        if not estimated:
+            return
+        entry = self.models.setdefault(model, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += estimated
+        entry[2] += max(0, estimated - int(prompt) - int(estimated * _ESTIMATE_ERROR))
+
+    def stats(self) -> Dict[str, Any]:
+        requests = sum(e[0] for e in self.models.values())
+        estimated = sum(e[1] for e in self.models.values())
+        saved = sum(e[2] for e in self.models.values())
+        return {
+            "requests": requests,
+            "estimated_tokens": estimated,
+            "saved_tokens": saved,
+            "saved_rate": saved / estimated if estimated else 0.0,
+        }
+
+
+__all__ = ["PrefixCacheStats", "UsageTracker"]
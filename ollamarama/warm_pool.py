@@ -0,0 +1,87 @@
+"""Keep the active model loaded and release idle ones."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class ModelWarmPool:
+    """Preload models ahead of use and unload them once idle.
+
+    The Ollama client calls `keep_alive_for` on every chat request, which
+    both records the model as recently used and supplies its ``keep_alive``.
+    Models idle for longer than ``idle_unload`` seconds are unloaded by
+    `unload_idle`, except the ones the caller asks to keep (the active model).
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        keep_alive: Any = None,
+        model_keep_alive: Optional[Dict[str, Any]] = None,
+        idle_unload: float = 0.0,
+    ) -> None:
+        self.client = client
+        self.keep_alive = keep_alive
+        self.model_keep_alive = dict(model_keep_alive or {})
+        self.idle_unload = float(idle_unload)
+        self.last_used: Dict[str, float] = {}
+        self.load_times: Dict[str, float] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def keep_alive_for(self, model: str) -> Any:
+        """Mark ``model`` as used now and return the ``keep_alive`` to request."""
+        self.last_used[model] = time.monotonic()
+        return self.model_keep_alive.get(model, self.keep_alive)
+
+    async def preload(self, model: str) -> float:
+        """Load ``model`` on the server and return the seconds it took.
+
+        Raises:
+            NetworkError: If the server could not load the model.
+        """
+        started = time.monotonic()
+        await self.client.load(model, keep_alive=self.keep_alive_for(model))
+        elapsed = time.monotonic() - started
+        self.load_times[model] = elapsed
+        self.logger.info("Loaded model %s in %.1fs", model, elapsed)
+        return elapsed
+
+    async def unload_idle(self, keep: Iterable[str] = ()) -> List[str]:
+        """Unload models idle past the threshold, sparing those in ``keep``.
+
+        Returns:
+            Names of the models that were unloaded.
+        """
+        if self.idle_unload <= 0:
+            return []
+        now = time.monotonic()
+        spared = set(keep)
+        idle = [m for m, used in self.last_used.items() if m not in spared and now - used >= self.idle_unload]
+        for model in idle:
+            try:
+                await self.client.unload(model)
+            except Exception:
+                self.logger.debug("Failed to unload model %s", model, exc_info=True)
+                continue
+            self.last_used.pop(model, None)
+            self.logger.info("Unloaded idle model %s", model)
+        return [m for m in idle if m not in self.last_used]
+
+    async def run(self, active: Callable[[], Iterable[str]]) -> None:
+        """Periodically unload idle models until cancelled.
+
+        Args:
+            active: Returns the models that must stay loaded.
+        """
+        interval = max(1.0, min(60.0, self.idle_unload / 2))
+        while True:
+            await asyncio.sleep(interval)
+            await self.unload_idle(active())
+
+
+__all__ = ["ModelWarmPool"]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from ollamarama.catalogue import ModelCatalogue, format_size
+from ollamarama.exceptions import NetworkError
+
+
+class FakeOllama:
+    def __init__(self):
+        self.tag_calls = 0
+        self.ps_calls = 0
+        self.fail = False
+        self.pulled = [
+            {
+                "name": "qwen3:latest",
+                "size": 5_200_000_000,
+                "details": {"parameter_size": "8.2B", "quantization_level": "Q4_K_M", "family": "qwen3"},
+            },
+            {"name": "llama3:8b", "size": 4_700_000_000, "details": {}},
+        ]
+        self.running = [{"name": "qwen3:latest", "size_vram": 6_000_000_000}]
+
+    async def tags(self):
+        self.tag_calls += 1
+        if self.fail:
+            raise NetworkError("connection refused")
+        return self.pulled
+
+    async def ps(self):
+        self.ps_calls += 1
+        if self.fail:
+            raise NetworkError("connection refused")
+        return self.running
+
+
+def test_format_size():
+    assert format_size(None) == ""
+    assert format_size(512) == "512 B"
+    assert format_size(4_700_000_000) == "4.7 GB"
+
+
+@pytest.mark.asyncio
+async def test_catalogue_describes_pulled_and_loaded_models():
+    ollama = FakeOllama()
+    catalogue = ModelCatalogue(ollama, ttl=60)
+    # Unknown until the first refresh
+    assert catalogue.is_pulled("qwen3") is None
+    loaded = []
+    catalogue.add_listener(loaded.append)
+    await catalogue.refresh()
+    assert catalogue.is_pulled("qwen3") is True
+    assert catalogue.is_pulled("llama3:8b") is True
+    assert catalogue.is_pulled("mistral") is False
+    assert loaded == [["qwen3:latest"]]
+    info = catalogue.describe("qwen3")
+    assert info["quantization"] == "Q4_K_M" and info["parameter_size"] == "8.2B"
+    assert info["loaded"] is True and info["size_vram"] == 6_000_000_000
+    assert catalogue.describe("llama3:8b")["loaded"] is False
+
+
+@pytest.mark.asyncio
+async def test_catalogue_refetches_tags_only_when_stale_and_keeps_entries_on_failure():
+    ollama = FakeOllama()
+    catalogue = ModelCatalogue(ollama, ttl=60)
+    await catalogue.refresh()
+    await catalogue.refresh()
+    assert ollama.tag_calls == 1 and ollama.ps_calls == 2
+    ollama.fail = True
+    await catalogue.refresh(tags=True)
+    assert catalogue.is_pulled("qwen3") is True and catalogue.is_loaded("qwen3")
+    assert catalogue.stats()["failures"] == 2
+
+
+@pytest.mark.asyncio
+async def test_catalogue_refresh_soon_runs_in_background_when_stale():
+    ollama = FakeOllama()
+    catalogue = ModelCatalogue(ollama, ttl=60)
+    catalogue.refresh_soon()
+    catalogue.refresh_soon()
+    assert ollama.tag_calls == 0
+    await asyncio.sleep(0)
+    assert ollama.tag_calls == 1
+    catalogue.refresh_soon()
+    await asyncio.sleep(0)
+    assert ollama.tag_calls == 1
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from ollamarama.compactor import HistoryCompactor
+from ollamarama.history import HistoryStore
+from ollamarama.scheduler import InferenceScheduler
+
+
+class SummaryOllama:
+    def __init__(self):
+        self.requests = []
+
+    async def chat(self, messages, model, options=None, timeout=None):
+        self.requests.append((model, messages))
+        return {"message": {"content": "<think>hmm</think>User likes cats."}}
+
+
+@pytest.mark.asyncio
+async def test_evicted_turns_become_running_summary():
+    hs = HistoryStore("you are ", ".", "helper", max_items=3)
+    ollama = SummaryOllama()
+    compactor = HistoryCompactor(hs, ollama, model=lambda: "small", scheduler=InferenceScheduler())
+    hs.on_evict = compactor.schedule
+    for i in range(4):
+        hs.add("!r", "@u", "user", f"turn {i}")
+    await asyncio.wait_for(compactor._task, 1)
+
+    model, prompt = ollama.requests[0]
+    assert model == "small" and "user: turn 0" in prompt[1]["content"]
+    msgs = hs.get("!r", "@u")
+    # Summary sits right after the system prompt, before the kept turns
+    assert msgs[1] == {"role": "system", "content": "Summary of the earlier conversation: User likes cats."}
+    assert [m["content"] for m in msgs[2:]] == ["turn 2", "turn 3"]
+    assert compactor.compactions == 1
+
+
+@pytest.mark.asyncio
+async def test_reset_discards_stale_summary():
+    hs = HistoryStore("you are ", ".", "helper", max_items=2)
+    hs.on_evict = lambda room, user: None
+    hs.add("!r", "@u", "user", "a")
+    hs.add("!r", "@u", "user", "b")
+    compactor = HistoryCompactor(hs, SummaryOllama(), model=lambda: "m")
+    epoch = hs.epoch("!r", "@u")
+    hs.reset("!r", "@u")
+    assert hs.take_evicted("!r", "@u") == []
+    assert hs.set_summary("!r", "@u", "old news", epoch) is False
+    assert await compactor.compact("!r", "@u") is False
+    assert hs.summary("!r", "@u") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_summary_keeps_turns_and_is_not_charged_to_the_user():
+    from ollamarama.ollama_pool import conversation_key
+
+    seen_keys = []
+
+    class FlakyOllama(SummaryOllama):
+        fail = True
+
+        async def chat(self, messages, model, options=None, timeout=None):
+            seen_keys.append(conversation_key.get())
+            if self.fail:
+                raise RuntimeError("server down")
+            return await super().chat(messages, model, options, timeout)
+
+    hs = HistoryStore("you are ", ".", "helper", max_items=3)
+    ollama = FlakyOllama()
+    compactor = HistoryCompactor(hs, ollama, model=lambda: "small")
+    hs.on_evict = compactor.schedule
+    token = conversation_key.set(("!r", "@u"))
+    try:
+        for i in range(4):
+            hs.add("!r", "@u", "user", f"turn {i}")
+    finally:
+        conversation_key.reset(token)
+    await asyncio.wait_for(compactor._task, 1)
+    assert seen_keys == [None]
+    assert [m["content"] for m in hs.take_evicted("!r", "@u")] == ["turn 0", "turn 1"]
+    hs.restore_evicted("!r", "@u", [{"role": "user", "content": "turn 0"}])
+    ollama.fail = False
+    assert await compactor.compact("!r", "@u") is True
+    assert "user: turn 0" in ollama.requests[0][1][1]["content"]
@@ -78,3 +78,32 @@ def test_env_overrides(tmp_path, monkeypatch):
     assert cfg.matrix.store_path == "st"
     assert cfg.matrix.server == "https://example.org"
 
+
+@pytest.mark.parametrize("num_ctx", ["lots", 100, 4096.5])
+def test_validate_num_ctx(tmp_path, num_ctx):
+    data = base_cfg()
+    data["ollama"]["options"]["num_ctx"] = num_ctx
+    cfg = load_config(str(write_cfg(tmp_path, data)))
+    ok, errs = validate_config(cfg)
+    assert not ok
+    assert any("num_ctx" in e for e in errs)
+
+
+@pytest.mark.parametrize("num_ctx", ["lots", 100, 4096.5])
+def test_validate_model_num_ctx(tmp_path, num_ctx):
+    data = base_cfg()
+    data["ollama"]["model_num_ctx"] = {"qwen3": num_ctx}
+    cfg = load_config(str(write_cfg(tmp_path, data)))
+    ok, errs = validate_config(cfg)
+    assert not ok
+    assert any("model_num_ctx" in e for e in errs)
+
+
+@pytest.mark.parametrize("bucket", ["lots", 100, 4096.5])
+def test_validate_num_ctx_buckets(tmp_path, bucket):
+    data = base_cfg()
+    data["ollama"]["num_ctx_buckets"] = [2048, bucket]
+    cfg = load_config(str(write_cfg(tmp_path, data)))
+    ok, errs = validate_config(cfg)
+    assert not ok
+    assert any("num_ctx_buckets" in e for e in errs)
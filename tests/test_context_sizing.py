@@ -0,0 +1,29 @@
+from ollamarama.context_sizing import ContextSizer
+
+
+def _payload(chars, model="m", **options):
+    return {"model": model, "messages": [{"role": "user", "content": "x" * chars}], "options": options}
+
+
+def test_sizer_picks_bucket_and_caps_at_model_limit():
+    sizer = ContextSizer(buckets=[2048, 8192, 32768], max_ctx=32768, model_max_ctx={"small": 4096})
+    assert sizer.num_ctx_for(_payload(100)) == 2048
+    # ~2500 prompt tokens + 1024 for the reply no longer fit 2048
+    assert sizer.num_ctx_for(_payload(10000, model="other")) == 8192
+    # num_predict replaces the default reply reserve
+    assert sizer.estimate(_payload(100, num_predict=100)) < sizer.estimate(_payload(100))
+    assert sizer.num_ctx_for(_payload(200000, model="small")) == 4096
+    assert sizer.num_ctx_for(_payload(10**6, model="other")) == 32768
+
+
+def test_sizer_grows_at_once_and_shrinks_after_a_streak():
+    sizer = ContextSizer(buckets=[2048, 8192], shrink_after=3)
+    assert sizer.num_ctx_for(_payload(100)) == 2048
+    assert sizer.num_ctx_for(_payload(20000)) == 8192
+    # Small requests keep the loaded window until enough of them fit a smaller one
+    assert [sizer.num_ctx_for(_payload(100)) for _ in range(4)] == [8192, 8192, 2048, 2048]
+    # Loads reuse the current window
+    assert sizer.num_ctx_for({"model": "m", "stream": False}) == 2048
+    assert sizer.num_ctx_for({"model": "unknown", "stream": False}) is None
+    assert sizer.stats()["counts"] == {2048: 3, 8192: 3}
+
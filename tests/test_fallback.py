@@ -0,0 +1,82 @@
+import pytest
+
+from ollamarama.exceptions import BackendBusy, BackendTimeout, NetworkError
+from ollamarama.fallback import FallbackChain, is_fallback_error
+
+
+def test_fallback_errors():
+    assert is_fallback_error(BackendTimeout("Timed out after 60s"))
+    assert is_fallback_error(BackendBusy("circuit open"))
+    assert is_fallback_error(NetworkError("500, message='Internal Server Error'", status=500))
+    assert is_fallback_error(NetworkError("connection refused"))
+    assert is_fallback_error(NetworkError("CUDA error: out of memory", status=400))
+    assert not is_fallback_error(NetworkError("404, message='model not found'", status=404))
+    assert not is_fallback_error(ValueError("bug"))
+
+
+@pytest.mark.asyncio
+async def test_failing_model_is_skipped_until_cooldown():
+    chain = FallbackChain({"big": ["mid", "small"]}, threshold=2, cooldown=60)
+    tried = []
+
+    async def attempt(model):
+        tried.append(model)
+        if model == "big":
+            raise BackendTimeout("Timed out after 60s")
+        return model
+
+    assert await chain.call("big", attempt) == ("mid", "mid")
+    assert await chain.call("big", attempt) == ("mid", "mid")
+    # Two consecutive failures open big's circuit: go straight to the fallback
+    tried.clear()
+    assert await chain.call("big", attempt) == ("mid", "mid")
+    assert tried == ["mid"]
+    assert chain.stats()["big"] == {"failures": 2, "fallbacks": 3, "state": "open"}
+
+
+@pytest.mark.asyncio
+async def test_bad_requests_and_failed_fallbacks_are_raised():
+    chain = FallbackChain({"big": ["small"]})
+
+    async def not_found(model):
+        raise NetworkError("model not found", status=404)
+
+    with pytest.raises(NetworkError):
+        await chain.call("big", not_found)
+    assert chain.failures == {}
+
+    async def down(model):
+        raise NetworkError("503", status=503)
+
+    with pytest.raises(NetworkError):
+        await chain.call("big", down)
+    assert chain.failures == {"big": 1, "small": 1}
+    # Models without a chain are only tried once
+    with pytest.raises(NetworkError):
+        await chain.call("other", down)
+
+
+@pytest.mark.asyncio
+async def test_trial_that_fails_for_unrelated_reasons_is_released(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("ollamarama.resilience.time.monotonic", lambda: now[0])
+    chain = FallbackChain({"big": ["small"]}, threshold=1, cooldown=30)
+    tried = []
+
+    async def attempt(model):
+        tried.append(model)
+        if model == "big":
+            raise errors.pop(0)
+        return model
+
+    errors = [BackendTimeout("Timed out after 60s"), NetworkError("bad request", status=400)]
+    assert await chain.call("big", attempt) == ("small", "small")
+    now[0] += 31
+    # The half-open trial on big fails with a bad request, which says nothing about big
+    with pytest.raises(NetworkError):
+        await chain.call("big", attempt)
+    errors.append(BackendTimeout("Timed out after 60s"))
+    tried.clear()
+    # So the next request is a trial on big again rather than waiting out another cooldown
+    assert await chain.call("big", attempt) == ("small", "small")
+    assert tried == ["big", "small"]
@@ -0,0 +1,211 @@
+import asyncio
+import datetime as dt
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.app_context import AppContext
+from ollamarama.app_router import _build_router
+from ollamarama.app_runtime import _make_text_handler
+from ollamarama.history import HistoryStore
+
+
+class FakeMatrix:
+    def __init__(self):
+        self.sent = []
+        self.edits = []
+        self.redacted = []
+        self._next = 0
+
+    async def send_text(self, room_id, body, html=None):
+        self._next += 1
+        event_id = f"$e{self._next}"
+        self.sent.append((room_id, event_id, body))
+        return event_id
+
+    async def edit_message(self, room_id, event_id, body, html=None):
+        self.edits.append((room_id, event_id, body))
+
+    async def redact(self, room_id, event_id, reason=None):
+        self.redacted.append(event_id)
+
+    async def display_name(self, user_id):
+        return user_id.strip("@")
+
+
+class GatedOllama:
+    """Holds every chat call until released, echoing the last user message."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.in_flight = 0
+        self.peak = 0
+
+    async def chat(self, messages, model, options=None, timeout=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await self.release.wait()
+        self.in_flight -= 1
+        return {"message": {"content": f"re: {messages[-1]['content']}"}}
+
+
+def _event(sender, body, event_id):
+    return SimpleNamespace(
+        sender=sender,
+        body=body,
+        event_id=event_id,
+        server_timestamp=dt.datetime.now().timestamp() * 1000 + 1000,
+    )
+
+
+def _ctx(matrix, ollama):
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=8),
+        matrix=matrix,
+        ollama=ollama,
+        admins=[],
+        bot_id="Bot",
+        thinking=True,
+        render=lambda s: None,
+        model="m",
+        options={},
+        timeout=5,
+        generations=set(),
+        log=lambda *a, **k: None,
+        logger=logging.getLogger("test"),
+    )
+    ctx.send_response = AppContext.send_response.__get__(ctx)
+    ctx.cancel_generations = AppContext.cancel_generations.__get__(ctx)
+    ctx.abandon_placeholder = AppContext.abandon_placeholder.__get__(ctx)
+    cfg = SimpleNamespace(matrix=SimpleNamespace(username="@bot:hs"))
+    security = SimpleNamespace(allow_devices=lambda sender: asyncio.sleep(0))
+    return ctx, _make_text_handler(ctx, cfg, _build_router(), security, dt.datetime.now())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_generations_keep_their_own_placeholders():
+    matrix = FakeMatrix()
+    ollama = GatedOllama()
+    ctx, on_text = _ctx(matrix, ollama)
+
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai one", "$u1"))
+    await on_text(SimpleNamespace(room_id="!b"), _event("@bob", ".ai two", "$u2"))
+    # Both dispatches returned while their generations are still running
+    await asyncio.sleep(0.05)
+    assert ollama.peak == 2 and len(ctx.generations) == 2
+
+    ollama.release.set()
+    for gen in list(ctx.generations):
+        await gen.task
+    await asyncio.sleep(0)  # let done-callbacks run
+    placeholders = {room: eid for room, eid, _ in matrix.sent}
+    finals = {room: (eid, body) for room, eid, body in matrix.edits if body.startswith("**")}
+    assert finals["!a"] == (placeholders["!a"], "**alice**:\nre: one")
+    assert finals["!b"] == (placeholders["!b"], "**bob**:\nre: two")
+    assert not ctx.generations
+
+
+@pytest.mark.asyncio
+async def test_new_message_and_stop_cancel_in_flight_generation():
+    matrix = FakeMatrix()
+    ollama = GatedOllama()
+    ctx, on_text = _ctx(matrix, ollama)
+
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai one", "$u1"))
+    await asyncio.sleep(0.05)
+    (first,) = ctx.generations
+    # A second request from the same user supersedes the first
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai two", "$u2"))
+    await asyncio.sleep(0.05)
+    assert first.task.cancelled()
+    assert matrix.redacted == ["$e1"] and len(ctx.generations) == 1
+
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".stop", "$u3"))
+    await asyncio.sleep(0.05)
+    assert not ctx.generations and matrix.redacted == ["$e1", "$e2"]
+    assert matrix.sent[-1][2] == "Stopped generating for alice"
+    # Nothing reached the room as a reply
+    assert not [body for _, _, body in matrix.edits if "re:" in body]
+
+
+@pytest.mark.asyncio
+async def test_governor_rejects_generation_past_hard_limit():
+    from ollamarama.governor import LoadGovernor
+
+    matrix = FakeMatrix()
+    ollama = GatedOllama()
+    ctx, on_text = _ctx(matrix, ollama)
+    scheduler = SimpleNamespace(pending=lambda: 50, oldest_wait=lambda: 0.0)
+    ctx.governor = LoadGovernor(scheduler, [], reject_pending=10)
+
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai one", "$u1"))
+    for gen in list(ctx.generations):
+        await gen.task
+    assert ollama.peak == 0
+    assert matrix.edits[-1] == ("!a", "$e1", "The bot is busy right now, please try again in a minute")
+    assert not ctx.history.get("!a", "@alice")[1:]
+
+
+@pytest.mark.asyncio
+async def test_debounce_merges_burst_into_one_generation():
+    matrix = FakeMatrix()
+    ollama = GatedOllama()
+    ollama.release.set()
+    ctx, on_text = _ctx(matrix, ollama)
+    ctx.debounce = 0.05
+
+    for i, text in enumerate(("first", "second", "third"), start=1):
+        await on_text(SimpleNamespace(room_id="!a"), _event("@alice", f".ai {text}", f"$u{i}"))
+    (gen,) = ctx.generations
+    await gen.task
+    # One placeholder, one generation, one merged user turn
+    assert len(matrix.sent) == 1 and ollama.peak == 1
+    assert ctx.history.get("!a", "@alice")[-2] == {"role": "user", "content": "first\nsecond\nthird"}
+    assert matrix.edits[-1][2] == "**alice**:\nre: first\nsecond\nthird"
+
+    # Messages after the burst was answered start a new one
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai again", "$u4"))
+    (gen,) = ctx.generations
+    await gen.task
+    assert len(matrix.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_throttled_user_is_refused_before_generating():
+    from ollamarama.quotas import TokenQuotas
+
+    matrix = FakeMatrix()
+    ollama = GatedOllama()
+    ctx, on_text = _ctx(matrix, ollama)
+    ctx.quotas = TokenQuotas(user_capacity=100, user_refill_per_minute=30)
+    ctx.quotas.record("m", "!a", "@alice", 500, 100)
+
+    await on_text(SimpleNamespace(room_id="!a"), _event("@alice", ".ai hello", "$u1"))
+    assert ollama.peak == 0 and not ctx.generations
+    assert matrix.sent[-1][2] == "alice, you have used your token allowance, please try again in 17m"
+
+
+@pytest.mark.asyncio
+async def test_router_sends_banter_to_fast_model_and_heavy_forces_main():
+    from ollamarama.routing import ModelRouter
+
+    models = []
+
+    class RecordingOllama:
+        async def chat(self, messages, model, options=None, timeout=None):
+            models.append(model)
+            return {"message": {"content": "ok"}}
+
+    matrix = FakeMatrix()
+    ctx, on_text = _ctx(matrix, RecordingOllama())
+    ctx.model_router = ModelRouter("tiny")
+
+    for i, text in enumerate((".ai lol nice", ".ai def f(x): return x", ".heavy lol nice"), start=1):
+        await on_text(SimpleNamespace(room_id="!a"), _event("@alice", text, f"$u{i}"))
+        for gen in list(ctx.generations):
+            await gen.task
+    assert models == ["tiny", "m", "m"]
+    st = ctx.model_router.stats()
+    assert st["reasons"] == {"short": 1, "code": 1, "forced": 1}
+    assert st["routes"]["fast"]["requests"] == 1 and st["routes"]["heavy"]["share"] == pytest.approx(2 / 3)
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from ollamarama.generation import Generation
+from ollamarama.governor import LoadGovernor, ShedTier
+
+
+def _governor(**kwargs):
+    load = {"pending": 0, "wait": 0.0}
+    scheduler = SimpleNamespace(pending=lambda: load["pending"], oldest_wait=lambda: load["wait"])
+    tiers = [ShedTier(pending=4, num_predict=256), ShedTier(pending=8, wait=30, num_predict=128, model="small")]
+    return LoadGovernor(scheduler, tiers, **kwargs), load
+
+
+def test_governor_escalates_through_tiers():
+    governor, load = _governor(reject_pending=12)
+    assert governor.assess().tier == 0
+    load["pending"] = 5
+    assert governor.assess().num_predict == 256
+    # The oldest wait alone can trigger a tier
+    load.update(pending=2, wait=45.0)
+    decision = governor.assess()
+    assert (decision.tier, decision.num_predict, decision.model) == (2, 128, "small")
+    load["pending"] = 12
+    assert governor.assess().reject
+    assert governor.stats()["tiers"] == {0: 1, 1: 1, 2: 1} and governor.rejected == 1
+
+
+def test_apply_caps_num_predict_without_raising_it():
+    governor, load = _governor()
+    load["pending"] = 9
+    decision = governor.assess()
+    gen = Generation("!r", "@u")
+    governor.apply(decision, gen, {"temperature": 0.7})
+    assert gen.resolve_model("big") == "small"
+    assert gen.resolve_options({"temperature": 0.7}) == {"temperature": 0.7, "num_predict": 128}
+    gen = Generation("!r", "@u")
+    governor.apply(decision, gen, {"num_predict": 64})
+    assert gen.resolve_options({"num_predict": 64}) == {"num_predict": 64}
@@ -20,7 +20,7 @@ class FakeMatrix:
 
 
 class FailingOllama:
-    def chat(self, *a, **k):
+    async def chat(self, *a, **k):
         raise RuntimeError("boom")
 
 
@@ -30,7 +30,7 @@ async def _to_thread(fn, *a, **kw):
 
 
 def _make_send_response(matrix):
-    async def send_response(room_id, body, html=None):
+    async def send_response(room_id, body, html=None, generation=None):
         await matrix.send_text(room_id, body, html=html)
     return send_response
 
@@ -74,3 +74,130 @@ async def test_handle_x_error_path_sends_message():
     assert ctx.matrix.sent, "should send error message"
     assert "Something went wrong" in ctx.matrix.sent[-1][1]
 
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_reports_busy_backend():
+    from ollamarama.exceptions import BackendBusy
+
+    class BusyOllama:
+        async def chat(self, *a, **k):
+            raise BackendBusy("circuit open")
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=4),
+        matrix=FakeMatrix(),
+        ollama=BusyOllama(),
+        render=lambda s: None,
+        model="m",
+        options={},
+        timeout=5,
+        log=lambda *a, **k: None,
+    )
+    ctx.send_response = _make_send_response(ctx.matrix)
+    await handle_ai(ctx, "!r", "@u", "User", "hello")
+    assert "Backend busy" in ctx.matrix.sent[-1][1]
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_falls_back_to_lighter_model():
+    from ollamarama.exceptions import NetworkError
+    from ollamarama.fallback import FallbackChain
+
+    calls = []
+
+    class OomOllama:
+        async def chat(self, messages, model, options=None, timeout=None):
+            calls.append((model, timeout))
+            if model == "big":
+                raise NetworkError("model requires more system memory (40 GiB) than is available", status=500)
+            return {"message": {"content": "small answer"}}
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=4),
+        matrix=FakeMatrix(),
+        ollama=OomOllama(),
+        render=lambda s: None,
+        model="big",
+        options={},
+        timeout=60,
+        fallback=FallbackChain({"big": ["small"]}, timeout=20),
+        log=lambda *a, **k: None,
+    )
+    ctx.send_response = _make_send_response(ctx.matrix)
+    await handle_ai(ctx, "!r", "@u", "User", "hello")
+    assert calls == [("big", 20), ("small", 60)]
+    assert ctx.matrix.sent[-1][1] == "**User**:\nsmall answer\n\n*(answered by small: big is unavailable)*"
+    # The marker is not stored in history
+    assert ctx.history.get("!r", "@u")[-1] == {"role": "assistant", "content": "small answer"}
+    assert ctx.fallback.stats() == {"big": {"failures": 1, "fallbacks": 1, "state": "closed"}}
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_falls_back_with_tools_enabled():
+    from ollamarama.app_context import AppContext
+    from ollamarama.exceptions import BackendTimeout
+    from ollamarama.fallback import FallbackChain
+
+    calls = []
+
+    class TimeoutOllama:
+        async def chat_with_tools(self, *, messages, model, options, tools, tool_choice=None, timeout=None):
+            calls.append((model, timeout))
+            if model == "big":
+                raise BackendTimeout("timed out after 20s")
+            return {"message": {"content": "small answer"}}
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=4),
+        matrix=FakeMatrix(),
+        ollama=TimeoutOllama(),
+        render=lambda s: None,
+        model="big",
+        options={},
+        timeout=60,
+        tools_enabled=True,
+        tools_schema=[],
+        fallback=FallbackChain({"big": ["small"]}, timeout=20),
+        log=lambda *a, **k: None,
+    )
+    ctx.respond_with_tools = AppContext.respond_with_tools.__get__(ctx)
+    ctx.send_response = _make_send_response(ctx.matrix)
+    await handle_ai(ctx, "!r", "@u", "User", "hello")
+    assert calls == [("big", 20), ("small", 60)]
+    assert ctx.matrix.sent[-1][1].startswith("**User**:\nsmall answer")
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_tool_path_reports_busy_and_never_sends_empty_replies():
+    from ollamarama.app_context import AppContext
+    from ollamarama.exceptions import BackendBusy
+
+    class ToolOllama:
+        busy = True
+
+        async def chat_with_tools(self, **kwargs):
+            if self.busy:
+                raise BackendBusy("circuit open")
+            return {"message": {"content": "  "}}
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=4),
+        matrix=FakeMatrix(),
+        ollama=ToolOllama(),
+        render=lambda s: None,
+        model="m",
+        options={},
+        timeout=5,
+        tools_enabled=True,
+        tools_schema=[],
+        log=lambda *a, **k: None,
+    )
+    ctx.respond_with_tools = AppContext.respond_with_tools.__get__(ctx)
+    ctx.send_response = _make_send_response(ctx.matrix)
+    await handle_ai(ctx, "!r", "@u", "User", "hello")
+    assert ctx.matrix.sent[-1][1] == "Backend busy, please try again shortly"
+    ctx.ollama.busy = False
+    await handle_ai(ctx, "!r", "@u", "User", "hello again")
+    assert ctx.matrix.sent[-1][1] == "No reply was generated, please try again"
+    assert all(m["role"] != "assistant" for m in ctx.history.get("!r", "@u"))
@@ -1,4 +1,5 @@
 import asyncio
+import logging
 from types import SimpleNamespace
 
 import pytest
@@ -21,7 +22,7 @@ class FakeOllama:
     def __init__(self, response_text):
         self.response_text = response_text
 
-    def chat(self, messages, model, options=None, timeout=None):
+    async def chat(self, messages, model, options=None, timeout=None):
         return {"message": {"content": self.response_text}}
 
 
@@ -30,7 +31,7 @@ async def _to_thread(fn, *a, **kw):
 
 
 def _make_send_response(matrix):
-    async def send_response(room_id, body, html=None):
+    async def send_response(room_id, body, html=None, generation=None):
         await matrix.send_text(room_id, body, html=html)
     return send_response
 
@@ -57,6 +58,43 @@ async def test_handle_model_show_and_set_and_reset():
     assert ctx.model == ctx.default_model
 
 
+class FakeWarmPool:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.loaded = []
+
+    async def preload(self, model):
+        if model in self.fail:
+            raise RuntimeError("model not found")
+        self.loaded.append(model)
+        return 2.5
+
+
+@pytest.mark.asyncio
+async def test_handle_model_preloads_before_confirming():
+    ctx = SimpleNamespace(
+        model="qwen3",
+        default_model="qwen3",
+        models={"qwen": "qwen3", "llama": "llama3"},
+        render=lambda s: None,
+        matrix=FakeMatrix(),
+        log=lambda *a, **k: None,
+        warm_pool=FakeWarmPool(fail={"missing"}),
+        _model_loads=set(),
+    )
+    await handle_model(ctx, "!r", "@u", "Admin", "llama")
+    # The load runs in the background; the switch happens once it is done
+    assert ctx.model == "qwen3" and len(ctx._model_loads) == 1
+    await asyncio.gather(*ctx._model_loads)
+    assert ctx.warm_pool.loaded == ["llama3"] and ctx.model == "llama3"
+    assert "loaded in 2.5s" in ctx.matrix.sent[-1][1]
+    # A model that cannot be loaded leaves the current one in place
+    await handle_model(ctx, "!r", "@u", "Admin", "missing")
+    await asyncio.gather(*ctx._model_loads)
+    assert ctx.model == "llama3"
+    assert "Failed to load" in ctx.matrix.sent[-1][1]
+
+
 @pytest.mark.asyncio
 async def test_handle_ai_strips_thinking_markers():
     # Include all supported markers in a single response
@@ -83,6 +121,33 @@ async def test_handle_ai_strips_thinking_markers():
     assert "final answer" in sent_body or "Hello" in sent_body
 
 
+@pytest.mark.asyncio
+async def test_handle_ai_passes_room_think_setting():
+    seen = {}
+
+    class ThinkOllama:
+        async def chat(self, messages, model, options=None, timeout=None, think=None):
+            seen["think"] = think
+            return {"message": {"content": "short answer", "thinking": ""}, "eval_count": 2}
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=8),
+        matrix=FakeMatrix(),
+        ollama=ThinkOllama(),
+        render=lambda s: None,
+        model="qwen3",
+        options={},
+        timeout=10,
+        log=lambda *a, **k: None,
+        think=True,
+        room_think={"!r": False},
+    )
+    ctx.send_response = _make_send_response(ctx.matrix)
+    await handle_ai(ctx, "!r", "@u", "User", "hi")
+    assert seen["think"] is False
+    assert ctx.matrix.sent[-1][1].endswith("short answer")
+
+
 @pytest.mark.asyncio
 async def test_handle_ai_trims_whitespace_simple():
     ctx = SimpleNamespace(
@@ -120,3 +185,137 @@ async def test_handle_help_splits_admin_section():
     # If repo help.txt has the admin section, there should be 2 messages
     if "~~~" in open("help.md").read():
         assert len(ctx.matrix.sent) == 2
+
+
+class StreamingMatrix(FakeMatrix):
+    def __init__(self):
+        super().__init__()
+        self.edits = []
+
+    async def send_text(self, room_id, body, html=None):
+        await super().send_text(room_id, body, html=html)
+        return "$evt"
+
+    async def edit_message(self, room_id, event_id, body, html=None):
+        self.edits.append((event_id, body))
+
+
+class StreamingOllama(FakeOllama):
+    async def chat_stream(self, messages, model, options=None, timeout=None):
+        for piece in ("<think>hmm</think>", "Hello", " world"):
+            yield {"message": {"content": piece}, "done": False}
+        yield {"message": {"content": ""}, "done": True, "eval_count": 3}
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_streams_into_placeholder():
+    from ollamarama.app_context import AppContext
+
+    matrix = StreamingMatrix()
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=8),
+        matrix=matrix,
+        ollama=StreamingOllama(""),
+        render=lambda s: None,
+        model="qwen3",
+        options={},
+        timeout=10,
+        stream=True,
+        stream_edit_interval=0,
+        log=lambda *a, **k: None,
+        logger=logging.getLogger("test"),
+    )
+    for name in ("stream_reply", "send_response", "_show_partial"):
+        setattr(ctx, name, getattr(AppContext, name).__get__(ctx))
+    await handle_ai(ctx, "!r", "@u", "User", "hi")
+    # First visible chunk creates the message; later chunks and the final reply edit it
+    assert matrix.sent == [("!r", "**User**:\nHello", None)]
+    assert all("hmm" not in body for _, body in matrix.edits)
+    assert matrix.edits[-1] == ("$evt", "**User**:\nHello world")
+    assert ctx.history.get("!r", "@u")[-1] == {"role": "assistant", "content": "Hello world"}
+
+
+@pytest.mark.asyncio
+async def test_handle_model_answers_from_catalogue_and_refuses_unpulled():
+    class FakeCatalogue:
+        def __init__(self):
+            self.refreshed = 0
+
+        def refresh_soon(self):
+            self.refreshed += 1
+
+        def is_pulled(self, model):
+            return model == "qwen3"
+
+        def describe(self, model):
+            if model == "qwen3":
+                return {"pulled": True, "loaded": True, "size": 5_200_000_000, "quantization": "Q4_K_M"}
+            return {"pulled": False, "loaded": False}
+
+    ctx = SimpleNamespace(
+        model="qwen3",
+        default_model="qwen3",
+        models={"qwen": "qwen3", "llama": "llama3"},
+        render=lambda s: None,
+        matrix=FakeMatrix(),
+        log=lambda *a, **k: None,
+        catalogue=FakeCatalogue(),
+        warm_pool=FakeWarmPool(),
+    )
+    await handle_model(ctx, "!r", "@u", "Admin", "")
+    body = ctx.matrix.sent[-1][1]
+    assert "- **qwen** (current): Q4_K_M, 5.2 GB, loaded" in body
+    assert "- **llama**: not pulled" in body
+    assert ctx.catalogue.refreshed == 1
+    # Switching to a model that is not pulled never reaches the server
+    await handle_model(ctx, "!r", "@u", "Admin", "llama")
+    assert ctx.model == "qwen3" and ctx.warm_pool.loaded == []
+    assert "not pulled" in ctx.matrix.sent[-1][1]
+
+
+@pytest.mark.asyncio
+async def test_handle_ai_streams_with_tools():
+    from ollamarama.app_context import AppContext
+
+    class ToolStreamingOllama(FakeOllama):
+        def __init__(self):
+            super().__init__("")
+            self.turns = []
+
+        async def chat_stream(self, messages, model, options=None, timeout=None, tools=None, tool_choice=None):
+            self.turns.append((len(tools or []), tool_choice, timeout))
+            if len(self.turns) == 1:
+                call = {"function": {"name": "lookup", "arguments": {"q": "x"}}}
+                yield {"message": {"content": "", "tool_calls": [call]}, "done": False}
+                yield {"message": {"content": ""}, "done": True}
+                return
+            for piece in ("It is", " 42"):
+                yield {"message": {"content": piece}, "done": False}
+            yield {"message": {"content": ""}, "done": True, "eval_count": 2}
+
+    matrix = StreamingMatrix()
+    schema = [{"type": "function", "function": {"name": "lookup", "parameters": {}}}]
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=8),
+        matrix=matrix,
+        ollama=ToolStreamingOllama(),
+        to_thread=_to_thread,
+        render=lambda s: None,
+        model="qwen3",
+        options={},
+        timeout=10,
+        stream=True,
+        stream_edit_interval=0,
+        tools_enabled=True,
+        tools_schema=schema,
+        log=lambda *a, **k: None,
+        logger=logging.getLogger("test"),
+        _execute_tool=lambda name, args: "42",
+    )
+    for name in ("stream_reply", "send_response", "_show_partial", "respond_with_tools"):
+        setattr(ctx, name, getattr(AppContext, name).__get__(ctx))
+    await handle_ai(ctx, "!r", "@u", "User", "what is it")
+    # Both model turns are streamed with the tool schemas, tool choice and timeout; the answer grows in one message
+    assert ctx.ollama.turns == [(1, "auto", 10), (1, "auto", 10)]
+    assert matrix.sent == [("!r", "**User**:\nIt is", None)]
+    assert matrix.edits[-1] == ("$evt", "**User**:\nIt is 42")
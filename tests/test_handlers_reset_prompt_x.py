@@ -1,4 +1,5 @@
 import asyncio
+import logging
 from types import SimpleNamespace
 
 import pytest
@@ -25,7 +26,7 @@ class FakeOllama:
     def __init__(self, response_text="ok"):
         self.response_text = response_text
 
-    def chat(self, messages, model, options=None, timeout=None):
+    async def chat(self, messages, model, options=None, timeout=None):
         return {"message": {"content": self.response_text}}
 
 
@@ -34,7 +35,7 @@ async def _to_thread(fn, *a, **kw):
 
 
 def _make_send_response(matrix):
-    async def send_response(room_id, body, html=None):
+    async def send_response(room_id, body, html=None, generation=None):
         await matrix.send_text(room_id, body, html=html)
     return send_response
 
@@ -187,3 +188,47 @@ async def test_handle_x_keeps_matrix_id_targeting():
 
     assert matrix.sent
     assert ctx.history.get(room, target)[-2] == {"role": "user", "content": "hello"}
+
+
+@pytest.mark.asyncio
+async def test_reset_prewarms_system_prompt_but_persona_does_not():
+    from ollamarama.app_context import AppContext
+
+    calls = []
+
+    class RecordingOllama(FakeOllama):
+        async def chat(self, messages, model, options=None, timeout=None):
+            calls.append((messages, options))
+            return await super().chat(messages, model, options=options, timeout=timeout)
+
+    ctx = SimpleNamespace(
+        history=HistoryStore("you are ", ".", "helper", max_items=8),
+        matrix=FakeMatrix(),
+        ollama=RecordingOllama("hi"),
+        model="m",
+        options={"temperature": 0.5},
+        timeout=5,
+        prewarm_prompts=True,
+        bot_id="Bot",
+        render=lambda s: None,
+        log=lambda *a, **k: None,
+        logger=logging.getLogger("test"),
+    )
+    ctx.prewarm_prompt = AppContext.prewarm_prompt.__get__(ctx)
+    ctx.send_response = _make_send_response(ctx.matrix)
+
+    # The intro reply evaluates the new prompt right away, so it is not prewarmed
+    await handle_persona(ctx, "!r", "@u", "U", "pirate")
+    await asyncio.sleep(0)
+    assert all(len(messages) > 1 for messages, _ in calls)
+
+    calls.clear()
+    await handle_reset(ctx, "!r", "@u", "U", "")
+    await asyncio.sleep(0)
+    assert calls == [([{"role": "system", "content": "you are helper."}], {"temperature": 0.5, "num_predict": 1})]
+
+    ctx.prewarm_prompts = False
+    calls.clear()
+    await handle_reset(ctx, "!r", "@u", "U", "")
+    await asyncio.sleep(0)
+    assert not calls
@@ -1,4 +1,4 @@
-from ollamarama.history import HistoryStore
+from ollamarama.history import HistoryStore, estimate_tokens, token_budget
 
 
 def test_history_prompt_and_trim():
@@ -16,3 +16,48 @@ def test_history_prompt_and_trim():
     # ensure system preserved at index 0 when present
     assert msgs[0]["role"] in ("system", "user")
 
+
+def test_history_token_budget_trims_and_windows():
+    assert token_budget(4096) == 3072 and token_budget(4096, 512) == 3584
+    hs = HistoryStore("you are ", ".", "helper", max_items=100, max_tokens=200, model_max_tokens={"small": 30})
+    room, user = "!r", "@u"
+    hs.add(room, user, "user", "x" * 800)  # a pasted log
+    for i in range(5):
+        hs.add(room, user, "user", f"short message {i}")
+    # Stored history is trimmed to the largest budget, oldest first
+    stored = hs.get(room, user)
+    assert stored[0]["role"] == "system" and "x" * 800 not in [m["content"] for m in stored]
+    assert hs.token_count(room, user) <= 200
+    assert hs.token_count(room, user) == sum(estimate_tokens(m["content"]) for m in stored)
+    # A smaller model gets only the newest messages that fit its budget
+    small = hs.get(room, user, model="small")
+    assert small[0]["role"] == "system" and small[-1]["content"] == "short message 4"
+    assert sum(estimate_tokens(m["content"]) for m in small) <= 30 and len(small) < len(stored)
+    # Replacing the system prompt refreshes the cached estimates
+    hs.init_prompt(room, user, custom="c" * 40)
+    assert hs.token_count(room, user) == estimate_tokens("c" * 40)
+
+
+def test_block_trimming_keeps_prefix_stable():
+    h = HistoryStore("you are ", ".", "helper", max_items=9, trim_block=4)
+    prefixes = []
+    for i in range(12):
+        h.add("!r", "@u", "user", f"q{i}")
+        h.add("!r", "@u", "assistant", f"a{i}")
+        prefixes.append(h.get("!r", "@u")[1]["content"])
+    # One message at a time would shift the prefix every turn past the limit
+    assert prefixes[4:] == ["q2", "q2", "q4", "q4", "q6", "q6", "q8", "q8"]
+    msgs = h.get("!r", "@u")
+    assert msgs[0]["role"] == "system" and msgs[1]["role"] == "user" and len(msgs) <= 9
+
+
+def test_block_window_for_token_budget_and_prompt_estimate():
+    h = HistoryStore("you are ", ".", "helper", max_items=100, model_max_tokens={"m": 40}, trim_block=4)
+    starts = []
+    for i in range(12):
+        h.add("!r", "@u", "user", f"q{i}")
+        msgs = h.get("!r", "@u", model="m")
+        starts.append(msgs[1]["content"])
+        assert h.last_prompt_tokens("!r", "@u") == sum(estimate_tokens(m["content"]) for m in msgs)
+    # The window start only moves in steps of four messages
+    assert starts == ["q0"] * 6 + ["q4"] * 4 + ["q8"] * 2
@@ -1,6 +1,10 @@
+import json
 from types import SimpleNamespace
 
-from ollamarama.ollama_client import OllamaClient
+import pytest
+
+from ollamarama.exceptions import NetworkError
+from ollamarama.ollama_client import AsyncOllamaClient, OllamaClient
 
 
 class DummyResp:
@@ -48,3 +52,136 @@ def test_health():
     c = OllamaClient(base_url="http://x/api", session=s)
     assert c.health() is True
 
+
+@pytest.fixture
+async def ollama_server():
+    from aiohttp import web
+
+    seen = []
+
+    async def chat(request):
+        payload = await request.json()
+        seen.append(payload)
+        if payload["model"] == "huge":
+            return web.json_response({"error": "model requires more system memory than is available"}, status=500)
+        if not payload["stream"]:
+            return web.json_response({"message": {"role": "assistant", "content": "pong"}, "done": True})
+        resp = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await resp.prepare(request)
+        for piece, done in (("po", False), ("ng", False), ("", True)):
+            await resp.write((json.dumps({"message": {"content": piece}, "done": done}) + "\n").encode())
+        await resp.write_eof()
+        return resp
+
+    async def tags(request):
+        return web.json_response({"models": [{"name": "qwen3"}]})
+
+    async def generate(request):
+        payload = await request.json()
+        seen.append(payload)
+        return web.json_response({"model": payload["model"], "done": True, "done_reason": "load"})
+
+    async def embed(request):
+        payload = await request.json()
+        seen.append(payload)
+        return web.json_response({"model": payload["model"], "embeddings": [[0.1, 0.2] for _ in payload["input"]]})
+
+    app = web.Application()
+    app.router.add_post("/api/chat", chat)
+    app.router.add_post("/api/embed", embed)
+    app.router.add_post("/api/generate", generate)
+    app.router.add_get("/api/tags", tags)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}/api", seen
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_async_client_chat_stream_and_tags(ollama_server):
+    base_url, seen = ollama_server
+    responses = []
+    c = AsyncOllamaClient(
+        base_url=base_url, timeout=5, max_concurrency=2, on_response=lambda model, data: responses.append(model)
+    )
+    try:
+        data = await c.chat(messages=[{"role": "user", "content": "ping"}], model="m", options={"seed": 1})
+        assert data["message"]["content"] == "pong"
+        assert seen[-1]["options"] == {"seed": 1}
+        chunks = [ch async for ch in c.chat_stream(messages=[], model="m")]
+        assert "".join(ch["message"]["content"] for ch in chunks) == "pong"
+        # One accounting callback per chat, including the final stream chunk
+        assert responses == ["m", "m"]
+        assert await c.list_models() == {"qwen3": "qwen3"}
+        assert await c.tags() == [{"name": "qwen3"}]
+        assert await c.health() is True
+    finally:
+        await c.close()
+
+
+@pytest.mark.asyncio
+async def test_async_client_keep_alive_load_and_unload(ollama_server):
+    base_url, seen = ollama_server
+    c = AsyncOllamaClient(base_url=base_url, timeout=5, keep_alive=lambda model: "1h" if model == "big" else None)
+    try:
+        await c.chat(messages=[], model="big")
+        assert seen[-1]["keep_alive"] == "1h"
+        await c.chat(messages=[], model="small")
+        assert "keep_alive" not in seen[-1]
+        assert (await c.load("big"))["done_reason"] == "load"
+        assert seen[-1] == {"model": "big", "stream": False, "keep_alive": "1h"}
+        await c.unload("big")
+        assert seen[-1]["keep_alive"] == 0
+        assert await c.embed("nomic-embed-text", ["a", "b"]) == [[0.1, 0.2], [0.1, 0.2]]
+        assert seen[-1]["input"] == ["a", "b"]
+    finally:
+        await c.close()
+
+
+@pytest.mark.asyncio
+async def test_async_client_maps_connection_errors():
+    c = AsyncOllamaClient(base_url="http://127.0.0.1:9/api", timeout=2)
+    try:
+        with pytest.raises(NetworkError):
+            await c.chat(messages=[], model="m")
+        assert await c.health() is False
+    finally:
+        await c.close()
+
+
+@pytest.mark.asyncio
+async def test_client_sends_chosen_num_ctx(ollama_server):
+    base_url, seen = ollama_server
+    from ollamarama.context_sizing import ContextSizer
+
+    sizer = ContextSizer(buckets=[2048, 8192])
+    c = AsyncOllamaClient(base_url=base_url, timeout=5, context_size=sizer.num_ctx_for)
+    options = {"temperature": 0.2, "num_ctx": 131072}
+    try:
+        await c.chat(messages=[{"role": "user", "content": "ping"}], model="m", options=options)
+        assert seen[-1]["options"] == {"temperature": 0.2, "num_ctx": 2048}
+        assert options["num_ctx"] == 131072
+        await c.load("m")
+        assert seen[-1]["options"] == {"num_ctx": 2048}
+        await c.unload("m")
+        assert "options" not in seen[-1]
+    finally:
+        await c.close()
+
+
+@pytest.mark.asyncio
+async def test_async_client_keeps_ollama_error_and_status(ollama_server):
+    from ollamarama.fallback import is_fallback_error
+
+    base_url, _ = ollama_server
+    c = AsyncOllamaClient(base_url=base_url, timeout=5)
+    try:
+        with pytest.raises(NetworkError) as info:
+            await c.chat(messages=[], model="huge")
+        assert info.value.status == 500 and "requires more system memory" in str(info.value)
+        assert is_fallback_error(info.value)
+    finally:
+        await c.close()
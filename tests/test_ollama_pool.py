@@ -0,0 +1,213 @@
+import asyncio
+
+import pytest
+
+from ollamarama.config import OllamaConfig, ollama_base_urls
+from ollamarama.exceptions import NetworkError
+from ollamarama.ollama_pool import OllamaPool, conversation_key
+
+
+class FakeBackend:
+    def __init__(self, url):
+        self.base_url = url
+        self.calls = 0
+        self.fail = False
+        self.alive = True
+        self.gate = None
+
+    async def chat(self, messages, model, options=None, timeout=None, think=None):
+        self.calls += 1
+        if self.fail:
+            raise self.fail if isinstance(self.fail, Exception) else NetworkError("connection refused")
+        if self.gate is not None:
+            await self.gate.wait()
+        return {"message": {"content": self.base_url}}
+
+    async def health(self):
+        return self.alive
+
+    async def close(self):
+        pass
+
+
+def test_base_urls_accepts_list():
+    cfg = OllamaConfig(api_url=["http://a:11434/api/chat", "http://b:11434/api/chat"])
+    assert ollama_base_urls(cfg) == ["http://a:11434/api", "http://b:11434/api"]
+    assert ollama_base_urls(OllamaConfig()) == ["http://localhost:11434/api"]
+
+
+@pytest.mark.asyncio
+async def test_pool_prefers_least_outstanding_backend():
+    a, b = FakeBackend("a"), FakeBackend("b")
+    pool = OllamaPool([a, b])
+    a.gate = asyncio.Event()
+    slow = asyncio.create_task(pool.chat(messages=[], model="m"))
+    await asyncio.sleep(0)
+    # "a" is busy, so the next request lands on "b"
+    assert (await pool.chat(messages=[], model="m"))["message"]["content"] == "b"
+    a.gate.set()
+    await slow
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_sticks_conversation_to_backend():
+    a, b = FakeBackend("a"), FakeBackend("b")
+    pool = OllamaPool([a, b])
+    token = conversation_key.set(("!r", "@u"))
+    try:
+        first = (await pool.chat(messages=[], model="m"))["message"]["content"]
+        for _ in range(3):
+            assert (await pool.chat(messages=[], model="m"))["message"]["content"] == first
+    finally:
+        conversation_key.reset(token)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_ejects_and_readmits_backend():
+    a, b = FakeBackend("a"), FakeBackend("b")
+    pool = OllamaPool([a, b], eject_after=2)
+    a.fail = True
+    # Idle backends tie, so requests go to the first one until it is ejected
+    for _ in range(2):
+        with pytest.raises(NetworkError):
+            await pool.chat(messages=[], model="m")
+    assert not pool.backends[0].healthy
+    assert (await pool.chat(messages=[], model="m"))["message"]["content"] == "b"
+    # Health probe brings it back
+    a.fail = False
+    await pool.probe()
+    assert pool.backends[0].healthy
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_backends_on_bad_requests_and_local_refusals():
+    from ollamarama.exceptions import BackendBusy
+
+    a, b = FakeBackend("a"), FakeBackend("b")
+    pool = OllamaPool([a, b], eject_after=2)
+    for error in (NetworkError("model 'nope' not found", status=404), BackendBusy("circuit open")):
+        a.fail = b.fail = error
+        for _ in range(4):
+            with pytest.raises(NetworkError):
+                await pool.chat(messages=[], model="nope")
+    assert all(backend.healthy and backend.failures == 0 for backend in pool.backends)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_skips_backend_with_open_breaker():
+    from ollamarama.resilience import CircuitBreaker
+
+    a, b = FakeBackend("a"), FakeBackend("b")
+    a.breaker = CircuitBreaker(threshold=1, cooldown=60)
+    a.breaker.failure()
+    pool = OllamaPool([a, b])
+    token = conversation_key.set(("!r", "@u"))
+    try:
+        # Even a conversation pinned to "a" moves to "b" while its breaker is open
+        pool._affinity[("!r", "@u")] = pool.backends[0]
+        for _ in range(3):
+            assert (await pool.chat(messages=[], model="m"))["message"]["content"] == "b"
+        assert pool._affinity[("!r", "@u")] is pool.backends[1]
+    finally:
+        conversation_key.reset(token)
+    assert a.calls == 0
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_defers_to_client_breaker(monkeypatch):
+    from ollamarama.ollama_client import AsyncOllamaClient
+    from ollamarama.resilience import CircuitBreaker
+
+    now = [100.0]
+    monkeypatch.setattr("ollamarama.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=1, cooldown=30)
+    # Nothing listens on port 9, so every request to "a" fails to connect
+    a = AsyncOllamaClient(base_url="http://127.0.0.1:9/api", timeout=2, retries=0, breaker=breaker)
+    b = FakeBackend("b")
+    pool = OllamaPool([a, b], eject_after=1)
+    try:
+        with pytest.raises(NetworkError):
+            await pool.chat(messages=[], model="m")
+        # The breaker opened; the pool does not keep a second count of its own
+        assert breaker.open and pool.backends[0].failures == 0 and pool.backends[0].healthy
+        assert not pool.backends[0].available
+        assert (await pool.chat(messages=[], model="m"))["message"]["content"] == "b"
+        # Once the cooldown lapses the breaker lets one trial request back through the pool
+        now[0] += 31
+        assert pool.backends[0].available
+        with pytest.raises(NetworkError):
+            await pool.chat(messages=[], model="m")
+        assert breaker.open and breaker.trips == 1
+    finally:
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_hedges_slow_request_to_second_backend():
+    a, b = FakeBackend("a"), FakeBackend("b")
+    pool = OllamaPool([a, b], hedge=True, hedge_min_delay=0.01, hedge_min_samples=1)
+    token = conversation_key.set(("!r", "@u"))
+    try:
+        first = (await pool.chat(messages=[], model="m"))["message"]["content"]
+        assert pool.hedges == 0
+        slow, fast = (a, b) if first == "a" else (b, a)
+        slow.gate = asyncio.Event()
+        reply = await asyncio.wait_for(pool.chat(messages=[], model="m"), 1)
+        assert reply["message"]["content"] == fast.base_url
+        assert pool.hedge_stats() == {"requests": 2, "hedges": 1, "wins": 1, "hedge_rate": 0.5}
+        # The losing request was cancelled and the conversation moved to the winner
+        assert all(bk.outstanding == 0 for bk in pool.backends)
+        slow.gate = None
+        assert (await pool.chat(messages=[], model="m"))["message"]["content"] == fast.base_url
+    finally:
+        conversation_key.reset(token)
+        await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_hedges_stream_on_late_first_chunk():
+    class StreamingBackend(FakeBackend):
+        async def chat_stream(self, messages, model, options=None, timeout=None, think=None):
+            self.calls += 1
+            if self.gate is not None:
+                await self.gate.wait()
+            for piece in (self.base_url, "!"):
+                yield {"message": {"content": piece}, "done": piece == "!"}
+
+    a, b = StreamingBackend("a"), StreamingBackend("b")
+    pool = OllamaPool([a, b], hedge=True, hedge_min_delay=0.01, hedge_min_samples=1)
+    chunks = [c async for c in pool.chat_stream(messages=[], model="m")]
+    slow = a if chunks[0]["message"]["content"] == "a" else b
+    slow.gate = asyncio.Event()
+    chunks = [c async for c in pool.chat_stream(messages=[], model="m")]
+    assert "".join(c["message"]["content"] for c in chunks) != f"{slow.base_url}!"
+    assert len(chunks) == 2 and pool.hedges == 1 and pool.hedge_wins == 1
+    assert all(bk.outstanding == 0 for bk in pool.backends)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_tags_merges_backends():
+    class TagBackend(FakeBackend):
+        def __init__(self, url, names):
+            super().__init__(url)
+            self.names = names
+
+        async def tags(self):
+            if self.fail:
+                raise NetworkError("connection refused")
+            return [{"name": n} for n in self.names]
+
+    a, b = TagBackend("a", ["qwen3:latest"]), TagBackend("b", ["qwen3:latest", "llama3:8b"])
+    pool = OllamaPool([a, b])
+    tags = await pool.tags()
+    assert [(t["name"], t["backend"]) for t in tags] == [("qwen3:latest", "a"), ("llama3:8b", "b")]
+    a.fail = b.fail = True
+    with pytest.raises(NetworkError):
+        await pool.tags()
+    await pool.close()
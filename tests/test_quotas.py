@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.handlers.cmd_quota import handle_quota
+from ollamarama.quotas import TokenQuotas
+from ollamarama.usage import UsageTracker
+
+
+class FakeMatrix:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, room_id, body, html=None):
+        self.sent.append(body)
+
+
+def test_usage_listener_charges_user_and_room_buckets():
+    usage = UsageTracker()
+    quotas = TokenQuotas(user_capacity=100, user_refill_per_minute=60, room_capacity=150, room_refill_per_minute=60)
+    usage.add_listener(quotas.record)
+
+    usage.record("m", {"prompt_eval_count": 40, "eval_count": 20}, room_id="!r", user_id="@a")
+    assert quotas.check("!r", "@a") is None
+    usage.record("m", {"prompt_eval_count": 40, "eval_count": 20}, room_id="!r", user_id="@a")
+    scope, wait = quotas.check("!r", "@a")
+    # 120 tokens against a capacity of 100 refilled at one token per second
+    assert scope == "user" and 15 < wait <= 21
+    # Another user in the same room is still under the room limit, until it is spent
+    assert quotas.check("!r", "@b") is None
+    usage.record("m", {"prompt_eval_count": 40, "eval_count": 0}, room_id="!r", user_id="@b")
+    assert quotas.check("!r", "@b")[0] == "room"
+    assert quotas.throttled == 2
+
+
+def test_exempt_users_are_not_charged_and_reset_refills():
+    quotas = TokenQuotas(user_capacity=10, user_refill_per_minute=1)
+    quotas.exempt.add("@admin")
+    quotas.record("m", "!r", "@admin", 500, 500)
+    assert quotas.check("!r", "@admin") is None and not quotas.snapshot("user")
+
+    quotas.record("m", "!r", "@a", 50, 0)
+    assert quotas.check("!r", "@a")[0] == "user"
+    assert quotas.reset("@a") == 1
+    assert quotas.check("!r", "@a") is None
+    # Room limit disabled: no room buckets are created
+    assert not quotas.snapshot("room")
+    assert not TokenQuotas().enabled
+
+
+def test_configured_admins_are_exempt_by_display_name():
+    quotas = TokenQuotas(user_capacity=10, user_refill_per_minute=1, exempt=["Admin"])
+    quotas.record("m", "!r", "@admin", 500, 0)
+    assert quotas.check("!r", "@admin", "Admin") is None
+    # Exemption comes from the configuration alone, not from earlier checks
+    assert quotas.exempt == {"Admin"}
+    assert quotas.check("!r", "@admin", "Not Admin")[0] == "user"
+
+
+@pytest.mark.asyncio
+async def test_quota_command_lists_and_resets_buckets():
+    matrix = FakeMatrix()
+    quotas = TokenQuotas(user_capacity=100, user_refill_per_minute=10)
+    quotas.record("m", "!r", "@a", 150, 0)
+    quotas.record("m", "!r", "@b", 10, 0)
+    ctx = SimpleNamespace(matrix=matrix, quotas=quotas, render=lambda s: None)
+
+    await handle_quota(ctx, "!r", "@admin", "admin", "")
+    lines = matrix.sent[-1].splitlines()
+    assert lines[0] == "**Token quotas by user**"
+    assert lines[1].startswith("- **@a**: 0/100 left, 150 used, throttled for")
+    assert lines[2] == "- **@b**: 90/100 left, 10 used"
+
+    await handle_quota(ctx, "!r", "@admin", "admin", "reset all")
+    assert matrix.sent[-1] == "Reset 2 quota buckets"
+    await handle_quota(ctx, "!r", "@admin", "admin", "rooms")
+    assert matrix.sent[-1] == "No room quotas in use"
+
+    ctx.quotas = None
+    await handle_quota(ctx, "!r", "@admin", "admin", "")
+    assert matrix.sent[-1] == "Token quotas are not enabled"
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.handlers.cmd_reasoning import handle_reasoning
+from ollamarama.reasoning import ReasoningStats, extract_reply, parse_think, resolve_think, split_reasoning
+
+
+def test_split_reasoning_handles_all_markups():
+    assert split_reasoning("<think>hmm</think>\nHi") == ("Hi", "hmm")
+    assert split_reasoning("<|begin_of_thought|>a<|end_of_thought|><|begin_of_solution|>B<|end_of_solution|>") == (
+        "B",
+        "a",
+    )
+    assert split_reasoning("plain") == ("plain", "")
+
+
+def test_parse_and_resolve_think():
+    assert parse_think("off") is False and parse_think("HIGH") == "high" and parse_think("default") is None
+    with pytest.raises(ValueError):
+        parse_think("lots")
+    ctx = SimpleNamespace(think=True, model_think={"m": "low"}, room_think={"!r": False})
+    assert resolve_think(ctx, "!r", "m") is False
+    assert resolve_think(ctx, "!other", "m") == "low"
+    assert resolve_think(ctx, "!other", "n") is True
+
+
+def test_extract_reply_records_discarded_tokens():
+    logs = []
+    ctx = SimpleNamespace(log=logs.append, reasoning_stats=ReasoningStats())
+    data = {
+        "message": {"content": "Answer", "thinking": "x" * 18},
+        "eval_count": 24,
+        "total_duration": 2_000_000_000,
+    }
+    assert extract_reply(ctx, data, who="U (@u)", model="m", think=None, elapsed=9.0) == "Answer"
+    assert logs and logs[0].startswith("Model thinking for U (@u):")
+    extract_reply(ctx, {"message": {"content": "Answer"}}, who="U", model="m", think=False, elapsed=0.5)
+    summary = ctx.reasoning_stats.summary()
+    assert summary[("m", "default")] == {"replies": 1, "avg_latency": 2.0, "avg_discarded_tokens": 18}
+    assert summary[("m", "off")]["avg_discarded_tokens"] == 0
+
+
+class FakeMatrix:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, room_id, body, html=None):
+        self.sent.append(body)
+
+
+@pytest.mark.asyncio
+async def test_handle_reasoning_sets_room_override():
+    ctx = SimpleNamespace(
+        model="m", think=None, room_think={}, reasoning_stats=ReasoningStats(), matrix=FakeMatrix(),
+        render=lambda s: None, log=lambda *a: None,
+    )
+    await handle_reasoning(ctx, "!r", "@a", "Admin", "off")
+    assert ctx.room_think == {"!r": False} and "**off**" in ctx.matrix.sent[-1]
+    ctx.reasoning_stats.record("m", False, 1.0, 0)
+    await handle_reasoning(ctx, "!r", "@a", "Admin", "")
+    assert "**m** (off): 1 replies" in ctx.matrix.sent[-1]
+    await handle_reasoning(ctx, "!r", "@a", "Admin", "default")
+    assert ctx.room_think == {}
+    await handle_reasoning(ctx, "!r", "@a", "Admin", "bogus")
+    assert ctx.matrix.sent[-1].startswith("Usage")
@@ -0,0 +1,63 @@
+import pytest
+
+from ollamarama.exceptions import BackendBusy, NetworkError
+from ollamarama.ollama_client import AsyncOllamaClient
+from ollamarama.resilience import AdaptiveTimeouts, CircuitBreaker, backoff_delay
+
+
+def test_adaptive_timeout_tracks_latency_percentile():
+    timeouts = AdaptiveTimeouts(percentile=0.9, multiplier=2, floor=5, min_samples=10)
+    for _ in range(9):
+        timeouts.observe("m", 10.0)
+    # Too few samples: the configured ceiling applies
+    assert timeouts.timeout_for("m", 360) == 360
+    timeouts.observe("m", 12.0)
+    assert timeouts.timeout_for("m", 360) == 24.0
+    assert timeouts.timeout_for("m", 20) == 20
+    for _ in range(10):
+        timeouts.observe("fast", 0.5)
+    assert timeouts.timeout_for("fast", 360) == 5
+
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("ollamarama.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=2, cooldown=30)
+    breaker.failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.failure()
+    assert not breaker.allow() and breaker.state == "open" and breaker.trips == 1
+    now[0] += 31
+    # One trial request at a time while half-open
+    assert breaker.allow() and not breaker.allow()
+    breaker.failure()
+    assert not breaker.allow() and breaker.trips == 1
+    now[0] += 31
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_backoff_delay_is_bounded():
+    assert all(0 <= backoff_delay(n, 0.5, cap=2) <= 2 for n in range(1, 10))
+
+
+@pytest.mark.asyncio
+async def test_client_retries_then_fails_fast(monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr("ollamarama.ollama_client.asyncio.sleep", fake_sleep)
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    c = AsyncOllamaClient(base_url="http://127.0.0.1:9/api", timeout=2, retries=2, breaker=breaker)
+    try:
+        with pytest.raises(NetworkError):
+            await c.chat(messages=[], model="m")
+        assert len(sleeps) == 2 and breaker.state == "open"
+        with pytest.raises(BackendBusy):
+            await c.chat(messages=[], model="m")
+        assert len(sleeps) == 2
+    finally:
+        await c.close()
@@ -0,0 +1,67 @@
+import pytest
+
+from ollamarama.response_cache import CachedOllamaClient, ResponseCache, payload_key
+
+
+class CountingOllama:
+    def __init__(self):
+        self.calls = 0
+        self.base_url = "http://ollama/api"
+
+    async def chat(self, messages, model, options=None, timeout=None, think=None):
+        self.calls += 1
+        return {"message": {"content": f"reply {self.calls}"}}
+
+    async def chat_with_tools(self, *, messages, model, options, tools, tool_choice="auto", timeout=None, think=None):
+        self.calls += 1
+        return {"message": {"content": "", "tool_calls": [{"function": {"name": "t"}}]}}
+
+
+def test_payload_key_is_order_independent():
+    assert payload_key({"a": 1, "b": [1, 2]}) == payload_key({"b": [1, 2], "a": 1})
+    assert payload_key({"a": 1}) != payload_key({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_deterministic_requests_hit_cache():
+    inner = CountingOllama()
+    client = CachedOllamaClient(inner, ResponseCache())
+    msgs = [{"role": "user", "content": "hi"}]
+    first = await client.chat(messages=msgs, model="m", options={"temperature": 0})
+    first["message"]["content"] = "mutated by caller"
+    second = await client.chat(messages=msgs, model="m", options={"temperature": 0})
+    assert inner.calls == 1 and second["message"]["content"] == "reply 1"
+    await client.chat_with_tools(messages=msgs, model="m", options={"temperature": 0}, tools=[])
+    await client.chat_with_tools(messages=msgs, model="m", options={"temperature": 0}, tools=[])
+    assert inner.calls == 2
+    assert client.cache.stats()["hits"] == 2 and client.cache.stats()["misses"] == 2
+    # Other attributes pass through to the wrapped client
+    assert client.base_url == "http://ollama/api"
+
+
+@pytest.mark.asyncio
+async def test_sampled_requests_bypass_cache():
+    inner = CountingOllama()
+    client = CachedOllamaClient(inner, ResponseCache())
+    for options in ({"temperature": 0.7}, {}, None):
+        await client.chat(messages=[], model="m", options=options)
+        await client.chat(messages=[], model="m", options=options)
+    assert inner.calls == 6 and len(client.cache) == 0
+
+
+def test_lru_ttl_and_byte_bound(monkeypatch):
+    cache = ResponseCache(ttl=10, max_bytes=60)
+    cache.put("a", {"v": "x" * 20})
+    cache.put("b", {"v": "y" * 20})
+    assert cache.get("a") is not None  # a is now most recent
+    cache.put("c", {"v": "z" * 20})
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.bytes <= 60
+    cache.put("huge", {"v": "w" * 100})
+    assert cache.get("huge") is None
+
+    import ollamarama.response_cache as rc
+
+    now = rc.time.monotonic()
+    monkeypatch.setattr(rc.time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None and len(cache) == 1
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.generation import Generation
+from ollamarama.routing import FAST, HEAVY, ModelRouter
+
+
+class ClassifierOllama:
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = []
+
+    async def chat(self, messages, model, options=None, timeout=None):
+        self.calls.append(model)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return {"message": {"content": self.answer}}
+
+
+def test_heuristics():
+    router = ModelRouter("fast", max_chars=100)
+    assert router.heuristic("haha same") == (FAST, "short")
+    assert router.heuristic("what does ```x = 1``` do") == (HEAVY, "code")
+    assert router.heuristic("why am I getting a KeyError here") == (HEAVY, "code")
+    assert router.heuristic("a" * 101) == (HEAVY, "length")
+    assert router.heuristic("what's the weather today") == (FAST, "short")
+    assert router.heuristic("what's the weather today", tools=True) == (HEAVY, "tools")
+    assert router.heuristic("explain black holes") == (None, "demanding")
+
+
+@pytest.mark.asyncio
+async def test_unclear_requests_use_classifier_or_go_heavy():
+    ctx = SimpleNamespace(model="big", ollama=ClassifierOllama("SIMPLE"))
+    router = ModelRouter("fast", classifier_model="tiny")
+    gen = Generation("!r", "@u")
+    assert await router.route(ctx, gen, "explain the joke") == FAST
+    assert gen.model == "fast" and ctx.ollama.calls == ["tiny"]
+    # Classifier failures fall back to the heavy model
+    ctx.ollama = ClassifierOllama(RuntimeError("down"))
+    gen = Generation("!r", "@u")
+    assert await router.route(ctx, gen, "explain the joke") == HEAVY and gen.model is None
+    # Without a classifier, unclear requests go heavy
+    gen = Generation("!r", "@u")
+    assert await ModelRouter("fast").route(ctx, gen, "explain the joke") == HEAVY
+    assert router.reasons == {"classifier": 2}
@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.handlers.cmd_queue import handle_queue
+from ollamarama.scheduler import InferenceScheduler
+
+
+async def _hold(sched, order, label, model, room, user, release):
+    async with sched.slot(model, room, user):
+        order.append(label)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_chatty_room_does_not_starve_others():
+    sched = InferenceScheduler(default_limit=1)
+    order = []
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(_hold(sched, order, f"a{i}", "m", "!a", "@u", release)) for i in range(4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(_hold(sched, order, "b0", "m", "!b", "@v", release)))
+    await asyncio.sleep(0)
+    assert sched.stats()["m"]["queued"] == 4
+    release.set()
+    await asyncio.gather(*tasks)
+    # The late room is served right after the request already running
+    assert order[:2] == ["a0", "b0"]
+    assert sched.stats()["m"]["served"] == 5
+
+
+@pytest.mark.asyncio
+async def test_per_model_caps():
+    sched = InferenceScheduler(default_limit=1, model_limits={"big": 2})
+    await sched.acquire("big", "!a", "@u")
+    await sched.acquire("big", "!a", "@v")
+    waiter = asyncio.create_task(sched.acquire("big", "!a", "@w"))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    sched.release("big")
+    assert await asyncio.wait_for(waiter, 1) >= 0.0
+    assert sched.stats()["big"]["active"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_skipped():
+    sched = InferenceScheduler(default_limit=1)
+    await sched.acquire("m", "!a", "@u")
+    waiter = asyncio.create_task(sched.acquire("m", "!b", "@v"))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    sched.release("m")
+    assert sched.stats()["m"]["active"] == 0 and sched.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_handle_queue_reports_stats():
+    sent = []
+
+    class Matrix:
+        async def send_text(self, room_id, body, html=None):
+            sent.append(body)
+
+    sched = InferenceScheduler(default_limit=2)
+    await sched.acquire("qwen3", "!a", "@u")
+    ctx = SimpleNamespace(scheduler=sched, matrix=Matrix(), render=lambda s: None)
+    await handle_queue(ctx, "!r", "@admin", "Admin", "")
+    assert "**qwen3**: 1/2 running, 0 queued" in sent[-1]
+
+
+@pytest.mark.asyncio
+async def test_model_batching_drains_current_model_first():
+    sched = InferenceScheduler(default_limit=2, batch_models=True)
+    await sched.acquire("a", "!r", "@u")
+    other = asyncio.create_task(sched.acquire("b", "!r", "@v"))
+    await asyncio.sleep(0)
+    # "b" is not loaded, so it waits even though its lane has free slots
+    assert not other.done()
+    # More work for the current model still runs alongside
+    assert await asyncio.wait_for(sched.acquire("a", "!r", "@w"), 1) == 0.0
+    sched.release("a")
+    sched.release("a")
+    await asyncio.wait_for(other, 1)
+    assert sched.stats()["b"]["current"] and sched.switches == 1
+
+
+@pytest.mark.asyncio
+async def test_model_batching_serves_resident_models():
+    sched = InferenceScheduler(default_limit=2, batch_models=True)
+    sched.set_resident(["b"])
+    await sched.acquire("a", "!r", "@u")
+    assert await asyncio.wait_for(sched.acquire("b:latest", "!r", "@v"), 1) == 0.0
+    assert sched.stats()["b:latest"]["resident"]
+
+
+@pytest.mark.asyncio
+async def test_model_batching_bounded_wait_forces_switch():
+    sched = InferenceScheduler(default_limit=2, batch_models=True, max_batch_wait=0.0)
+    await sched.acquire("a", "!r", "@u")
+    other = asyncio.create_task(sched.acquire("b", "!r", "@v"))
+    await asyncio.sleep(0)
+    # New work for "a" now queues behind the starved model
+    more = asyncio.create_task(sched.acquire("a", "!r", "@w"))
+    await asyncio.sleep(0)
+    assert not more.done()
+    sched.release("a")
+    await asyncio.wait_for(other, 1)
+    assert not more.done()
+    sched.release("b")
+    await asyncio.wait_for(more, 1)
+    assert sched.switches == 2
@@ -0,0 +1,149 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from ollamarama.semantic_cache import SemanticCache, SemanticCachedOllamaClient
+
+VECTORS = {
+    "what is the capital of france?": [1.0, 0.0, 0.0],
+    "what's france's capital city?": [0.98, 0.2, 0.0],
+    "how do magnets work?": [0.0, 0.0, 1.0],
+}
+
+
+class FakeOllama:
+    def __init__(self):
+        self.calls = 0
+        self.embeds = 0
+
+    async def embed(self, model, inputs, timeout=None):
+        self.embeds += 1
+        return [VECTORS[text.lower()] for text in inputs]
+
+    async def chat(self, messages, model, options=None, timeout=None, think=None):
+        self.calls += 1
+        return {"message": {"content": f"reply {self.calls}"}}
+
+
+def _msgs(question, system="You are helpful."):
+    return [{"role": "system", "content": system}, {"role": "user", "content": question}]
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits_within_same_model_and_persona():
+    inner = FakeOllama()
+    client = SemanticCachedOllamaClient(inner, SemanticCache(threshold=0.9), embed_model="embed")
+    first = await client.chat(messages=_msgs("What is the capital of France?"), model="m")
+    first["message"]["content"] = "mutated by caller"
+    second = await client.chat(messages=_msgs("What's France's capital city?"), model="m")
+    assert inner.calls == 1 and second["message"]["content"] == "reply 1"
+    # Unrelated question, other model and other persona all miss
+    await client.chat(messages=_msgs("How do magnets work?"), model="m")
+    await client.chat(messages=_msgs("What's France's capital city?"), model="other")
+    await client.chat(messages=_msgs("What's France's capital city?", system="You are a pirate."), model="m")
+    assert inner.calls == 4
+    st = client.semantic_cache.stats()
+    assert st["hits"] == 1 and st["misses"] == 4 and st["entries"] == 4
+
+
+@pytest.mark.asyncio
+async def test_embedding_failure_falls_back_to_upstream():
+    class Failing(FakeOllama):
+        async def embed(self, model, inputs, timeout=None):
+            raise RuntimeError("no embedding model")
+
+    inner = Failing()
+    client = SemanticCachedOllamaClient(inner, SemanticCache(), embed_model="embed")
+    await client.chat(messages=_msgs("What is the capital of France?"), model="m")
+    await client.chat(messages=_msgs("What is the capital of France?"), model="m")
+    assert inner.calls == 2 and len(client.semantic_cache) == 0
+
+
+def test_full_cache_replaces_least_recently_used():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    cache.add("s", [1.0, 0.0], {"message": {"content": "a"}})
+    cache.add("s", [0.0, 1.0], {"message": {"content": "b"}})
+    assert cache.lookup("s", [1.0, 0.0])[0]["message"]["content"] == "a"
+    cache.add("s", [0.7, -0.7], {"message": {"content": "c"}})
+    assert len(cache) == 2
+    assert cache.lookup("s", [0.0, 1.0])[0] is None
+    assert cache.lookup("s", [1.0, 0.0])[0]["message"]["content"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_follow_ups_bypass_the_cache():
+    inner = FakeOllama()
+    client = SemanticCachedOllamaClient(inner, SemanticCache(threshold=0.9), embed_model="embed")
+    await client.chat(messages=_msgs("What is the capital of France?"), model="m")
+    # Same question after earlier turns of another conversation: not matched, not stored
+    follow_up = [
+        {"role": "system", "content": "You are helpful."},
+        {"role": "user", "content": "tell me about iron"},
+        {"role": "assistant", "content": "Iron is a metal."},
+        {"role": "user", "content": "What is the capital of France?"},
+    ]
+    await client.chat(messages=follow_up, model="m")
+    assert inner.calls == 2 and inner.embeds == 1
+    assert len(client.semantic_cache) == 1
+
+
+class ToolOllama(FakeOllama):
+    def __init__(self):
+        super().__init__()
+        self.tool_call_next = False
+
+    async def chat_with_tools(self, *, messages, model, options, tools, tool_choice="auto", timeout=None, think=None):
+        self.calls += 1
+        if self.tool_call_next:
+            self.tool_call_next = False
+            return {"message": {"content": "", "tool_calls": [{"function": {"name": "search", "arguments": {}}}]}}
+        return {"message": {"content": f"reply {self.calls}"}}
+
+    async def chat_stream(self, messages, model, options=None, timeout=None, think=None, tools=None):
+        self.calls += 1
+        yield {"message": {"content": "re"}, "done": False}
+        yield {"message": {"content": f"ply {self.calls}"}, "done": False}
+        yield {"message": {"content": ""}, "done": True, "eval_count": 3}
+
+
+TOOLS = [{"type": "function", "function": {"name": "search"}}]
+
+
+@pytest.mark.asyncio
+async def test_tool_requests_cache_only_final_answers():
+    inner = ToolOllama()
+    client = SemanticCachedOllamaClient(inner, SemanticCache(threshold=0.9), embed_model="embed")
+    inner.tool_call_next = True
+    first = await client.chat_with_tools(
+        messages=_msgs("What is the capital of France?"), model="m", options=None, tools=TOOLS
+    )
+    assert first["message"]["tool_calls"] and len(client.semantic_cache) == 0
+    await client.chat_with_tools(messages=_msgs("What is the capital of France?"), model="m", options=None, tools=TOOLS)
+    hit = await client.chat_with_tools(
+        messages=_msgs("What's France's capital city?"), model="m", options=None, tools=TOOLS
+    )
+    assert hit["message"]["content"] == "reply 2" and inner.calls == 2
+    # Without tools the same question is a different scope
+    await client.chat(messages=_msgs("What's France's capital city?"), model="m")
+    assert inner.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_is_remembered_and_replayed_as_one_chunk():
+    inner = ToolOllama()
+    client = SemanticCachedOllamaClient(inner, SemanticCache(threshold=0.9), embed_model="embed")
+    stream = client.chat_stream(messages=_msgs("What is the capital of France?"), model="m", tools=TOOLS)
+    assert len([c async for c in stream]) == 3
+    stream = client.chat_stream(messages=_msgs("What's France's capital city?"), model="m", tools=TOOLS)
+    replay = [c async for c in stream]
+    assert inner.calls == 1
+    assert replay == [{"message": {"role": "assistant", "content": "reply 1"}, "done": True, "eval_count": 3}]
+
+
+def test_scope_ids_do_not_accumulate():
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    for n in range(50):
+        cache.add(f"scope {n}", [1.0, 0.0], {"message": {"content": str(n)}})
+    assert len(cache) == 2
+    assert cache.lookup("scope 49", [1.0, 0.0])[0]["message"]["content"] == "49"
+    assert cache.lookup("scope 0", [1.0, 0.0])[0] is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from ollamarama.singleflight import CoalescingOllamaClient, SingleFlight
+
+
+class SlowOllama:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.cancelled = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def chat(self, messages, model, options=None, timeout=None, think=None):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise RuntimeError("boom")
+        return {"message": {"content": "shared"}}
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    inner = SlowOllama()
+    client = CoalescingOllamaClient(inner)
+    msgs = [{"role": "user", "content": "hi"}]
+    tasks = [asyncio.create_task(client.chat(messages=msgs, model="m")) for _ in range(3)]
+    other = asyncio.create_task(client.chat(messages=msgs, model="other"))
+    await asyncio.sleep(0)
+    inner.release.set()
+    results = await asyncio.gather(*tasks, other)
+    assert inner.calls == 2
+    assert all(r["message"]["content"] == "shared" for r in results)
+    # Followers get their own copies
+    results[1]["message"]["content"] = "changed"
+    assert results[0]["message"]["content"] == "shared"
+    assert client.flights.stats() == {"in_flight": 0, "leaders": 2, "followers": 2}
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    inner = SlowOllama(fail=True)
+    client = CoalescingOllamaClient(inner)
+    tasks = [asyncio.create_task(client.chat(messages=[], model="m")) for _ in range(2)]
+    await asyncio.sleep(0)
+    inner.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+    assert inner.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_cancellation_only_stops_the_last_waiter():
+    inner = SlowOllama()
+    flights = SingleFlight()
+    client = CoalescingOllamaClient(inner, flights)
+    leader = asyncio.create_task(client.chat(messages=[], model="m"))
+    follower = asyncio.create_task(client.chat(messages=[], model="m"))
+    await asyncio.sleep(0)
+    # The leader going away does not abort the follower's call
+    leader.cancel()
+    await asyncio.sleep(0)
+    assert inner.cancelled == 0 and flights.in_flight == 1
+    follower.cancel()
+    for task in (leader, follower):
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    await asyncio.sleep(0)
+    assert inner.cancelled == 1 and flights.in_flight == 0
@@ -64,7 +64,7 @@ class FakeOllama:
     def __init__(self):
         self.calls = 0
 
-    def chat_with_tools(self, model, messages, options, tools, tool_choice=None, timeout=None):
+    async def chat_with_tools(self, model, messages, options, tools, tool_choice=None, timeout=None):
         if self.calls == 0:
             self.calls += 1
             return {
@@ -99,7 +99,7 @@ async def _to_thread(fn, *a, **kw):
 
 
 def _make_send_response(matrix):
-    async def send_response(room_id, body, html=None):
+    async def send_response(room_id, body, html=None, generation=None):
         await matrix.send_text(room_id, body, html=html)
     return send_response
 
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ollamarama.handlers.cmd_usage import handle_usage
+from ollamarama.ollama_pool import conversation_key
+from ollamarama.history import HistoryStore
+from ollamarama.usage import PrefixCacheStats, UsageTracker
+
+
+def _meta(prompt, completion, load_s=0.0):
+    return {
+        "prompt_eval_count": prompt,
+        "prompt_eval_duration": int(prompt * 1e7),  # 100 tok/s
+        "eval_count": completion,
+        "eval_duration": int(completion * 1e8),  # 10 tok/s
+        "load_duration": int(load_s * 1e9),
+        "total_duration": int(2e9),
+    }
+
+
+def test_records_per_model_room_and_user():
+    usage = UsageTracker()
+    token = conversation_key.set(("!r", "@u"))
+    try:
+        usage.record("m", _meta(100, 20, load_s=3.0))
+    finally:
+        conversation_key.reset(token)
+    usage.record("m", _meta(300, 10), room_id="!s", user_id="@v")
+    usage.record("m", {"message": {"content": "no metadata"}})
+
+    model = usage.snapshot("models")["m"]
+    assert model["requests"] == 2 and model["prompt_tokens"] == 400 and model["completion_tokens"] == 30
+    assert model["tokens_per_second"] == pytest.approx(10.0)
+    assert model["prompt_tokens_per_second"] == pytest.approx(100.0)
+    assert model["loads"] == 1 and model["load_seconds"] == pytest.approx(3.0)
+    assert usage.snapshot("rooms")["!r"]["requests"] == 1
+    assert set(usage.snapshot("users")) == {"@u", "@v"}
+    assert usage.largest_prompts(1) == [(("!s", "@v"), 300)]
+
+
+def test_bounded_keys():
+    usage = UsageTracker(max_keys=2)
+    for i in range(3):
+        usage.record("m", _meta(1, 1), room_id=f"!r{i}", user_id="@u")
+    assert list(usage.rooms) == ["!r1", "!r2"]
+
+
+class FakeMatrix:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, room_id, body, html=None):
+        self.sent.append(body)
+
+
+@pytest.mark.asyncio
+async def test_handle_usage_lists_models_and_rooms():
+    usage = UsageTracker()
+    usage.record("qwen3", _meta(50, 5), room_id="!r", user_id="@u")
+    ctx = SimpleNamespace(usage=usage, matrix=FakeMatrix(), render=lambda s: None)
+    await handle_usage(ctx, "!r", "@a", "Admin", "")
+    assert "**qwen3**: 1 requests, 50 prompt + 5 generated tokens" in ctx.matrix.sent[-1]
+    assert "@u in !r: 50 tokens" in ctx.matrix.sent[-1]
+    await handle_usage(ctx, "!r", "@a", "Admin", "rooms")
+    assert "**!r**" in ctx.matrix.sent[-1]
+    await handle_usage(ctx, "!r", "@a", "Admin", "bogus")
+    assert ctx.matrix.sent[-1].startswith("Usage:")
+
+
+def test_prefix_cache_stats_compare_prompt_estimate_with_prompt_eval_count():
+    history = HistoryStore("you are ", ".", "helper")
+    history.add("!r", "@u", "user", "x" * 400)
+    history.get("!r", "@u")
+    estimated = history.last_prompt_tokens("!r", "@u")
+    usage = UsageTracker()
+    prefix_cache = PrefixCacheStats(history)
+    usage.add_listener(prefix_cache.record)
+
+    # Only the first response after `get` is compared; a fully evaluated prompt saves nothing
+    usage.record("m", _meta(estimated, 5), room_id="!r", user_id="@u")
+    usage.record("m", _meta(1, 1), room_id="!r", user_id="@u")
+    history.get("!r", "@u")
+    usage.record("m", _meta(10, 5), room_id="!r", user_id="@u")
+    # Conversations without a prompt from the history are not counted
+    usage.record("m", _meta(50, 5), room_id="!s", user_id="@v")
+    st = prefix_cache.stats()
+    assert st["requests"] == 2 and st["estimated_tokens"] == 2 * estimated
+    # Savings exclude the estimate's margin of error
+    assert st["saved_tokens"] == estimated - 10 - int(estimated * 0.15)
@@ -0,0 +1,42 @@
+import pytest
+
+from ollamarama.warm_pool import ModelWarmPool
+
+
+class FakeOllama:
+    def __init__(self):
+        self.loaded = {}
+        self.unloaded = []
+
+    async def load(self, model, keep_alive=None):
+        self.loaded[model] = keep_alive
+        return {"done": True}
+
+    async def unload(self, model):
+        self.unloaded.append(model)
+
+
+@pytest.mark.asyncio
+async def test_preload_uses_per_model_keep_alive():
+    ollama = FakeOllama()
+    pool = ModelWarmPool(ollama, keep_alive="10m", model_keep_alive={"big": -1})
+    assert await pool.preload("big") >= 0.0
+    await pool.preload("small")
+    assert ollama.loaded == {"big": -1, "small": "10m"}
+    assert set(pool.load_times) == {"big", "small"}
+
+
+@pytest.mark.asyncio
+async def test_unload_idle_spares_active_model():
+    ollama = FakeOllama()
+    pool = ModelWarmPool(ollama, idle_unload=60)
+    pool.keep_alive_for("old")
+    pool.keep_alive_for("active")
+    pool.keep_alive_for("recent")
+    pool.last_used["old"] -= 120
+    pool.last_used["active"] -= 120
+    assert await pool.unload_idle(keep=["active"]) == ["old"]
+    assert ollama.unloaded == ["old"]
+    assert set(pool.last_used) == {"active", "recent"}
+    # Disabled threshold never unloads
+    assert await ModelWarmPool(ollama).unload_idle() == []